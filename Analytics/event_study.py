@@ -0,0 +1,236 @@
+import os
+import sys
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Analytics.panel import daily_panel
+from Storage.price_store import get_prices
+
+# Event-study backtester: do bursts in message velocity or swings in sentiment predict returns?
+#
+# A Signal turns one panel field (sessions x tickers, see panel.py) into events:
+#   kind "level"   z = (x_t - mean) / std over the previous `lookback` sessions
+#   kind "change"  the same on x_t - x_t-1 (a swing rather than a level)
+# An event fires on the session where direction * z first crosses `threshold` (rising edge, so a burst
+# lasting several days is one event). Posts of session t include after-close chatter, so the event window
+# starts at t+1: CAR(h) = sum of abnormal returns over t+1 .. t+h, abnormal = ticker return minus the
+# benchmark (BENCHMARK, topped up in the price store, else the equal-weighted mean of the panel's other
+# tickers: leaving the ticker itself out keeps its own move from shrinking its abnormal return).
+#
+# All tickers are handled at once: rolling means/stds come from running sums over the whole panel, events
+# from np.nonzero on the crossing mask and CARs from one cumulative-sum matrix, CAR(t, h) = C[t+h] - C[t].
+# Confidence intervals are a cluster bootstrap over event dates (events on the same day are not
+# independent): each resample is a vector of draw counts per date, so all of them are one matrix product.
+# Parameter combinations are spread over a process pool; every worker receives the panel once
+# (initializer) and memoizes z-score panels shared by several thresholds. With hundreds of combinations,
+# expect some to look significant by chance.
+
+OUT_DIR = PROJECT_ROOT / "data" / "analytics" / "event_study"
+BENCHMARK = "SPY"
+HORIZONS = (1, 3, 5, 10)
+N_BOOT = 1000
+CI = 0.95
+MIN_EVENTS = 10
+
+FIELDS = ("msgs_per_hour", "messages", "sentiment", "sentiment_weighted")
+
+
+@dataclass(frozen=True)
+class Signal:
+    field: str
+    kind: str = "level"        # "level" | "change"
+    lookback: int = 20
+    threshold: float = 2.0
+    direction: int = 1         # +1: spikes up, -1: drops
+
+    @property
+    def name(self) -> str:
+        arrow = "+" if self.direction > 0 else "-"
+        return f"{self.field}:{self.kind}:z{arrow}{self.threshold:g}/{self.lookback}"
+
+
+def grid(fields=FIELDS, kinds=("level", "change"), lookbacks=(10, 20, 60), thresholds=(1.5, 2.0, 2.5, 3.0),
+         directions=(1, -1)) -> list:
+    """Every combination as a Signal (defaults: 4 x 2 x 3 x 4 x 2 = 192)."""
+    return [Signal(*combo) for combo in itertools.product(fields, kinds, lookbacks, thresholds, directions)]
+
+
+def _window_sums(a: np.ndarray, lookback: int) -> np.ndarray:
+    """Sum over the `lookback` rows before each row (all columns at once)."""
+    c = np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+    hi = np.arange(a.shape[0])
+    return c[hi] - c[np.maximum(hi - lookback, 0)]
+
+
+def zscore(values: pd.DataFrame, kind: str, lookback: int) -> np.ndarray:
+    """Sessions x tickers z-score against the previous `lookback` sessions (the current one excluded)."""
+    x = (values.diff() if kind == "change" else values).to_numpy(np.float64)
+    ok = np.isfinite(x)
+    x0 = np.where(ok, x, 0.0)
+    n = _window_sums(ok.astype(np.float64), lookback)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = _window_sums(x0, lookback) / n
+        sq = _window_sums(x0 * x0, lookback) / n
+        var = (sq - mean * mean) * n / (n - 1)
+        # Running sums leave rounding noise where the window is flat: treat that as zero variance
+        std = np.sqrt(np.where(var > 1e-10 * sq, var, np.nan))
+        z = (x - mean) / std
+    return np.where(n >= max(lookback // 2, 3), z, np.nan)
+
+
+def event_mask(z: np.ndarray, threshold: float, direction: int) -> np.ndarray:
+    """True where direction * z crosses the threshold from below."""
+    hit = np.nan_to_num(direction * z, nan=-np.inf) >= threshold
+    prev = np.vstack([np.zeros((1, z.shape[1]), bool), hit[:-1]])
+    return hit & ~prev
+
+
+def abnormal_returns(returns: pd.DataFrame, benchmark: pd.Series | None = None) -> np.ndarray:
+    """Sessions x tickers returns minus the benchmark, else minus the mean of the other tickers that session."""
+    if benchmark is not None:
+        return returns.sub(benchmark.reindex(returns.index), axis=0).to_numpy(np.float64)
+    r = returns.to_numpy(np.float64)
+    ok = np.isfinite(r)
+    r0 = np.where(ok, r, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        others = (r0.sum(axis=1, keepdims=True) - r0) / (ok.sum(axis=1, keepdims=True) - ok)
+    return r - others
+
+
+def event_cars(abnormal: np.ndarray, t: np.ndarray, n: np.ndarray, horizons=HORIZONS) -> np.ndarray:
+    """(events, horizons) cumulative abnormal returns over t+1 .. t+h; NaN when the window is incomplete."""
+    T = abnormal.shape[0]
+    valid = np.isfinite(abnormal)
+    c = np.vstack([np.zeros((1, abnormal.shape[1])), np.cumsum(np.where(valid, abnormal, 0.0), axis=0)])
+    k = np.vstack([np.zeros((1, abnormal.shape[1]), int), np.cumsum(valid, axis=0)])
+    h = np.asarray(horizons)
+    end = t[:, None] + h[None, :] + 1          # c[i] is the sum of rows < i
+    inside = end <= T
+    end = np.minimum(end, T)
+    cars = c[end, n[:, None]] - c[t[:, None] + 1, n[:, None]]
+    complete = (k[end, n[:, None]] - k[t[:, None] + 1, n[:, None]]) == h[None, :]
+    return np.where(inside & complete, cars, np.nan)
+
+
+def cluster_bootstrap(cars: np.ndarray, dates: np.ndarray, n_boot: int = N_BOOT, ci: float = CI, seed: int = 0):
+    """(low, high) per horizon for the mean CAR, resampling event dates with replacement."""
+    ok = np.isfinite(cars)
+    _, cluster = np.unique(dates, return_inverse=True)
+    n_clusters = cluster.max() + 1
+    sums = np.zeros((n_clusters, cars.shape[1]))
+    counts = np.zeros((n_clusters, cars.shape[1]))
+    np.add.at(sums, cluster, np.where(ok, cars, 0.0))
+    np.add.at(counts, cluster, ok)
+    # How often each date is drawn per resample; the resampled sums are then one matrix product
+    weights = np.random.default_rng(seed).multinomial(n_clusters, np.full(n_clusters, 1.0 / n_clusters), size=n_boot)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (weights @ sums) / (weights @ counts)   # (n_boot, horizons)
+    alpha = (1 - ci) / 2
+    return np.nanquantile(means, alpha, axis=0), np.nanquantile(means, 1 - alpha, axis=0)
+
+
+def evaluate(signal: Signal, panel: dict, abnormal: np.ndarray, horizons=HORIZONS, n_boot: int = N_BOOT,
+             z: np.ndarray | None = None) -> list:
+    """One row per horizon: events, mean CAR, t-stat, hit rate and bootstrap interval."""
+    if z is None:
+        z = zscore(panel[signal.field], signal.kind, signal.lookback)
+    t, n = np.nonzero(event_mask(z, signal.threshold, signal.direction))
+    cars = event_cars(abnormal, t, n, horizons)
+    rows = []
+    low = high = np.full(len(horizons), np.nan)
+    if len(t) >= MIN_EVENTS:
+        low, high = cluster_bootstrap(cars, t, n_boot)
+    for j, h in enumerate(horizons):
+        x = cars[:, j][np.isfinite(cars[:, j])]
+        sd = x.std(ddof=1) if len(x) > 1 else np.nan
+        rows.append({
+            "signal": signal.name, **asdict(signal), "horizon": h,
+            "events": len(x), "tickers": len(np.unique(n[np.isfinite(cars[:, j])])),
+            "mean_car": x.mean() if len(x) else np.nan,
+            "t_stat": x.mean() / (sd / np.sqrt(len(x))) if len(x) > 1 and sd > 0 else np.nan,
+            "hit_rate": (x > 0).mean() if len(x) else np.nan,
+            "ci_low": low[j], "ci_high": high[j],
+        })
+    return rows
+
+
+# ---------------------------------------------------------------- process pool
+
+_WORKER = {}
+
+
+def _init_worker(panel: dict, abnormal: np.ndarray, horizons, n_boot: int):
+    _WORKER.update(panel=panel, abnormal=abnormal, horizons=horizons, n_boot=n_boot, z={})
+
+
+def _evaluate_in_worker(signal: Signal) -> list:
+    w = _WORKER
+    key = (signal.field, signal.kind, signal.lookback)
+    if key not in w["z"]:
+        w["z"][key] = zscore(w["panel"][signal.field], signal.kind, signal.lookback)
+    return evaluate(signal, w["panel"], w["abnormal"], w["horizons"], w["n_boot"], z=w["z"][key])
+
+
+def run(signals, source: str = "reddit", horizons=HORIZONS, n_boot: int = N_BOOT, workers: int | None = None,
+        panel: dict | None = None, benchmark: str | None = BENCHMARK) -> pd.DataFrame:
+    """Evaluate every signal over all tickers; one row per (signal, horizon)."""
+    panel = panel if panel is not None else daily_panel(source)
+    if not panel:
+        return pd.DataFrame()
+    returns = panel["returns"]
+    bench = None
+    if benchmark:
+        px = get_prices(benchmark, returns.index.min(), returns.index.max())
+        if not px.empty:
+            bench = np.log(px["Close"].astype(np.float64)).diff()
+    abnormal = abnormal_returns(returns, bench)
+    fields = {s.field for s in signals}
+    panel = {f: panel[f] for f in fields}
+
+    # Same (field, kind, lookback) next to each other so a worker's z-score memo gets reused
+    signals = sorted(signals, key=lambda s: (s.field, s.kind, s.lookback, s.threshold, s.direction))
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        _init_worker(panel, abnormal, horizons, n_boot)
+        rows = [r for s in signals for r in _evaluate_in_worker(s)]
+    else:
+        chunk = max(1, len(signals) // (workers * 4))
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(panel, abnormal, horizons, n_boot)) as pool:
+            rows = [r for result in pool.map(_evaluate_in_worker, signals, chunksize=chunk) for r in result]
+    out = pd.DataFrame(rows)
+    out["benchmark"] = benchmark if bench is not None else "equal-weight others"
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event study of volume/sentiment signals against abnormal returns")
+    parser.add_argument("--source", choices=["reddit", "stocktwits", "all"], default="reddit", help="all: both sources pooled")
+    parser.add_argument("--fields", nargs="+", choices=FIELDS, default=list(FIELDS))
+    parser.add_argument("--horizons", nargs="+", type=int, default=list(HORIZONS))
+    parser.add_argument("--boot", type=int, default=N_BOOT, help="bootstrap resamples per signal")
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    results = run(grid(fields=args.fields), args.source, tuple(args.horizons), args.boot, args.workers)
+    if results.empty:
+        print("No tickers with prices and volume/sentiment history")
+        sys.exit(0)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = OUT_DIR / f"{args.source}_{started:%Y%m%d_%H%M%S}.csv"
+    results.round(6).to_csv(out_path, index=False)
+    print(f"{results['signal'].nunique()} signal(s) evaluated in {(datetime.now() - started).total_seconds():.1f}s")
+    top = results[results["events"] >= MIN_EVENTS].assign(abs_t=lambda d: d["t_stat"].abs()).nlargest(20, "abs_t")
+    with pd.option_context("display.width", 200):
+        print(top[["signal", "horizon", "events", "tickers", "mean_car", "t_stat", "hit_rate", "ci_low", "ci_high"]].round(4).to_string(index=False))
+    print(f"Saved: {out_path}")
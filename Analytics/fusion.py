@@ -0,0 +1,173 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage import catalog
+from Storage.lake import has_layer, read_lake
+from Sentiment_Analysis.daily_aggregates import AGG_DIR, STAT_COLUMNS, aggregate_path, merge, finalize
+
+# Cross-source fusion: Reddit and Stocktwits in one table, one row per (symbol, date):
+#
+#   data/aggregates/fusion/{SYMBOL}.parquet
+#
+# Both sources are first normalized to the same long schemas, read column-wise in one pass per source set:
+#   volume     source, symbol, date, messages, msgs_per_hour   (volume lake, else the volume history CSVs)
+#   sentiment  source, symbol, date, STAT_COLUMNS              (materialized daily aggregates)
+# The per-message differences (message vs. title/text, upvote weights or none, summaries with or without a
+# date) are already resolved by daily_aggregates, whose rows are additive sufficient statistics.
+#
+# Columns: {source}_messages, {source}_msgs_per_hour, {source}_n, {source}_sentiment,
+# {source}_sentiment_weighted per source, then the blend:
+#   messages, msgs_per_hour   summed over sources
+#   STAT_COLUMNS + finalize() pooled over sources (every post counts once: 'mean', 'weighted', shares, ...)
+#   sentiment_balanced        average of the per-source means (each source counts once, whatever its volume)
+#   sources                   number of sources with posts or messages that day
+# refresh(symbol) rebuilds one ticker (pipeline stage), rebuild() all of them.
+
+FUSION_DIR = PROJECT_ROOT / "data" / "aggregates" / "fusion"
+SOURCES = ("reddit", "stocktwits")
+COMPRESSION = "zstd"
+KEYS = ["symbol", "date"]
+VOLUME_COLUMNS = ["source", "symbol", "date", "messages", "msgs_per_hour"]
+PER_SOURCE = ["messages", "msgs_per_hour", "n", "sentiment", "sentiment_weighted"]
+
+
+def load_volume(sources=SOURCES, symbols=None) -> pd.DataFrame:
+    """Daily message counts of every ticker (or `symbols`) of the sources, in the normalized schema."""
+    symbols = [s.upper() for s in symbols] if symbols else None
+    frames = []
+    lake_sources = [s for s in sources if has_layer("volume", s)]
+    if lake_sources:
+        frames.append(read_lake("volume", sources=lake_sources, symbols=symbols, columns=VOLUME_COLUMNS))
+    for source in sources:
+        if source in lake_sources:
+            continue
+        folder = PROJECT_ROOT / "data" / "volume_history" / source
+        if symbols:
+            files = [folder / f"{s}.csv" for s in symbols]
+        else:
+            files = catalog.find("volume", source) if catalog.is_populated() else sorted(folder.glob("*.csv"))
+        for f in files:
+            if Path(f).exists():
+                df = pd.read_csv(f, usecols=["symbol", "date_utc", "messages", "msgs_per_hour"])
+                frames.append(df.rename(columns={"date_utc": "date"}).assign(source=source))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=VOLUME_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)[VOLUME_COLUMNS]
+    df["symbol"] = df["symbol"].astype(str).str.upper()
+    df["date"] = pd.to_datetime(df["date"])
+    return df[df["symbol"].isin(symbols)] if symbols else df
+
+
+def load_sentiment(sources=SOURCES, symbols=None, columns=STAT_COLUMNS) -> pd.DataFrame:
+    """source, symbol, date and the additive statistics from the daily aggregates of the sources."""
+    frames = []
+    for source in sources:
+        files = [aggregate_path(source, s) for s in symbols] if symbols else sorted((AGG_DIR / source).glob("*.csv"))
+        frames += [pd.read_csv(f, usecols=["source", "symbol", "date"] + list(columns)) for f in files if f.exists()]
+    if not frames:
+        return pd.DataFrame(columns=["source", "symbol", "date"] + list(columns))
+    df = pd.concat(frames, ignore_index=True)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def fuse(volume: pd.DataFrame, sentiment: pd.DataFrame, sources=SOURCES) -> pd.DataFrame:
+    """The fused (symbol, date) table from the normalized long frames (any number of tickers at once)."""
+    per = finalize(merge([sentiment], keys=["source"] + KEYS))
+    per = per.rename(columns={"mean": "sentiment", "weighted": "sentiment_weighted"})
+    vol = volume.groupby(["source"] + KEYS, sort=False)[["messages", "msgs_per_hour"]].sum().reset_index()
+    long = vol.merge(per[["source"] + KEYS + ["n", "sentiment", "sentiment_weighted"]], on=["source"] + KEYS, how="outer")
+    if long.empty:
+        return pd.DataFrame()
+
+    wide = long.set_index(KEYS + ["source"])[PER_SOURCE].unstack("source")
+    wide = wide.reindex(columns=pd.MultiIndex.from_product([PER_SOURCE, list(sources)]))
+    wide.columns = [f"{src}_{metric}" for metric, src in wide.columns]
+    # float throughout: a source (or all sentiment) missing for a ticker must not change the column types
+    wide = wide[[f"{src}_{metric}" for src in sources for metric in PER_SOURCE]].astype(np.float64)
+
+    pooled = finalize(merge([sentiment], keys=KEYS)).set_index(KEYS)
+    out = wide.join(pooled[STAT_COLUMNS + ["mean", "weighted", "std", "pos_share", "neg_share", "neu_share", "confidence_mean"]])
+    out = out.rename(columns={"mean": "sentiment", "weighted": "sentiment_weighted", "std": "sentiment_std"})
+    out = out.astype(np.float64)
+    out.insert(0, "messages", wide[[f"{s}_messages" for s in sources]].sum(axis=1, min_count=1))
+    out.insert(1, "msgs_per_hour", wide[[f"{s}_msgs_per_hour" for s in sources]].sum(axis=1, min_count=1))
+    out["sentiment_balanced"] = wide[[f"{s}_sentiment" for s in sources]].mean(axis=1)
+    active = [(wide[f"{s}_messages"].fillna(0) > 0) | (wide[f"{s}_n"].fillna(0) > 0) for s in sources]
+    out["sources"] = np.sum(active, axis=0)
+    return out.reset_index().sort_values(KEYS, ignore_index=True)
+
+
+def fusion_path(symbol: str) -> Path:
+    return FUSION_DIR / f"{symbol.upper()}.parquet"
+
+
+def _write(symbol: str, df: pd.DataFrame) -> Path:
+    path = fusion_path(symbol)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    df.to_parquet(tmp, index=False, compression=COMPRESSION)
+    os.replace(tmp, path)
+    return path
+
+
+def refresh(symbol: str, sources=SOURCES) -> Path | None:
+    """Rebuild one ticker's rows from both sources (None if neither has data for it)."""
+    symbol = symbol.upper()
+    table = fuse(load_volume(sources, [symbol]), load_sentiment(sources, [symbol]), sources)
+    if table.empty:
+        return None
+    return _write(symbol, table)
+
+
+def safe_refresh(symbol: str):
+    """refresh() for pipeline stages: a failed fusion update only warns."""
+    try:
+        path = refresh(symbol)
+        print(f"Updated fusion table: {path}" if path else f"⚠ No volume or sentiment to fuse for {symbol}")
+    except Exception as e:
+        print(f"⚠ Fusion update failed for {symbol}: {e}")
+
+
+def rebuild(sources=SOURCES) -> list:
+    """Every ticker in one pass over the inputs, then one file per ticker."""
+    table = fuse(load_volume(sources), load_sentiment(sources), sources)
+    if table.empty:
+        return []
+    return [_write(sym, rows) for sym, rows in table.groupby("symbol", sort=True)]
+
+
+def load_fused(symbols=None, columns=None, start=None, end=None) -> pd.DataFrame:
+    """The fused rows of `symbols` (default: all stored tickers), optionally only some columns and dates."""
+    files = [fusion_path(s) for s in symbols] if symbols else sorted(FUSION_DIR.glob("*.parquet"))
+    files = [f for f in files if f.exists()]
+    if not files:
+        return pd.DataFrame()
+    if columns is not None:
+        columns = list(dict.fromkeys(KEYS + list(columns)))
+    df = pd.concat([pd.read_parquet(f, columns=columns) for f in files], ignore_index=True)
+    if start is not None:
+        df = df[df["date"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["date"] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the cross-source (symbol, date) fusion table")
+    parser.add_argument("--symbols", nargs="+", help="default: every ticker of both sources")
+    args = parser.parse_args()
+    if args.symbols:
+        written = [p for p in (refresh(s) for s in args.symbols) if p]
+    else:
+        written = rebuild()
+    print(f"✓ {len(written)} fusion file(s) written to {FUSION_DIR}")
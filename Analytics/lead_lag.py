@@ -0,0 +1,207 @@
+import sys
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Analytics.panel import daily_panel
+from Analytics.fusion import SOURCES
+from Storage.lake import LAKE_ROOT
+from Storage.price_store import PRICE_DIR
+from Sentiment_Analysis.daily_aggregates import AGG_DIR
+
+# Lead/lag statistics between social signals and daily returns, for every ticker at once.
+#
+# Signals (sessions x tickers, see panel.py):
+#   sentiment   mean signed FinBERT sentiment per post
+#   volume      change in log(1 + messages) from the previous session
+#
+# Per signal and ticker:
+#   rolling     corr(signal_t, return_t) over the last `window` sessions
+#   xcorr       corr(signal_t, return_t+k) for k = -MAX_LAG..MAX_LAG (k > 0: the signal leads returns)
+#   granger     F-test: do GRANGER_LAGS lags of the signal improve an AR model of returns (and the reverse)?
+#
+# Lags are stacked along a new axis and all tickers share one array, so each statistic is a handful of
+# masked NumPy reductions (the Granger regressions are batched normal equations, one small solve per
+# ticker). Missing days are skipped pairwise. Results are cached per (source, window, lags) under
+# data/analytics/lead_lag/ and recomputed only when an input file (aggregates, volume, prices) changed.
+
+CACHE_DIR = PROJECT_ROOT / "data" / "analytics" / "lead_lag"
+WINDOWS = (20, 60, 120)
+DEFAULT_WINDOW = 60
+MAX_LAG = 5
+GRANGER_LAGS = 2
+MIN_OBS = 30
+
+
+def signal_panels(panel: dict) -> dict:
+    return {
+        "sentiment": panel["sentiment"],
+        "volume": np.log1p(panel["messages"]).diff(),
+    }
+
+
+def _shift(a: np.ndarray, k: int) -> np.ndarray:
+    """a shifted down by k rows along the time axis (row t holds a[t - k]), NaN-filled."""
+    out = np.full_like(a, np.nan)
+    if k > 0:
+        out[k:] = a[:-k]
+    elif k < 0:
+        out[:k] = a[-k:]
+    else:
+        out[:] = a
+    return out
+
+
+def nan_corr(a: np.ndarray, b: np.ndarray, min_obs: int = MIN_OBS):
+    """Pearson correlation over the time axis (-2) using rows where both are finite; returns (corr, n)."""
+    ok = np.isfinite(a) & np.isfinite(b)
+    n = ok.sum(axis=-2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ma = np.where(ok, a, 0.0).sum(axis=-2) / n
+        mb = np.where(ok, b, 0.0).sum(axis=-2) / n
+        da = np.where(ok, a - np.expand_dims(ma, -2), 0.0)
+        db = np.where(ok, b - np.expand_dims(mb, -2), 0.0)
+        r = (da * db).sum(axis=-2) / np.sqrt((da * da).sum(axis=-2) * (db * db).sum(axis=-2))
+    return np.where(n >= min_obs, r, np.nan), n
+
+
+def cross_correlation(signal: pd.DataFrame, returns: pd.DataFrame, max_lag: int = MAX_LAG) -> pd.DataFrame:
+    """Long frame symbol, lag, corr, n with corr(signal_t, return_t+lag)."""
+    lags = np.arange(-max_lag, max_lag + 1)
+    r = returns.to_numpy(np.float64)
+    shifted = np.stack([_shift(r, -k) for k in lags])          # (lags, T, N): row t holds return_t+k
+    corr, n = nan_corr(signal.to_numpy(np.float64)[None], shifted)
+    return pd.DataFrame({
+        "symbol": np.tile(signal.columns, len(lags)),
+        "lag": np.repeat(lags, signal.shape[1]),
+        "corr": corr.ravel(),
+        "n": n.ravel(),
+    })
+
+
+def rolling_correlation(signal: pd.DataFrame, returns: pd.DataFrame, window: int) -> pd.DataFrame:
+    """Sessions x symbols same-day correlation over the trailing window (at least half of it observed)."""
+    return signal.rolling(window, min_periods=max(window // 2, 3)).corr(returns)
+
+
+def _batched_rss(y: np.ndarray, z: np.ndarray, ok: np.ndarray) -> np.ndarray:
+    """Residual sum of squares of per-ticker OLS fits. y: (T, N), z: (T, N, K), ok: (T, N) rows to use."""
+    zm = np.where(ok[..., None], z, 0.0)
+    ym = np.where(ok, y, 0.0)
+    ztz = np.einsum("tnk,tnj->nkj", zm, zm)
+    zty = np.einsum("tnk,tn->nk", zm, ym)
+    beta = np.einsum("nkj,nj->nk", np.linalg.pinv(ztz), zty)
+    resid = ym - np.einsum("tnk,nk->tn", zm, beta)
+    return (resid * resid).sum(axis=0)
+
+
+def f_pvalue(f, df1, df2):
+    from scipy.special import fdtrc
+    return fdtrc(df1, df2, f)
+
+
+def granger(cause: pd.DataFrame, effect: pd.DataFrame, lags: int = GRANGER_LAGS) -> pd.DataFrame:
+    """Per symbol F statistic and p-value for 'lags of cause help predict effect beyond effect's own lags'."""
+    y = effect.to_numpy(np.float64)
+    x = cause.to_numpy(np.float64)
+    own = np.stack([_shift(y, k) for k in range(1, lags + 1)], axis=-1)
+    other = np.stack([_shift(x, k) for k in range(1, lags + 1)], axis=-1)
+    restricted = np.concatenate([np.ones(y.shape + (1,)), own], axis=-1)
+    full = np.concatenate([restricted, other], axis=-1)
+    ok = np.isfinite(y) & np.isfinite(full).all(axis=-1)
+
+    rss_r, rss_u = _batched_rss(y, restricted, ok), _batched_rss(y, full, ok)
+    n = ok.sum(axis=0)
+    df2 = n - full.shape[-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        f = ((rss_r - rss_u) / lags) / (rss_u / df2)
+    f = np.where((n >= MIN_OBS) & (df2 > 0), f, np.nan)
+    p = np.where(np.isfinite(f), f_pvalue(np.nan_to_num(f), lags, np.maximum(df2, 1)), np.nan)
+    return pd.DataFrame({"symbol": effect.columns, "f": f, "p": p, "n": n})
+
+
+def analyze(source: str, window: int = DEFAULT_WINDOW, max_lag: int = MAX_LAG, granger_lags: int = GRANGER_LAGS,
+            symbols=None, fetch_missing: bool = False) -> dict:
+    """{'summary', 'xcorr', 'rolling'} long frames with a 'signal' column, for every ticker with prices."""
+    panel = daily_panel(source, symbols, fetch_missing=fetch_missing)
+    if not panel:
+        return {"summary": pd.DataFrame(), "xcorr": pd.DataFrame(), "rolling": pd.DataFrame()}
+    returns = panel["returns"]
+    summaries, xcorrs, rollings = [], [], []
+    for name, signal in signal_panels(panel).items():
+        xc = cross_correlation(signal, returns, max_lag).assign(signal=name)
+        roll = rolling_correlation(signal, returns, window)
+        fwd = granger(signal, returns, granger_lags)
+        rev = granger(returns, signal, granger_lags)
+
+        lead = xc[xc["lag"] > 0].dropna(subset=["corr"])
+        best = lead.loc[lead["corr"].abs().groupby(lead["symbol"]).idxmax()] if not lead.empty else lead
+        summary = pd.DataFrame({"symbol": returns.columns, "signal": name})
+        summary = summary.merge(xc[xc["lag"] == 0][["symbol", "corr", "n"]].rename(columns={"corr": "corr_lag0", "n": "obs"}), on="symbol", how="left")
+        summary = summary.merge(best[["symbol", "lag", "corr"]].rename(columns={"lag": "best_lead", "corr": "best_lead_corr"}), on="symbol", how="left")
+        summary = summary.merge(fwd.rename(columns={"f": "granger_f", "p": "granger_p"}).drop(columns="n"), on="symbol", how="left")
+        summary = summary.merge(rev[["symbol", "p"]].rename(columns={"p": "reverse_p"}), on="symbol", how="left")
+        summary["rolling_last"] = roll.ffill().iloc[-1].reindex(summary["symbol"]).to_numpy() if len(roll) else np.nan
+
+        summaries.append(summary)
+        xcorrs.append(xc)
+        rollings.append(roll.rename_axis(index="date", columns="symbol").stack().rename("corr").reset_index().assign(signal=name))
+    return {
+        "summary": pd.concat(summaries, ignore_index=True),
+        "xcorr": pd.concat(xcorrs, ignore_index=True),
+        "rolling": pd.concat(rollings, ignore_index=True),
+    }
+
+
+def input_token(source: str) -> str:
+    """Hash of (path, mtime, size) of every input file: changes whenever the pipeline wrote something."""
+    files = list(PRICE_DIR.glob("*.parquet"))
+    for src in (SOURCES if source == "all" else (source,)):
+        files += list((AGG_DIR / src).glob("*.csv"))
+        files += list((PROJECT_ROOT / "data" / "volume_history" / src).glob("*.csv"))
+        files += list((LAKE_ROOT / "volume" / f"source={src}").rglob("*.parquet"))
+    h = hashlib.blake2b(digest_size=16)
+    for f in sorted(files):
+        st = f.stat()
+        h.update(f"{f}|{st.st_mtime_ns}|{st.st_size}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def cached_analyze(source: str, window: int = DEFAULT_WINDOW, max_lag: int = MAX_LAG,
+                   granger_lags: int = GRANGER_LAGS) -> dict:
+    """analyze() through the on-disk cache: recomputed only when an input file changed."""
+    folder = CACHE_DIR / f"{source}_w{window}_l{max_lag}_g{granger_lags}"
+    token = input_token(source)
+    token_path = folder / "token.txt"
+    names = ("summary", "xcorr", "rolling")
+    if token_path.exists() and token_path.read_text(encoding="utf-8") == token and all((folder / f"{n}.parquet").exists() for n in names):
+        return {n: pd.read_parquet(folder / f"{n}.parquet") for n in names}
+
+    result = analyze(source, window, max_lag, granger_lags)
+    folder.mkdir(parents=True, exist_ok=True)
+    for n in names:
+        result[n].to_parquet(folder / f"{n}.parquet", index=False)
+    token_path.write_text(token, encoding="utf-8")
+    return result
+
+
+def ticker_results(source: str, symbol: str, window: int = DEFAULT_WINDOW) -> dict:
+    """One ticker's slice of the cached results."""
+    result = cached_analyze(source, window)
+    return {n: df[df["symbol"] == symbol.upper()] if not df.empty else df for n, df in result.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentiment/volume vs. returns lead-lag statistics for all tickers")
+    parser.add_argument("--source", choices=["reddit", "stocktwits", "all"], default="reddit")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    args = parser.parse_args()
+    summary = cached_analyze(args.source, args.window)["summary"]
+    with pd.option_context("display.max_rows", 500, "display.width", 200):
+        print(summary.sort_values(["signal", "granger_p"]).round(4).to_string(index=False) if not summary.empty else "No tickers with prices")
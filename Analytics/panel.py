@@ -0,0 +1,96 @@
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Analytics import fusion
+from Storage.price_store import get_prices
+
+# Session-aligned daily panels for the analytics modules: one DataFrame per field, trading sessions x
+# tickers, so statistics for every ticker come out of the same array operations.
+#
+# Volume and sentiment are counted per UTC calendar day; each day is assigned to the first session on or
+# after it, so weekend and holiday chatter lands on the next trading day. Additive statistics are summed
+# over the assigned days and the means recomputed from the sums; msgs_per_hour keeps the day's peak.
+# Returns are close-to-close log returns from the local price store (Yahoo closes are split-adjusted).
+#
+# Volume and sentiment come from the normalized loaders of fusion.py; source "all" pools both sources.
+#
+# fields: returns, messages, msgs_per_hour, sentiment (mean per post), sentiment_weighted (upvote-weighted)
+
+STAT_FIELDS = ["n", "sum_signed", "sum_weight", "sum_weighted_signed"]
+
+
+def _sources(source: str) -> tuple:
+    return fusion.SOURCES if source == "all" else (source,)
+
+
+def load_volume(source: str) -> pd.DataFrame:
+    """symbol, date, messages, msgs_per_hour for every ticker of a source (summed over sources for "all")."""
+    df = fusion.load_volume(_sources(source))
+    if source == "all":
+        df = df.groupby(["symbol", "date"], sort=False)[["messages", "msgs_per_hour"]].sum().reset_index()
+    return df.drop(columns="source", errors="ignore")
+
+
+def load_sentiment(source: str) -> pd.DataFrame:
+    """symbol, date and the additive sentiment statistics from the materialized daily aggregates."""
+    return fusion.load_sentiment(_sources(source), columns=STAT_FIELDS).drop(columns="source")
+
+
+def load_returns(symbols, start=None, end=None, fetch_missing: bool = False) -> pd.DataFrame:
+    """Sessions x symbols log returns from the price store (symbols without prices are left out)."""
+    closes = {}
+    for sym in symbols:
+        px = get_prices(sym, start, end, fetch_missing=fetch_missing)
+        if not px.empty:
+            closes[sym] = px["Close"].astype(np.float64)
+    if not closes:
+        return pd.DataFrame()
+    close = pd.DataFrame(closes).sort_index()
+    return np.log(close / close.shift(1))
+
+
+def to_sessions(df: pd.DataFrame, sessions: pd.DatetimeIndex) -> pd.DataFrame:
+    """Replace each row's calendar 'date' by the first session on or after it (rows outside the sessions dropped)."""
+    dates = df["date"].to_numpy()
+    pos = sessions.searchsorted(dates, side="left")
+    keep = (pos < len(sessions)) & (dates >= sessions[0].to_datetime64()) if len(sessions) else np.zeros(len(df), bool)
+    out = df[keep].copy()
+    out["date"] = sessions[pos[keep]]
+    return out
+
+
+def _wide(df: pd.DataFrame, value: str, agg: str, sessions, symbols) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(np.nan, index=sessions, columns=symbols)
+    return df.pivot_table(index="date", columns="symbol", values=value, aggfunc=agg).reindex(index=sessions, columns=symbols)
+
+
+def daily_panel(source: str, symbols=None, start=None, end=None, fetch_missing: bool = False) -> dict:
+    """{field: sessions x symbols DataFrame} for the tickers with prices and volume or sentiment data."""
+    volume, sentiment = load_volume(source), load_sentiment(source)
+    if symbols is None:
+        symbols = sorted(set(volume["symbol"]) | set(sentiment["symbol"]))
+    symbols = [s.upper() for s in symbols]
+    returns = load_returns(symbols, start, end, fetch_missing)
+    if returns.empty:
+        return {}
+    sessions, symbols = returns.index, list(returns.columns)
+
+    volume = to_sessions(volume[volume["symbol"].isin(symbols)], sessions)
+    sentiment = to_sessions(sentiment[sentiment["symbol"].isin(symbols)], sessions)
+    sums = {f: _wide(sentiment, f, "sum", sessions, symbols) for f in STAT_FIELDS}
+    panel = {
+        "returns": returns,
+        "messages": _wide(volume, "messages", "sum", sessions, symbols),
+        "msgs_per_hour": _wide(volume, "msgs_per_hour", "max", sessions, symbols),
+        "sentiment": sums["sum_signed"] / sums["n"].where(sums["n"] > 0),
+        "sentiment_weighted": sums["sum_weighted_signed"] / sums["sum_weight"].where(sums["sum_weight"] > 0),
+        "posts": sums["n"],
+    }
+    return panel
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing as mp
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# Historical backfill through a durable work queue (SQLite, data/backfill.sqlite).
+#
+#   python Automation/backfill.py enqueue --source reddit --symbols NVDA AMD --since 2025-01-01
+#   python Automation/backfill.py work --workers 3        # on any number of machines sharing data/
+#   python Automation/backfill.py status
+#
+# A unit is (source, symbol, since). Reddit search only pages backwards from now, so `since` is where paging
+# stops: the worker scrapes every subreddit of the symbol back to that date, then runs FinBERT and volume on
+# the result. Units are per symbol because all subreddits of a symbol append to the same daily CSV.
+# Reddit search only returns so many results per query, so a unit where some subreddit did not page down to
+# `since` ends as 'partial' instead of 'done'; its result records the oldest post reached per subreddit.
+# Stocktwits has no history endpoint, a unit there is one scrape of the current stream.
+#
+# Workers claim a unit with a lease (LEASE_SEC) renewed by a heartbeat thread while it runs. A crashed
+# worker's lease runs out and the unit is claimed again; a failing unit is retried up to MAX_ATTEMPTS times.
+# Note: SQLite locking needs a filesystem with working byte-range locks (local disk, SMB; not every NFS).
+# All workers share one Reddit OAuth app (100 requests/min), so keep --workers small for Reddit.
+
+QUEUE_PATH = PROJECT_ROOT / "data" / "backfill.sqlite"
+LEASE_SEC = 10 * 60
+HEARTBEAT_SEC = 60
+MAX_ATTEMPTS = 3
+IDLE_POLL_SEC = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    source        TEXT NOT NULL,
+    symbol        TEXT NOT NULL,
+    since         TEXT NOT NULL,              -- YYYY-MM-DD
+    status        TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done | partial | failed
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    error         TEXT,
+    result        TEXT,
+    created_utc   TEXT,
+    updated_utc   TEXT,
+    UNIQUE (source, symbol, since)
+);
+CREATE INDEX IF NOT EXISTS ix_units_claim ON units (status, lease_expires);
+"""
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def connect(path: Path = QUEUE_PATH) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path, timeout=60, isolation_level=None)  # explicit BEGIN IMMEDIATE below
+    con.row_factory = sqlite3.Row
+    con.executescript(SCHEMA)
+    return con
+
+
+def enqueue(source: str, symbols, since: str, con: sqlite3.Connection | None = None) -> int:
+    """Add one unit per symbol; units that already exist are left alone. Returns how many were added."""
+    own = con is None
+    con = con or connect()
+    before = con.total_changes
+    con.execute("BEGIN IMMEDIATE")
+    for sym in symbols:
+        con.execute("INSERT OR IGNORE INTO units (source, symbol, since, created_utc, updated_utc) VALUES (?,?,?,?,?)",
+                    (source, sym.strip().upper(), since, _now_iso(), _now_iso()))
+    con.execute("COMMIT")
+    added = con.total_changes - before
+    if own:
+        con.close()
+    return added
+
+
+def claim(owner: str, con: sqlite3.Connection) -> sqlite3.Row | None:
+    """Lease the oldest pending (or expired) unit to `owner`, atomically across processes."""
+    now = time.time()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        # A worker that died on the last attempt leaves an expired lease behind
+        con.execute("UPDATE units SET status = 'failed', error = COALESCE(error, 'lease expired'), lease_owner = NULL, "
+                    "updated_utc = ? WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (_now_iso(), now, MAX_ATTEMPTS))
+        row = con.execute(
+            "SELECT * FROM units WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+            "AND attempts < ? ORDER BY id LIMIT 1", (now, MAX_ATTEMPTS)).fetchone()
+        if row is not None:
+            con.execute("UPDATE units SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                        "updated_utc = ? WHERE id = ?", (owner, now + LEASE_SEC, _now_iso(), row["id"]))
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
+    return row
+
+
+def renew(unit_id: int, owner: str, con: sqlite3.Connection) -> bool:
+    """Extend our lease; False if the unit is no longer ours (lease expired and was taken over)."""
+    cur = con.execute("UPDATE units SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                      (time.time() + LEASE_SEC, unit_id, owner))
+    return cur.rowcount == 1
+
+
+def finish(unit_id: int, owner: str, con: sqlite3.Connection, result=None, error: str | None = None,
+           partial: bool = False):
+    """Mark done (partial: ran, but did not reach `since`), or put back for a retry (failed for good after MAX_ATTEMPTS)."""
+    if error is None:
+        con.execute("UPDATE units SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+                    "updated_utc = ? WHERE id = ? AND lease_owner = ?",
+                    ("partial" if partial else "done", json.dumps(result, default=str), _now_iso(), unit_id, owner))
+    else:
+        con.execute("UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, "
+                    "lease_owner = NULL, lease_expires = NULL, updated_utc = ? WHERE id = ? AND lease_owner = ?",
+                    (MAX_ATTEMPTS, error, _now_iso(), unit_id, owner))
+
+
+def status(con: sqlite3.Connection | None = None) -> list:
+    own = con is None
+    con = con or connect()
+    rows = con.execute("SELECT source, status, COUNT(*) AS n FROM units GROUP BY source, status ORDER BY source, status").fetchall()
+    if own:
+        con.close()
+    return [tuple(r) for r in rows]
+
+
+def reset_failed(con: sqlite3.Connection | None = None) -> int:
+    own = con is None
+    con = con or connect()
+    n = con.execute("UPDATE units SET status = 'pending', attempts = 0, updated_utc = ? WHERE status = 'failed'",
+                    (_now_iso(),)).rowcount
+    if own:
+        con.close()
+    return n
+
+
+# ---------------------------------------------------------------- executing a unit
+
+def unit_stages(source: str, symbol: str, since: str, token=None, depth: dict | None = None) -> list:
+    """
+    Scrape (back to `since`) + FinBERT + volume for one symbol, as pipeline stages.
+    token is a daily_pipeline_reddit.RedditToken; depth receives the scraper stats per subreddit.
+    """
+    from Automation.pipeline import Stage
+    if source == "reddit":
+        from Automation.daily_pipeline_reddit import SUBREDDITS, locate_csv, process_stages, scrape_subreddit
+        cutoff = datetime.fromisoformat(since).replace(tzinfo=timezone.utc).timestamp()
+        depth = {} if depth is None else depth
+        stages, prev = [], ()
+        for sub in SUBREDDITS:
+            name = f"scrape:{sub}"
+            stages.append(Stage(name, scrape_subreddit, after=prev, params={
+                "symbol": symbol, "subreddit": sub, "token": token, "stop_before_utc": cutoff,
+                "stats": depth.setdefault(sub, {})}))
+            prev = (name,)
+        return stages + [Stage("locate", locate_csv, params={"symbol": symbol}, after=prev)] + process_stages(symbol)
+    if source == "stocktwits":
+        from Automation.daily_pipeline import symbol_stages
+        return symbol_stages(symbol, resume=False)
+    raise ValueError(f"unknown source {source!r}")
+
+
+def run_unit(row: sqlite3.Row, token, manifest) -> dict:
+    """Stage values of the unit; 'short_of_since' lists subreddits that stopped above `since` (oldest post reached)."""
+    from Automation.pipeline import run_dag
+    depth = {}
+    results = run_dag(unit_stages(row["source"], row["symbol"], row["since"], token, depth),
+                      label=f"{row['symbol']} / ", manifest=manifest, scope=f"{row['source']}/{row['symbol']}")
+    bad = {name: r.error for name, r in results.items() if r.status != "ok" and not name.startswith("scrape:")}
+    if bad:
+        # A single empty subreddit is fine; a missing CSV or a failed FinBERT/volume step is not
+        raise RuntimeError("; ".join(f"{k}: {v}" for k, v in bad.items()))
+    out = {name: r.value for name, r in results.items() if r.status == "ok" and not name.startswith("scrape:")}
+    short = {sub: datetime.fromtimestamp(s["oldest"], tz=timezone.utc).isoformat() if s.get("oldest") else None
+             for sub, s in depth.items() if not s.get("complete")}
+    if short:
+        out["short_of_since"] = short
+    return out
+
+
+def _heartbeat(unit_id: int, owner: str, stop: threading.Event):
+    con = connect()
+    try:
+        while not stop.wait(HEARTBEAT_SEC):
+            if not renew(unit_id, owner, con):
+                print(f"⚠ Lost the lease on unit {unit_id}")
+                return
+    finally:
+        con.close()
+
+
+def worker(exit_when_empty: bool = True):
+    """Claim and run units until the queue is drained (or forever with exit_when_empty=False)."""
+    from Automation import metrics
+    from Automation.manifest import Manifest
+
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    con = connect()
+    manifest = Manifest()
+    token = None
+    metrics.start_run("backfill")
+    print(f"Worker {owner} started")
+    while True:
+        row = claim(owner, con)
+        if row is None:
+            if exit_when_empty:
+                break
+            time.sleep(IDLE_POLL_SEC)
+            continue
+        print(f"\n▶ [{owner}] unit {row['id']}: {row['source']} {row['symbol']} since {row['since']} (attempt {row['attempts'] + 1})")
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(row["id"], owner, stop), daemon=True).start()
+        try:
+            if row["source"] == "reddit" and token is None:
+                # Shared by the unit's scrapes and renewed before it expires (deep units run for hours)
+                from Automation.daily_pipeline_reddit import RedditToken
+                token = RedditToken()
+            with metrics.span("unit", source=row["source"], symbol=row["symbol"]):
+                result = run_unit(row, token, manifest)
+            short = result.get("short_of_since")
+            finish(row["id"], owner, con, result=result, partial=bool(short))
+            if short:
+                print(f"⚠ [{owner}] unit {row['id']} partial: {len(short)} subreddit(s) stopped before {row['since']}")
+            else:
+                print(f"✓ [{owner}] unit {row['id']} done")
+        except Exception as e:
+            finish(row["id"], owner, con, error=f"{type(e).__name__}: {e}")
+            print(f"✗ [{owner}] unit {row['id']} failed: {type(e).__name__}: {e}")
+        finally:
+            stop.set()
+    con.close()
+    print(f"Worker {owner}: queue drained")
+
+
+def run_workers(n: int, exit_when_empty: bool = True):
+    if n <= 1:
+        worker(exit_when_empty)
+        return
+    procs = [mp.Process(target=worker, args=(exit_when_empty,), name=f"backfill-{i}") for i in range(n)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Historical backfill work queue")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("enqueue", help="add (source, symbol, since) units")
+    e.add_argument("--source", choices=["reddit", "stocktwits"], required=True)
+    e.add_argument("--symbols", nargs="+", required=True)
+    e.add_argument("--since", required=True, help="YYYY-MM-DD, how far back to page")
+    w = sub.add_parser("work", help="run worker processes on this machine")
+    w.add_argument("--workers", type=int, default=1)
+    w.add_argument("--follow", action="store_true", help="keep polling for new units instead of exiting")
+    sub.add_parser("status", help="unit counts per source and status")
+    sub.add_parser("reset-failed", help="retry units that ran out of attempts")
+    args = parser.parse_args()
+
+    if args.cmd == "enqueue":
+        print(f"{enqueue(args.source, args.symbols, args.since)} unit(s) added")
+    elif args.cmd == "work":
+        run_workers(args.workers, exit_when_empty=not args.follow)
+    elif args.cmd == "status":
+        for source, state, n in status():
+            print(f"{source:<12} {state:<8} {n}")
+    else:
+        print(f"{reset_failed()} unit(s) reset")
@@ -1,107 +1,77 @@
-import os
-import re
-import glob
-import time
-import subprocess
+import sys
+import threading
 from datetime import datetime
 from pathlib import Path
 
 SYMBOLS = ["DGXX"] 
+OVERLAP = True  # scrape symbol N+1 while FinBERT/volume run on symbol N
+RESUME = False   # True: rerun after a partial failure - only symbols whose scrape did not succeed today are scraped again
+FORCE = False    # True: ignore the stage manifest and recompute everything
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-SCRAPE = PROJECT_ROOT / "Scraping" / "scraping_stockwits.py"
-SENTI  = PROJECT_ROOT / "Sentiment_Analysis" / "stockwits_sentiment_analyzer.py"
-VOLUME = PROJECT_ROOT / "Volume" / "Volume_Sentiment_Analyzer.py"
-
-def replace_in_file(path: Path, pattern: str, repl: str, flags=re.M):
-    text = path.read_text(encoding="utf-8")
-    new_text, n = re.subn(pattern, repl, text, flags=flags)
-    if n == 0:
-        print(f"⚠ No matches when updating {path.name} with pattern: {pattern}")
-    path.write_text(new_text, encoding="utf-8")
-    return n
-
-def latest_csv_for_symbol(symbol: str) -> str | None:
-    today = datetime.utcnow()
-    day_dir = PROJECT_ROOT / "data" / "raw" / "stocktwits" / symbol / f"{today:%Y}" / f"{today:%m}" / f"{today:%d}"
-    files = glob.glob(str(day_dir / f"stocktwits_messages_{symbol}_*.csv"))
-    if not files:
-        return None
-    return max(files, key=os.path.getmtime)
-
-def run_script(path: Path):
-    print(f"\nRunning {path.name} ...")
-    subprocess.run(["python", str(path)], cwd=PROJECT_ROOT, check=True)
-    print(f"✓ {path.name} finished")
-
-def run_pipeline():
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Automation.pipeline import Stage, run_dag, run_pipelined, print_summary
+from Automation import metrics
+from Automation.manifest import Manifest
+from Sentiment_Analysis.finbert_model import shared_finbert, model_tag
+from Scraping.scraping_stockwits import script_scrape_stockwits
+from Sentiment_Analysis.stockwits_sentiment_analyzer import analyze_csv
+from Volume.Volume_Sentiment_Analyzer import run_volume
+from Storage.price_store import safe_refresh
+from Analytics.fusion import safe_refresh as safe_refresh_fusion
+
+def scrape_key(kw: dict) -> dict:
+    # Scraping has no file input: with RESUME a scrape that already succeeded today counts as done
+    return {"symbol": kw["symbol"], "day": datetime.utcnow().strftime("%Y-%m-%d")}
+
+def finbert_key(kw: dict) -> dict:
+    return {"csv": Path(kw["csv_path"]), "model": model_tag()}
+
+def volume_key(kw: dict) -> dict:
+    return {"csv": Path(kw["csv_path"]), "source": kw["source"]}
+
+def scrape_stages(sym: str, resume: bool = RESUME) -> list:
+    return [Stage("scrape", script_scrape_stockwits, params={"symbol": sym}, key=scrape_key if resume else None)]
+
+def process_stages(sym: str) -> list:
+    """finbert and volume both get the scraped CSV path explicitly; both are skipped when that CSV is unchanged.
+    prices tops up the local OHLCV store (a few sessions, not cached); fusion rebuilds the ticker's cross-source rows."""
+    return [
+        Stage("finbert", analyze_csv, inputs={"csv_path": "scrape"}, key=finbert_key),
+        Stage("volume", run_volume, params={"source": "stocktwits"}, inputs={"csv_path": "scrape"}, key=volume_key),
+        Stage("prices", safe_refresh, params={"symbol": sym}),
+        Stage("fusion", safe_refresh_fusion, params={"symbol": sym}, after=("finbert", "volume")),
+    ]
+
+def symbol_stages(sym: str, resume: bool = RESUME) -> list:
+    return scrape_stages(sym, resume) + process_stages(sym)
+
+def run_pipeline(symbols=SYMBOLS, overlap: bool = OVERLAP, resume: bool = RESUME, force: bool = FORCE) -> dict:
     print("=" * 80)
     print(f"Daily pipeline started @ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 80)
 
-    ok = []
-    failed = []
-
-    for sym in SYMBOLS:
-        print("\n" + "-" * 80)
-        print(f"Symbol: {sym}")
-        print("-" * 80)
-
-        try:
-            # 1) Set symbol in scraper and run it
-            replace_in_file(
-                SCRAPE,
-                r'^(\s*)symbol\s*=\s*r?["\'][^"\']*["\']',
-                rf'\1symbol = "{sym}"'
-            )
-
-            run_script(SCRAPE)
-            time.sleep(2)  # allow filesystem to flush
-
-            # Resolve the CSV just created
-            csv_path = latest_csv_for_symbol(sym)
-            if not csv_path:
-                raise RuntimeError(f"No CSV found for {sym} in today's folder.")
-            print(f"CSV: {csv_path}")
-
-            # Point sentiment script to CSV and run
-            escaped_csv = csv_path.replace("\\", "\\\\")
-            replace_in_file(
-                SENTI,
-                r'^(\s*)CSV_PATH\s*=\s*r?["\'][^"\']*["\']',
-                rf'\1CSV_PATH = r"{escaped_csv}"'
-            )
-
-            run_script(SENTI)
-
-            # 4) Point volume script to CSV and run
-            escaped_csv = csv_path.replace("\\", "\\\\")
-            replace_in_file(
-                VOLUME,
-                r'^(\s*)CSV_PATH\s*=\s*r?["\'][^"\']*["\']',
-                rf'\1CSV_PATH = r"{escaped_csv}"'
-            )
-
-            run_script(VOLUME)
-
-            ok.append(sym)
-            print(f"✓ Done: {sym}")
-
-        except subprocess.CalledProcessError as e:
-            print(f"✗ Script failed for {sym}: {e}")
-            failed.append(sym)
-        except Exception as e:
-            print(f"✗ Error for {sym}: {e}")
-            failed.append(sym)
-
-    # AI generated prints
-    print("\n" + "=" * 80)
-    print("PIPELINE SUMMARY")
-    print("=" * 80)
-    print(f"Total: {len(SYMBOLS)}")
-    print(f"Success: {len(ok)} -> {', '.join(ok) if ok else '-'}")
-    print(f"Failed:  {len(failed)} -> {', '.join(failed) if failed else '-'}")
-    print("=" * 80)
+    metrics_path = metrics.start_run("stocktwits")
+    manifest = Manifest(force=force)
+    if overlap:
+        # Load FinBERT while the first symbol is being scraped, then keep scraping one symbol ahead of inference
+        threading.Thread(target=shared_finbert, name="finbert-warmup", daemon=True).start()
+        results = run_pipelined(symbols, lambda sym: scrape_stages(sym, resume), process_stages,
+                                manifest=manifest, scope="stocktwits/{sym}")
+    else:
+        results = {}
+        for sym in symbols:
+            print("\n" + "-" * 80)
+            print(f"Symbol: {sym}")
+            print("-" * 80)
+            results[sym] = run_dag(symbol_stages(sym, resume), label=f"{sym} / ", manifest=manifest, scope=f"stocktwits/{sym}")
+
+    print_summary("PIPELINE SUMMARY", results)
+    print(metrics.report("stocktwits"))
+    print(f"Metrics: {metrics_path}")
+    return results
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    run_pipeline()
@@ -1,8 +1,8 @@
 import os
-import re
+import sys
 import glob
 import time
-import subprocess
+import threading
 from datetime import datetime
 from pathlib import Path
 
@@ -30,22 +30,33 @@ SUBREDDITS = [
 
 #Run 1 NVDA: TechStocks, GrowthStocks both have super low volume 
 
+OVERLAP = True  # scrape ticker N+1 while FinBERT/volume run on ticker N
+RESUME = False   # True: rerun after a partial failure - only (ticker, subreddit) scrapes that did not succeed today run again
+FORCE = False    # True: ignore the stage manifest and recompute everything
+TOKEN_TTL_SEC = 50 * 60  # Reddit app tokens live one hour: long multi-ticker runs log in again
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-REDDIT_SCRAPE = PROJECT_ROOT / "Scraping" / "scraping_reddit.py"
-REDDIT_SENTI  = PROJECT_ROOT / "Sentiment_Analysis" / "reddit_sentiment_analyzer.py"
-VOLUME = PROJECT_ROOT / "Volume" / "Volume_Sentiment_Analyzer.py"
-
-def replace_in_file(path: Path, pattern: str, repl: str, flags=re.M):
-    text = path.read_text(encoding="utf-8")
-    new_text, n = re.subn(pattern, repl, text, flags=flags)
-    if n == 0:
-        print(f"⚠ No matches when updating {path.name} with pattern: {pattern}")
-    path.write_text(new_text, encoding="utf-8")
-    return n
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage import catalog
+from Automation.pipeline import Stage, run_dag, run_pipelined, print_summary
+from Automation import metrics
+from Automation.manifest import Manifest
+from Sentiment_Analysis.finbert_model import shared_finbert, model_tag
+from Scraping.scraping_reddit import script_scrape_reddit, get_reddit_token
+from Sentiment_Analysis.reddit_sentiment_analyzer import analyze_csv
+from Volume.Volume_Sentiment_Analyzer import run_volume
+from Storage.price_store import safe_refresh
+from Analytics.fusion import safe_refresh as safe_refresh_fusion
 
 def latest_csv_for_symbol(symbol: str, source: str = "reddit") -> str | None:
     """Get latest CSV for symbol from specified source (reddit or stocktwits)."""
     today = datetime.utcnow()
+    # The scrapers register every file they write; only fall back to globbing when the catalog has nothing
+    hit = catalog.latest("raw", source, symbol, run_date=f"{today:%Y-%m-%d}")
+    if hit:
+        return str(hit)
     day_dir = PROJECT_ROOT / "data" / "raw" / source / symbol / f"{today:%Y}" / f"{today:%m}" / f"{today:%d}"
     
     if source == "reddit":
@@ -58,99 +69,99 @@ def latest_csv_for_symbol(symbol: str, source: str = "reddit") -> str | None:
         return None
     return max(files, key=os.path.getmtime)
 
-def run_script(path: Path):
-    print(f"\nRunning {path.name} ...")
-    subprocess.run(["python", str(path)], cwd=PROJECT_ROOT, check=True)
-    print(f"✓ {path.name} finished")
-
-def run_pipeline():
+def locate_csv(symbol: str) -> str:
+    # Find the file we just filled up
+    csv_path = latest_csv_for_symbol(symbol, "reddit")
+    if not csv_path:
+        raise RuntimeError(f"No Reddit CSV found for {symbol} (Scraping likely failed completely).")
+    print(f"Target CSV: {csv_path}")
+    return csv_path
+
+class RedditToken:
+    """OAuth token shared by all scrape stages of a run, fetched again once it is TOKEN_TTL_SEC old."""
+
+    def __init__(self, ttl: float = TOKEN_TTL_SEC):
+        self.ttl = ttl
+        self.value, self.fetched = None, 0.0
+        self.lock = threading.Lock()
+
+    def get(self) -> str:
+        with self.lock:
+            if self.value is None or time.monotonic() - self.fetched > self.ttl:
+                self.value, self.fetched = get_reddit_token(), time.monotonic()
+            return self.value
+
+def scrape_subreddit(symbol: str, subreddit: str, token: RedditToken, **kwargs):
+    return script_scrape_reddit(symbol, subreddit, token.get(), **kwargs)
+
+def scrape_key(kw: dict) -> dict:
+    # No file input and the token must not end up in the manifest: with RESUME, done = succeeded today
+    return {"symbol": kw["symbol"], "subreddit": kw["subreddit"], "day": datetime.utcnow().strftime("%Y-%m-%d")}
+
+def finbert_key(kw: dict) -> dict:
+    return {"csv": Path(kw["csv_path"]), "model": model_tag()}
+
+def volume_key(kw: dict) -> dict:
+    return {"csv": Path(kw["csv_path"]), "source": kw["source"]}
+
+def scrape_stages(sym: str, token: RedditToken, subreddits=SUBREDDITS, resume: bool = RESUME) -> list:
+    """
+    scrape:<sub> one after another (they append to the same daily CSV), then locate the CSV.
+    A failed subreddit does not block the rest. Network-bound.
+    """
+    stages, prev = [], ()
+    for sub in subreddits:
+        name = f"scrape:{sub}"
+        stages.append(Stage(name, scrape_subreddit, params={"symbol": sym, "subreddit": sub, "token": token},
+                            after=prev, key=scrape_key if resume else None))
+        prev = (name,)
+    scrapes = tuple(s.name for s in stages)
+    return stages + [Stage("locate", locate_csv, params={"symbol": sym}, after=scrapes)]
+
+def process_stages(sym: str) -> list:
+    """FinBERT and volume on the located CSV (once per ticker), skipped when the CSV is unchanged. CPU-bound.
+    prices tops up the local OHLCV store; fusion rebuilds the ticker's cross-source rows."""
+    return [
+        Stage("finbert", analyze_csv, inputs={"csv_path": "locate"}, key=finbert_key),
+        Stage("volume", run_volume, params={"source": "reddit"}, inputs={"csv_path": "locate"}, key=volume_key),
+        Stage("prices", safe_refresh, params={"symbol": sym}),
+        Stage("fusion", safe_refresh_fusion, params={"symbol": sym}, after=("finbert", "volume")),
+    ]
+
+def symbol_stages(sym: str, token: RedditToken, subreddits=SUBREDDITS, resume: bool = RESUME) -> list:
+    return scrape_stages(sym, token, subreddits, resume) + process_stages(sym)
+
+def run_pipeline(symbols=SYMBOLS, subreddits=SUBREDDITS, overlap: bool = OVERLAP, resume: bool = RESUME,
+                 force: bool = FORCE) -> dict:
     print("=" * 80)
     print(f"Reddit Daily Pipeline started @ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 80)
 
-    ok = []
-    failed = []
-    
-    for sym in SYMBOLS:
-        print("\n" + "#" * 80)
-        print(f"STARTING PIPELINE FOR TICKER: {sym}")
-        print("#" * 80)
-
-        scraping_errors = False
-
-        for sub in SUBREDDITS:
-            print(f"\n--- Scraping {sym} in r/{sub} ---")
-
-            try:
-                # 1) Set SUBREDDIT in Reddit scraper and run it
-                replace_in_file(
-                    REDDIT_SCRAPE,
-                    r'^(\s*)SUBREDDIT\s*=\s*r?["\'][^"\']*["\']',
-                    rf'\1SUBREDDIT = "{sub}"'
-                )
-                # 2) Set symbol in Reddit scraper and run it
-                replace_in_file(
-                    REDDIT_SCRAPE,
-                    r'^(\s*)symbol\s*=\s*r?["\'][^"\']*["\']',
-                    rf'\1symbol = "{sym}"'
-                )
-
-                run_script(REDDIT_SCRAPE)
-                time.sleep(2)  # allow filesystem to flush
-            
-            except Exception as e:
-                print(f"✗ Scraping failed for {sym} in {sub}: {e}")
-                scraping_errors = True
-
-        print(f"\n Processing Combined Data for {sym}...")
-        
-        try:
-            # Find the file we just filled up
-            csv_path = latest_csv_for_symbol(sym, "reddit")
-            if not csv_path:
-                raise RuntimeError(f"No Reddit CSV found for {sym} (Scraping likely failed completely).")
-            
-            print(f"Target CSV: {csv_path}")
-
-            # Update Sentiment Script Path
-            escaped_csv = csv_path.replace("\\", "\\\\")
-            replace_in_file(
-                REDDIT_SENTI,
-                r'^(\s*)CSV_PATH\s*=\s*r?["\'][^"\']*["\']',
-                rf'\1CSV_PATH = r"{escaped_csv}"'
-            )
-            # Run FinBERT (Once per ticker)
-            run_script(REDDIT_SENTI)
-
-            # Update Volume Script Path
-            replace_in_file(
-                VOLUME,
-                r'^(\s*)CSV_PATH\s*=\s*r?["\'][^"\']*["\']',
-                rf'\1CSV_PATH = r"{escaped_csv}"'
-            )
-            # Run Volume Analysis (Once per ticker)
-            run_script(VOLUME)
-
-            if not scraping_errors:
-                ok.append(sym)
-                print(f"✓ FULL SUCCESS: {sym}")
-            else:
-                failed.append(f"{sym} (Partial)")
-                print(f"⚠ PARTIAL SUCCESS: {sym} (Some subreddits failed)")
-
-        except Exception as e:
-            print(f"✗ Processing failed for {sym}: {e}")
-            failed.append(f"{sym} (Processing)")
+    # One OAuth login shared by every subreddit script, renewed before it expires
+    token = RedditToken()
+    token.get()
+
+    metrics_path = metrics.start_run("reddit")
+    manifest = Manifest(force=force)
+    if overlap:
+        # Load FinBERT while the first ticker is being scraped, then keep scraping one ticker ahead of inference
+        threading.Thread(target=shared_finbert, name="finbert-warmup", daemon=True).start()
+        results = run_pipelined(symbols, lambda sym: scrape_stages(sym, token, subreddits, resume), process_stages,
+                                manifest=manifest, scope="reddit/{sym}")
+    else:
+        results = {}
+        for sym in symbols:
+            print("\n" + "#" * 80)
+            print(f"STARTING PIPELINE FOR TICKER: {sym}")
+            print("#" * 80)
+            results[sym] = run_dag(symbol_stages(sym, token, subreddits, resume), label=f"{sym} / ",
+                                   manifest=manifest, scope=f"reddit/{sym}")
 
     # Pipeline summary
-    print("\n" + "=" * 80)
-    print("REDDIT PIPELINE SUMMARY")
-    print("=" * 80)
-    print(f"Total: {len(SYMBOLS)}")
-    print(f"Success: {len(ok)} -> {', '.join(ok) if ok else '-'}")
-    print(f"Failed:  {len(failed)} -> {', '.join(failed) if failed else '-'}")
-    print("=" * 80)
+    print_summary("REDDIT PIPELINE SUMMARY", results)
+    print(metrics.report("reddit"))
+    print(f"Metrics: {metrics_path}")
+    return results
 
 if __name__ == "__main__":
     run_pipeline()
-
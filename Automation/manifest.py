@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import hashlib
+import inspect
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Make-style stage manifest for the pipelines (data/_pipeline_manifest.json).
+#
+# For every (scope, stage) - e.g. "reddit/NVDA" + "finbert" - we keep the fingerprint of what the stage
+# consumed the last time it succeeded: content hashes of its input files, its parameters and a hash of
+# the source file that defines it. A rerun with the same fingerprint whose outputs still exist is skipped
+# and its recorded return value replayed, so reruns after a partial failure only redo what failed or changed.
+#
+# File hashes are memoized on (size, mtime_ns): unchanged files are not re-read on every run.
+# Several processes may share the file (backfill workers): save() re-reads it under a file lock and only
+# overwrites the stage entries this process recorded, so workers do not erase each other's results.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage.file_lock import file_lock
+
+MANIFEST_PATH = PROJECT_ROOT / "data" / "_pipeline_manifest.json"
+CHUNK = 1 << 20
+
+
+def _hash_bytes(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(material) -> str:
+    """Stable hash of any JSON-serializable value."""
+    blob = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+def _output_paths(value) -> list:
+    """Every string in a stage's return value that looks like a file path."""
+    if isinstance(value, dict):
+        return [p for v in value.values() for p in _output_paths(v)]
+    if isinstance(value, (list, tuple)):
+        return [p for v in value for p in _output_paths(v)]
+    if isinstance(value, str) and (os.sep in value or "/" in value) and Path(value).suffix:
+        return [value]
+    return []
+
+
+class Manifest:
+    """Thread-safe stage manifest. force=True records results but never reports a cache hit."""
+
+    def __init__(self, path: Path = MANIFEST_PATH, force: bool = False):
+        self.path = Path(path)
+        self.force = force
+        self._lock = threading.Lock()
+        self._recorded = set()  # stage keys written by this process since the last save
+        self.data = self._read()
+
+    def _read(self) -> dict:
+        data = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                print(f"⚠ Unreadable manifest {self.path}, starting fresh")
+        data.setdefault("stages", {})
+        data.setdefault("files", {})
+        return data
+
+    def file_hash(self, path) -> str:
+        """Content hash of a file, memoized on size + mtime."""
+        path = Path(path)
+        st = path.stat()
+        key = str(path.resolve())
+        with self._lock:
+            memo = self.data["files"].get(key)
+            if memo and memo["size"] == st.st_size and memo["mtime_ns"] == st.st_mtime_ns:
+                return memo["hash"]
+        digest = _hash_bytes(path)
+        with self._lock:
+            self.data["files"][key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+        return digest
+
+    def resolve(self, material):
+        """Replace every Path in key material with its content hash (recursively through dicts/lists)."""
+        if isinstance(material, Path):
+            return {"file": material.as_posix(), "hash": self.file_hash(material)}
+        if isinstance(material, dict):
+            return {k: self.resolve(v) for k, v in material.items()}
+        if isinstance(material, (list, tuple)):
+            return [self.resolve(v) for v in material]
+        return material
+
+    def code_version(self, fn) -> str:
+        """Hash of the source file defining fn (editing the stage's module invalidates it)."""
+        try:
+            return self.file_hash(inspect.getsourcefile(fn))
+        except (TypeError, OSError):
+            return getattr(fn, "__qualname__", repr(fn))
+
+    def lookup(self, key: str, fp: str) -> dict | None:
+        """The recorded entry if the stage last succeeded with this fingerprint and its outputs still exist."""
+        if self.force:
+            return None
+        with self._lock:
+            entry = self.data["stages"].get(key)
+        if not entry or entry.get("status") != "ok" or entry.get("fingerprint") != fp:
+            return None
+        if not all(Path(p).exists() for p in _output_paths(entry.get("value"))):
+            return None
+        return entry
+
+    def record(self, key: str, fp: str | None, status: str, value=None, error: str | None = None,
+               seconds: float = 0.0, material=None):
+        entry = {
+            "fingerprint": fp,
+            "status": status,
+            "value": value,
+            "error": error,
+            "seconds": round(seconds, 3),
+            "inputs": material,
+            "finished_utc": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock:
+            self.data["stages"][key] = entry
+            self._recorded.add(key)
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path), self._lock:
+            # Merge into what other processes saved meanwhile; our own entries win for the keys we recorded
+            disk = self._read()
+            disk["stages"].update({k: self.data["stages"][k] for k in self._recorded})
+            disk["files"].update(self.data["files"])
+            self.data, self._recorded = disk, set()
+            blob = json.dumps(self.data, indent=1, default=str)
+            tmp = self.path.with_name(self.path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(blob, encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def status(self, prefix: str = "") -> list:
+        """(key, status, finished_utc, error) for every recorded stage under a scope prefix."""
+        with self._lock:
+            items = sorted(self.data["stages"].items())
+        return [(k, e["status"], e["finished_utc"], e.get("error")) for k, e in items if k.startswith(prefix)]
+
+
+if __name__ == "__main__":
+    prefix = sys.argv[1] if len(sys.argv) > 1 else ""
+    for key, status, finished, error in Manifest().status(prefix):
+        print(f"{status:<8} {finished[:19]}  {key}" + (f"  ({error})" if error else ""))
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Run metrics: one JSON-lines file per run under data/metrics/{pipeline}_{YYYYmmdd_HHMMSS}_{pid}.jsonl.
+#
+#   with metrics.span("inference", symbol="NVDA"):
+#       ...
+#       metrics.count("texts", len(batch))
+#
+# Every span writes one line when it ends: wall and CPU seconds (CPU of the calling thread, so the scrape
+# thread and the inference thread of an overlapped run are measured separately), process peak RSS, and
+# its counters (rows_in/rows_out, http_requests, http_429, sleep_s, texts, ...) plus <counter>_per_s.
+# Spans nest per thread ("finbert/inference"); a finished span adds its counters to its parent.
+# `python Automation/metrics.py` compares the newest run with the median of the previous ones.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+METRICS_DIR = PROJECT_ROOT / "data" / "metrics"
+REGRESSION_PCT = 25.0   # flag a span whose wall time grew by more than this ...
+REGRESSION_MIN_S = 1.0  # ... and by more than this many seconds
+
+_run = {"id": None, "pipeline": None, "path": None}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _stack() -> list:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far (None if the platform offers no way to read it)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1e6 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB on Linux
+    except ImportError:
+        pass
+    try:
+        import psutil
+        mem = psutil.Process().memory_info()
+        return round(getattr(mem, "peak_wset", mem.rss) / 1e6, 1)  # peak working set on Windows
+    except ImportError:
+        return None
+
+
+def start_run(pipeline: str) -> Path:
+    """Open a new metrics file for this run; spans recorded before any start_run go to an ad-hoc run."""
+    with _lock:
+        run_id = f"{pipeline}_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}"
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        _run.update(id=run_id, pipeline=pipeline, path=METRICS_DIR / f"{run_id}.jsonl")
+        return _run["path"]
+
+
+def _write(record: dict):
+    if _run["path"] is None:
+        start_run(Path(sys.argv[0]).stem or "adhoc")
+    with _lock:
+        record = {"run_id": _run["id"], "pipeline": _run["pipeline"], **record}
+        with open(_run["path"], "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+
+def count(key: str, n: float = 1):
+    """Add n to a counter of the innermost open span of this thread (no-op outside a span)."""
+    stack = _stack()
+    if stack:
+        counters = stack[-1]["counters"]
+        counters[key] = counters.get(key, 0) + n
+
+
+@contextmanager
+def span(name: str, **tags):
+    """Time a block and record it (also when it raises; status is then 'failed')."""
+    stack = _stack()
+    path = "/".join([s["name"] for s in stack] + [name])
+    frame = {"name": name, "counters": {}}
+    stack.append(frame)
+    started = datetime.now(timezone.utc)
+    t0, c0 = time.perf_counter(), time.thread_time()
+    status = "ok"
+    try:
+        yield frame["counters"]
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - t0, time.thread_time() - c0
+        stack.pop()
+        counters = frame["counters"]
+        if stack:
+            parent = stack[-1]["counters"]
+            for k, v in counters.items():
+                parent[k] = parent.get(k, 0) + v
+        rates = {f"{k}_per_s": round(v / wall, 2) for k, v in counters.items() if wall > 0 and k != "sleep_s"}
+        try:
+            _write({
+                "span": path,
+                "tags": tags,
+                "status": status,
+                "thread": threading.current_thread().name,
+                "start_utc": started.isoformat(),
+                "wall_s": round(wall, 4),
+                "cpu_s": round(cpu, 4),
+                "peak_rss_mb": peak_rss_mb(),
+                "counters": counters,
+                "rates": rates,
+            })
+        except OSError as e:
+            print(f"⚠ Could not write metrics for {path}: {e}")
+
+
+# ---------------------------------------------------------------- report
+
+def load_runs(pipeline: str | None = None) -> dict:
+    """{run_id: [records]} oldest run first."""
+    runs = {}
+    for path in sorted(METRICS_DIR.glob("*.jsonl"), key=lambda p: p.stat().st_mtime):
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        if records and (pipeline is None or records[0].get("pipeline") == pipeline):
+            runs[records[0]["run_id"]] = records
+    return runs
+
+
+def span_totals(records: list) -> dict:
+    """{span path: {'n', 'wall_s', 'cpu_s', 'peak_rss_mb', counters...}} summed over tags (symbols, subreddits)."""
+    out = {}
+    for r in records:
+        t = out.setdefault(r["span"], {"n": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": 0.0})
+        t["n"] += 1
+        t["wall_s"] += r["wall_s"]
+        t["cpu_s"] += r["cpu_s"]
+        t["peak_rss_mb"] = max(t["peak_rss_mb"], r.get("peak_rss_mb") or 0.0)
+        for k, v in r.get("counters", {}).items():
+            t[k] = t.get(k, 0) + v
+    return out
+
+
+def report(pipeline: str | None = None, history: int = 10) -> str:
+    runs = load_runs(pipeline)
+    if not runs:
+        return f"No metrics in {METRICS_DIR}"
+    run_ids = list(runs)
+    current_id, previous = run_ids[-1], run_ids[-1 - history:-1]
+    current = span_totals(runs[current_id])
+    baseline = [span_totals(runs[r]) for r in previous]
+
+    lines = [f"Run {current_id} vs median of {len(previous)} previous run(s)",
+             f"{'span':<40} {'n':>4} {'wall s':>9} {'cpu s':>9} {'rss MB':>8} {'base s':>9} {'Δ%':>7}  counters"]
+    for name, t in sorted(current.items()):
+        base_walls = [b[name]["wall_s"] for b in baseline if name in b]
+        base = statistics.median(base_walls) if base_walls else None
+        delta = (t["wall_s"] - base) / base * 100 if base else None
+        flag = "⚠" if delta is not None and delta > REGRESSION_PCT and t["wall_s"] - base > REGRESSION_MIN_S else " "
+        counters = ", ".join(f"{k}={v:g}" for k, v in t.items() if k not in ("n", "wall_s", "cpu_s", "peak_rss_mb"))
+        lines.append(f"{name:<40} {t['n']:>4} {t['wall_s']:>9.2f} {t['cpu_s']:>9.2f} {t['peak_rss_mb']:>8.0f} "
+                     f"{base if base is not None else float('nan'):>9.2f} "
+                     f"{delta if delta is not None else float('nan'):>6.0f}%{flag} {counters}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the latest pipeline run's metrics with previous runs")
+    parser.add_argument("--pipeline", help="e.g. reddit or stocktwits (default: any)")
+    parser.add_argument("--history", type=int, default=10, help="number of previous runs in the baseline")
+    args = parser.parse_args()
+    print(report(args.pipeline, args.history))
@@ -0,0 +1,212 @@
+import time
+import queue
+import threading
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from Automation import metrics
+from Automation.manifest import fingerprint
+
+# Minimal in-process DAG runner for the daily pipelines.
+#
+# A Stage is a plain function call: fn(**params, **{kwarg: result of upstream stage}).
+#   inputs  {kwarg: stage name}  hard dependencies; their return values are passed in, and the stage
+#                                is skipped when one of them did not succeed
+#   after   (stage names,)       ordering only; the stage runs once they finished, whatever the outcome
+#                                (e.g. FinBERT after all subreddit scrapes, even if one subreddit failed)
+# Stages run in dependency order inside the current interpreter, so FinBERT, the Reddit token, yfinance
+# lookups etc. are loaded once per process instead of once per subprocess.
+#
+# Incremental runs: a Stage with a `key` function is fingerprinted before it runs. key(kwargs) returns what
+# decides its output (parameters; input files as Path objects, replaced by their content hash), and the runner
+# adds the stage name and a hash of the stage's source file. When a Manifest (Automation/manifest.py) is passed
+# and the last successful run had the same fingerprint and its outputs still exist, the stage is not executed
+# and the recorded return value is reused. Stages without a key always run.
+#
+# run_pipelined() overlaps symbols: a producer thread runs the I/O-bound stages (scraping) of symbol N+1
+# while the main thread runs the CPU-bound stages (FinBERT, volume) of symbol N. A bounded queue between
+# them is the backpressure: the scraper never gets more than queue_size symbols ahead of inference.
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[..., Any]
+    params: dict = field(default_factory=dict)
+    inputs: dict = field(default_factory=dict)
+    after: tuple = ()
+    key: Callable[[dict], Any] | None = None
+
+    @property
+    def deps(self) -> tuple:
+        return tuple(self.inputs.values()) + tuple(self.after)
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # "ok" | "failed" | "skipped"
+    value: Any = None
+    error: str | None = None
+    seconds: float = 0.0
+    cached: bool = False
+
+
+def topo_order(stages: list, external=()) -> list:
+    """
+    Stages in an order where every dependency comes first (stable w.r.t. the given order).
+    Names in `external` are results that already exist (e.g. produced by an upstream run).
+    """
+    by_name = {s.name: s for s in stages}
+    if len(by_name) != len(stages):
+        raise ValueError("duplicate stage names")
+    external = set(external)
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name and d not in external]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown stage(s) {missing}")
+
+    order, done, visiting = [], set(), set()
+
+    def visit(s: Stage):
+        if s.name in done:
+            return
+        if s.name in visiting:
+            raise ValueError(f"dependency cycle through {s.name!r}")
+        visiting.add(s.name)
+        for d in s.deps:
+            if d in by_name:
+                visit(by_name[d])
+        visiting.discard(s.name)
+        done.add(s.name)
+        order.append(s)
+
+    for s in stages:
+        visit(s)
+    return order
+
+
+def _stage_fingerprint(stage: Stage, kwargs: dict, manifest):
+    """(fingerprint, material) for a keyed stage, or (None, None) if it has no key or the key cannot be computed."""
+    if manifest is None or stage.key is None:
+        return None, None
+    try:
+        material = {"stage": stage.name, "code": manifest.code_version(stage.fn), "key": manifest.resolve(stage.key(kwargs))}
+    except Exception as e:  # e.g. an input file vanished: just run the stage
+        print(f"⚠ {stage.name}: no fingerprint ({type(e).__name__}: {e}), running it")
+        return None, None
+    return fingerprint(material), material
+
+
+def run_stage(stage: Stage, results: dict, manifest=None, scope: str = "") -> StageResult:
+    """
+    Run one stage given the results of its dependencies (skips it if a hard input did not succeed).
+    With a manifest, an unchanged keyed stage is answered from it and every outcome is recorded under scope/name.
+    """
+    bad = [d for d in stage.inputs.values() if results[d].status != "ok"]
+    if bad:
+        return StageResult(stage.name, "skipped", error=f"input(s) not available: {', '.join(bad)}")
+    kwargs = dict(stage.params)
+    kwargs.update({k: results[d].value for k, d in stage.inputs.items()})
+
+    key = f"{scope}/{stage.name}" if scope else stage.name
+    fp, material = _stage_fingerprint(stage, kwargs, manifest)
+    if fp is not None:
+        hit = manifest.lookup(key, fp)
+        if hit is not None:
+            return StageResult(stage.name, "ok", hit["value"], cached=True)
+
+    t0 = time.perf_counter()
+    try:
+        with metrics.span(stage.name, scope=scope):
+            value = stage.fn(**kwargs)
+        res = StageResult(stage.name, "ok", value, seconds=time.perf_counter() - t0)
+    except Exception as e:
+        traceback.print_exc()
+        res = StageResult(stage.name, "failed", error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - t0)
+    if manifest is not None:
+        try:
+            manifest.record(key, fp, res.status, res.value, res.error, res.seconds, material)
+        except Exception as e:
+            print(f"⚠ Manifest update failed for {key}: {e}")
+    return res
+
+
+def run_dag(stages: list, label: str = "", upstream: dict | None = None, manifest=None, scope: str = "") -> dict:
+    """
+    Run all stages sequentially in dependency order. Returns {stage name: StageResult},
+    including the `upstream` results the stages were allowed to depend on.
+    """
+    results = dict(upstream or {})
+    for stage in topo_order(stages, external=results):
+        print(f"\n▶ {label}{stage.name}")
+        res = run_stage(stage, results, manifest, scope)
+        results[stage.name] = res
+        if res.cached:
+            print(f"✓ {label}{stage.name}: unchanged, reusing previous result")
+            continue
+        mark = {"ok": "✓", "failed": "✗", "skipped": "⚠"}[res.status]
+        detail = f" ({res.error})" if res.error else ""
+        print(f"{mark} {label}{stage.name}: {res.status} in {res.seconds:.1f}s{detail}")
+    return results
+
+
+def run_pipelined(symbols, producer: Callable[[str], list], consumer: Callable[[str], list],
+                  queue_size: int = 1, label: str = "{sym} / ", manifest=None, scope: str = "{sym}") -> dict:
+    """
+    Run producer(sym) stages in a background thread and consumer(sym) stages in the calling thread,
+    symbol by symbol, connected by a bounded queue. Consumer stages may take producer stages as inputs.
+    Returns {symbol: {stage name: StageResult}} like running both halves with run_dag.
+    """
+    handoff = queue.Queue(maxsize=queue_size)
+    done = object()
+    busy = {"produce": 0.0, "consume": 0.0}
+    t_start = time.perf_counter()
+
+    def produce():
+        try:
+            for sym in symbols:
+                t0 = time.perf_counter()
+                res = run_dag(producer(sym), label=label.format(sym=sym), manifest=manifest, scope=scope.format(sym=sym))
+                busy["produce"] += time.perf_counter() - t0
+                handoff.put((sym, res))  # blocks while the consumer is queue_size symbols behind
+        finally:
+            handoff.put(done)
+
+    thread = threading.Thread(target=produce, name="pipeline-producer", daemon=True)
+    thread.start()
+
+    results = {}
+    while True:
+        item = handoff.get()
+        if item is done:
+            break
+        sym, upstream = item
+        t0 = time.perf_counter()
+        results[sym] = run_dag(consumer(sym), label=label.format(sym=sym), upstream=upstream,
+                               manifest=manifest, scope=scope.format(sym=sym))
+        busy["consume"] += time.perf_counter() - t0
+    thread.join()
+
+    wall = time.perf_counter() - t_start
+    print(f"\nOverlap: produce {busy['produce']:.1f}s + consume {busy['consume']:.1f}s "
+          f"(sequential {busy['produce'] + busy['consume']:.1f}s) ran in {wall:.1f}s wall")
+    return results
+
+
+def print_summary(title: str, results_by_symbol: dict):
+    """Per-symbol outcome table in the style of the old pipeline summaries."""
+    ok = [s for s, r in results_by_symbol.items() if all(x.status == "ok" for x in r.values())]
+    partial = [s for s, r in results_by_symbol.items() if s not in ok]
+    print("\n" + "=" * 80)
+    print(title)
+    print("=" * 80)
+    print(f"Total: {len(results_by_symbol)}")
+    print(f"Success: {len(ok)} -> {', '.join(ok) if ok else '-'}")
+    print(f"Failed:  {len(partial)} -> {', '.join(partial) if partial else '-'}")
+    for sym in partial:
+        for r in results_by_symbol[sym].values():
+            if r.status != "ok":
+                print(f"  {sym} / {r.name}: {r.status} ({r.error})")
+    print("=" * 80)
@@ -0,0 +1,257 @@
+import sys
+import json
+import math
+import time
+import heapq
+import argparse
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Automation import metrics
+from Automation.manifest import Manifest
+from Automation.pipeline import Stage, run_dag, print_summary
+from Automation.daily_pipeline_reddit import SYMBOLS, SUBREDDITS, process_stages
+from Scraping.scraping_reddit import script_scrape_reddit, get_reddit_token, get_queries
+from Volume.stream_detector import BurstDetector
+from Volume.Volume_Sentiment_Analyzer import VOLUME_HISTORY_DIR
+
+# Adaptive Reddit scrape scheduler: instead of every SYMBOL x SUBREDDIT once a day, spend a fixed request
+# budget every CYCLE_MINUTES on the (symbol, subreddit) "arms" most likely to have new posts.
+#
+# Per arm (STATE_PATH) we keep an EWMA of new posts per request, the newest created_utc seen, the watermark
+# (where the scraper stops paging once it is caught up) and when it was last visited. The watermark only moves
+# up to the newest post after a complete scrape: when the grant runs out before paging gets down to the old
+# watermark, the posts in between are still unscraped, so the next visit pages down to the old mark again and
+# only the posts above the newest or below the oldest one reached so far ("resume") count as new for the yield
+# (an arm's first visit sets the watermark whatever it reached: older history is the backfill's job).
+# An arm's priority is
+#     yield * heat(symbol) * (1 - exp(-time since last visit / REFILL_TAU_SEC))
+# where heat is BURST_BOOST while the burst detector has the symbol in a burst, times the ratio of the latest
+# daily message count to its trailing median (volume history). Requests are handed out greedily by marginal
+# value; every extra request to the same arm is worth DEPTH_DECAY less (deeper pages are older posts).
+# Arms not visited for EXPLORE_AFTER_SEC always get a visit, so a quiet subreddit is re-measured now and then.
+# New posts are not analyzed every cycle: each daily CSV that got new posts is queued (state[PROCESS_KEY]) and
+# goes through the usual FinBERT/volume stages once its UTC day is over, plus at most every PROCESS_EVERY_SEC
+# while the day is still running.
+
+STATE_PATH = PROJECT_ROOT / "data" / "scheduler" / "reddit_arms.json"
+CYCLE_MINUTES = 15
+REQUESTS_PER_CYCLE = 300       # ~ the old daily run's volume spread over the day; Reddit OAuth allows 100/min
+MAX_REQUESTS_PER_ARM = 20
+DEPTH_DECAY = 0.6
+PRIOR_YIELD = 20.0             # optimistic start: unseen arms get tried early
+MIN_YIELD = 0.05
+YIELD_ALPHA = 0.3
+REFILL_TAU_SEC = 6 * 3600
+EXPLORE_AFTER_SEC = 24 * 3600
+BURST_BOOST = 3.0
+HEAT_WINDOW_DAYS = 14
+TOKEN_TTL_SEC = 50 * 60        # Reddit app tokens live one hour
+PROCESS_EVERY_SEC = 6 * 3600   # intraday FinBERT/volume refresh of a ticker's current CSV
+PROCESS_KEY = "_process"       # {symbol: {"last_run", "pending": {csv: utc day}}} next to the arms
+
+
+def arm_key(symbol: str, subreddit: str) -> str:
+    return f"{symbol}|{subreddit}"
+
+
+def load_state(path: Path = STATE_PATH) -> dict:
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            print(f"⚠ Unreadable scheduler state {path}, starting fresh")
+    return {}
+
+
+def save_state(state: dict, path: Path = STATE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=1), encoding="utf-8")
+    tmp.replace(path)
+
+
+def volume_ratio(symbol: str, source: str = "reddit") -> float:
+    """Latest day's message count over the trailing median (1.0 without enough history)."""
+    path = VOLUME_HISTORY_DIR / source / f"{symbol}.csv"
+    if not path.exists():
+        return 1.0
+    counts = pd.read_csv(path, usecols=["date_utc", "messages"]).sort_values("date_utc")["messages"]
+    if len(counts) < 3:
+        return 1.0
+    base = counts.iloc[-HEAT_WINDOW_DAYS - 1:-1].median()
+    return float(min(max(counts.iloc[-1] / base, 0.5), 4.0)) if base > 0 else 1.0
+
+
+def symbol_heat(symbols, detector_state: dict | None = None) -> dict:
+    """{symbol: multiplier} from the live burst state and the daily volume history."""
+    state = BurstDetector().state if detector_state is None else detector_state
+    return {sym: (BURST_BOOST if state.get(sym, {}).get("burst") else 1.0) * volume_ratio(sym) for sym in symbols}
+
+
+def arm_priority(arm: dict, heat: float, now: float) -> float:
+    """Expected new posts for the first request to this arm."""
+    elapsed = now - arm.get("last_run", 0.0)
+    refill = 1.0 - math.exp(-elapsed / REFILL_TAU_SEC)
+    return max(arm.get("yield", PRIOR_YIELD), MIN_YIELD) * heat * refill
+
+
+def plan_cycle(state: dict, symbols, subreddits, heat: dict, budget: int = REQUESTS_PER_CYCLE,
+               first_cost: dict | None = None, now: float | None = None) -> list:
+    """
+    [(symbol, subreddit, requests, priority)] highest priority first, spending at most `budget` requests.
+    first_cost[symbol] is the minimum useful visit: one page per search query of the symbol (the scraper
+    shares an arm's requests out over its queries, so the first query cannot use them all).
+    """
+    now = time.time() if now is None else now
+    first_cost = first_cost or {}
+    heap, value = [], {}
+    for sym in symbols:
+        for sub in subreddits:
+            arm = state.get(arm_key(sym, sub), {})
+            value[(sym, sub)] = arm_priority(arm, heat.get(sym, 1.0), now)
+            overdue = now - arm.get("last_run", 0.0) >= EXPLORE_AFTER_SEC
+            if value[(sym, sub)] > 0 or overdue:
+                heapq.heappush(heap, (-math.inf if overdue else -value[(sym, sub)], sym, sub, 0))
+    grants, left = {}, budget
+    while heap and left > 0:
+        _, sym, sub, given = heapq.heappop(heap)
+        step = first_cost.get(sym, 1) if given == 0 else 1
+        if step > left or given + step > MAX_REQUESTS_PER_ARM:
+            continue
+        grants[(sym, sub)] = given + step
+        left -= step
+        heapq.heappush(heap, (-value[(sym, sub)] * DEPTH_DECAY ** (given + step), sym, sub, given + step))
+    return sorted(((s, r, n, value[(s, r)]) for (s, r), n in grants.items()), key=lambda x: -x[3])
+
+
+def update_arm(state: dict, symbol: str, subreddit: str, stats: dict, now: float | None = None) -> int:
+    """Fold one scrape's stats into the arm; returns the number of posts not fetched by an earlier visit."""
+    arm = state.setdefault(arm_key(symbol, subreddit), {})
+    mark = arm.get("watermark", 0.0)
+    newest = arm.get("newest", mark)
+    resume = arm.get("resume", newest)   # oldest post reached since the watermark last moved
+    created = [c for c in stats.get("created", []) if c]
+    new = sum(1 for c in created if c > newest or mark < c < resume)
+    n_req = stats.get("requests", 0)
+    if n_req:
+        observed = new / n_req
+        arm["yield"] = round((1 - YIELD_ALPHA) * arm.get("yield", observed) + YIELD_ALPHA * observed, 4)
+    arm["newest"] = max([newest] + created)
+    # A first visit only sets the starting point; after that a mark below unscraped posts must stay put
+    if stats.get("complete") or ("watermark" not in arm and created):
+        arm["watermark"] = arm["newest"]
+        arm.pop("resume", None)
+    elif created:
+        # Paging covered [oldest, newest] of this visit; it extends the covered range unless it stopped above it
+        arm["resume"] = min(created) if min(created) > newest else min(resume, min(created))
+    arm["last_run"] = time.time() if now is None else now
+    arm["requests"] = arm.get("requests", 0) + n_req
+    arm["new_posts"] = arm.get("new_posts", 0) + new
+    return new
+
+
+def queue_csv(state: dict, symbol: str, csv_path: str):
+    """Remember a daily CSV that got new posts until it has been processed."""
+    entry = state.setdefault(PROCESS_KEY, {}).setdefault(symbol, {})
+    entry.setdefault("pending", {})[csv_path] = f"{datetime.utcnow():%Y-%m-%d}"
+
+
+def due_csvs(state: dict, now: float | None = None) -> list:
+    """[(symbol, csv)] to process now: CSVs of finished UTC days, the current one every PROCESS_EVERY_SEC."""
+    now = time.time() if now is None else now
+    today = f"{datetime.utcfromtimestamp(now):%Y-%m-%d}"
+    due = []
+    for sym, entry in state.get(PROCESS_KEY, {}).items():
+        waited = now - entry.get("last_run", 0.0) >= PROCESS_EVERY_SEC
+        due += [(sym, csv) for csv, day in sorted(entry.get("pending", {}).items(), key=lambda x: x[1])
+                if day < today or waited]
+    return due
+
+
+def queued_csv(csv_path: str) -> str:
+    print(f"Target CSV: {csv_path}")
+    return csv_path
+
+
+def run_cycle(token: str, symbols=SYMBOLS, subreddits=SUBREDDITS, budget: int = REQUESTS_PER_CYCLE,
+              manifest: Manifest | None = None, dry_run: bool = False) -> dict:
+    """Plan and spend one cycle's budget, then process the queued CSVs that are due."""
+    state = load_state()
+    heat = symbol_heat(symbols)
+    first_cost = {sym: max(len(get_queries(sym)), 1) for sym in symbols}
+    plan = plan_cycle(state, symbols, subreddits, heat, budget, first_cost)
+
+    print(f"\nCycle plan ({sum(n for _, _, n, _ in plan)}/{budget} requests, {len(plan)} arms):")
+    for sym, sub, n, p in plan:
+        print(f"  {sym:<6} r/{sub:<18} {n:>3} req  priority {p:.2f}  heat {heat[sym]:.2f}")
+    if dry_run:
+        return {}
+
+    for sym, sub, n, _ in plan:
+        stats, csv_path = {}, None
+        mark = state.get(arm_key(sym, sub), {}).get("watermark")
+        try:
+            with metrics.span("scrape", symbol=sym, subreddit=sub):
+                csv_path = script_scrape_reddit(sym, sub, token, max_requests=n, stop_before_utc=mark, stats=stats)
+        except Exception as e:
+            print(f"✗ {sym} r/{sub}: {type(e).__name__}: {e}")
+        new = update_arm(state, sym, sub, stats)
+        if new and csv_path:
+            queue_csv(state, sym, csv_path)
+        save_state(state)
+        print(f"✓ {sym} r/{sub}: {new} new post(s) from {stats.get('requests', 0)} request(s)")
+
+    results = {}
+    for sym, csv_path in due_csvs(state):
+        entry = state[PROCESS_KEY][sym]
+        day = entry["pending"][csv_path]
+        stages = [Stage("locate", queued_csv, params={"csv_path": csv_path})] + process_stages(sym)
+        results[f"{sym} {day}"] = res = run_dag(stages, label=f"{sym} {day} / ", manifest=manifest, scope=f"reddit/{sym}")
+        entry["last_run"] = time.time()
+        if res["finbert"].status == "ok":
+            del entry["pending"][csv_path]
+        save_state(state)
+    if results:
+        print_summary("SCHEDULER CYCLE SUMMARY", results)
+    return results
+
+
+def run_forever(symbols=SYMBOLS, subreddits=SUBREDDITS, budget: int = REQUESTS_PER_CYCLE,
+                cycle_minutes: float = CYCLE_MINUTES, once: bool = False, dry_run: bool = False):
+    token, token_time = None, 0.0
+    manifest = Manifest()
+    while True:
+        started = time.time()
+        print("=" * 80)
+        print(f"Scheduler cycle @ {datetime.now():%Y-%m-%d %H:%M:%S}")
+        print("=" * 80)
+        if not dry_run and (token is None or started - token_time > TOKEN_TTL_SEC):
+            token, token_time = get_reddit_token(), started
+        metrics.start_run("scheduler")
+        try:
+            run_cycle(token, symbols, subreddits, budget, manifest, dry_run)
+        except Exception as e:
+            print(f"✗ Cycle failed: {type(e).__name__}: {e}")
+        if once:
+            return
+        wait = cycle_minutes * 60 - (time.time() - started)
+        if wait > 0:
+            print(f"Next cycle in {wait / 60:.1f} min")
+            time.sleep(wait)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Continuously scrape Reddit where new posts are most likely")
+    parser.add_argument("--budget", type=int, default=REQUESTS_PER_CYCLE, help="search requests per cycle")
+    parser.add_argument("--cycle-minutes", type=float, default=CYCLE_MINUTES)
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without scraping")
+    args = parser.parse_args()
+    run_forever(budget=args.budget, cycle_minutes=args.cycle_minutes, once=args.once or args.dry_run,
+                dry_run=args.dry_run)
@@ -2,11 +2,11 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import yfinance as yf
 import os
+import sys
 import glob
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from plotly.subplots import make_subplots
 
@@ -35,42 +35,120 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Volume.intraday_volume import load_buckets, day_profile, BUCKET_MINUTES, Z_THRESHOLD, MIN_BURST_COUNT
+from Storage.lake import has_layer, partition_files, read_partition
+from Storage import catalog
+from Sentiment_Analysis.daily_aggregates import load_daily, refresh, processed_files, aggregate_path, AGG_DIR
+from Sentiment_Analysis.intraday_sentiment import load_intraday, intraday_path, BUCKET_MINUTES as SENT_BUCKET_MINUTES, DEFAULT_BUCKET_MINUTES
+from Storage.price_store import get_prices
+from Dashboard.data_cache import cached_frame
+from Dashboard.downsample import DEFAULT_MAX_POINTS, bucket_freq, bucket_bars, bucket_sentiment, bucket_ohlc, downsample_line
+from Dashboard.overview import BASELINE_DAYS, METRICS, market_overview, heatmap_colors
+from Analytics.lead_lag import WINDOWS, DEFAULT_WINDOW, ticker_results
+from Analytics.fusion import SOURCES, fusion_path
 
 # ==============================================================================
 # 2. DATA LOADING FUNCTIONS
 # ==============================================================================
-@st.cache_data
+VOLUME_COLUMNS = ["symbol", "date", "messages", "tmin_utc", "tmax_utc",
+                  "window_minutes", "msgs_per_hour", "avg_seconds_between"]
+
+# The three loaders below are cached per file (Dashboard/data_cache.py) instead of @st.cache_data:
+# after a pipeline run only the files it rewrote are read again.
+
+def _read_volume_partition(path, source):
+    df = read_partition(path, "volume", columns=VOLUME_COLUMNS).rename(columns={"date": "date_utc"})
+    df["date_utc"] = pd.to_datetime(df["date_utc"])
+    df["source"] = source
+    return df
+
+def _read_volume_csv(path, source):
+    temp_df = pd.read_csv(path)
+    temp_df["source"] = source
+    temp_df.columns = [c.lower() for c in temp_df.columns]
+    if "date_utc" in temp_df.columns:
+        temp_df["date_utc"] = pd.to_datetime(temp_df["date_utc"])
+    return temp_df
+
 def load_volume_data(source="stocktwits"):
     """Loads daily volume stats for all tickers."""
+    # Parquet lake first: one typed, column-projected file per ticker instead of parsing every CSV
+    if has_layer("volume", source):
+        return cached_frame(("volume", "lake", source), lambda: partition_files("volume", source),
+                            lambda f: _read_volume_partition(f, source))
+
     folder = PROJECT_ROOT / "data" / "volume_history" / source
-    all_files = glob.glob(str(folder / "*.csv"))
-    
-    df_list = []
-    for f in all_files:
-        try:
-            temp_df = pd.read_csv(f)
-            temp_df["source"] = source
-            temp_df.columns = [c.lower() for c in temp_df.columns]
-            df_list.append(temp_df)
-        except Exception:
-            continue
-            
-    if not df_list:
+    # Catalog lookup instead of a directory scan once the pipeline has registered its outputs
+    def volume_files():
+        return catalog.find("volume", source) if catalog.is_populated() else sorted(glob.glob(str(folder / "*.csv")))
+    return cached_frame(("volume", "csv", source), volume_files, lambda f: _read_volume_csv(f, source))
+
+def _read_summary_partition(path):
+    # Stocktwits summaries have no weighted score; drop empty columns so the UI fallback still applies
+    sentiment_df = read_partition(path, "summary").drop(columns=["source"]).dropna(axis=1, how="all")
+    sentiment_df["date"] = pd.to_datetime(sentiment_df["date"])
+    return sentiment_df.sort_values("date")
+
+def _read_summary_csv(f, ticker, indexed=False):
+    # 1. Extract Date from Filename (Fallback)
+    match = re.search(r"(\d{8})", f.name)
+    if not match:
         return pd.DataFrame()
-    
-    df = pd.concat(df_list, ignore_index=True)
-    if "date_utc" in df.columns:
-        df["date_utc"] = pd.to_datetime(df["date_utc"])
-    return df
+    file_date_obj = datetime.strptime(match.group(1), "%Y%m%d")
+
+    # 2. Read CSV (only this ticker's rows when the catalog has them indexed)
+    temp = catalog.read_symbol_rows(f, ticker) if indexed else pd.read_csv(f)
+    temp.columns = [c.lower() for c in temp.columns]
+
+    if "symbol" in temp.columns:
+        temp["symbol"] = temp["symbol"].astype(str).str.upper()
+
+    # 3. Filter for Ticker
+    temp = temp[temp["symbol"] == ticker]
+
+    if not temp.empty:
+        # --- THE FIX: Priority Check for Internal Date ---
+        # If the analyzer saved a 'date' column, use it (it contains the real historical dates).
+        # If not, fall back to the filename date.
+        if "date" in temp.columns:
+            temp["date"] = pd.to_datetime(temp["date"])
+        else:
+            temp["date"] = file_date_obj
+    return temp
+
+def _combine_summaries(frames):
+    sent_dfs = [f for f in frames if not f.empty]
+    sentiment_df = pd.concat(sent_dfs, ignore_index=True) if sent_dfs else pd.DataFrame()
+
+    if not sentiment_df.empty:
+        # --- DEDUPLICATION LOGIC ---
+        # 1. Ensure date is datetime for sorting
+        sentiment_df["date"] = pd.to_datetime(sentiment_df["date"])
+
+        # 2. Sort by date
+        sentiment_df = sentiment_df.sort_values("date")
+
+        # 3. Drop Duplicates
+        # If we have multiple rows for "Dec 2nd", keep the LAST one loaded (the most recent run)
+        sentiment_df = sentiment_df.drop_duplicates(subset=['date', 'symbol'], keep='last')
+
+    return sentiment_df
 
-@st.cache_data
 def load_sentiment_summary(ticker, source="stocktwits"):
     """
     Loads the summary reports for a specific ticker.
     UPDATED: 
     1. Removes duplicates if multiple runs occurred on the same day.
     2. Respects the 'date' column INSIDE the file if it exists (fixes the single-bar bug).
+    Reads only this ticker's partition from the Parquet lake when it has been populated.
     """
+    if has_layer("summary", source):
+        return cached_frame(("summary", "lake", source, ticker), lambda: partition_files("summary", source, ticker),
+                            _read_summary_partition)
+
     path_nested = PROJECT_ROOT / "reports" / source
     path_flat = PROJECT_ROOT / f"reports_{source}"
     
@@ -79,128 +157,72 @@ def load_sentiment_summary(ticker, source="stocktwits"):
         sent_path = path_nested
     elif path_flat.exists():
         sent_path = path_flat
-    
-    sent_dfs = []
-    if sent_path:
-        # Recursively find all summary files
-        sent_files = list(sent_path.rglob("*summary*finbert*.csv"))
+
+    indexed = catalog.is_populated()
+
+    def summary_files():
+        if indexed:
+            # Only the files holding this ticker, straight from the catalog's per-symbol index
+            sent_files = catalog.find_symbol("summary", source, ticker)
+        elif sent_path:
+            # Recursively find all summary files
+            sent_files = list(sent_path.rglob("*summary*finbert*.csv"))
+        else:
+            sent_files = []
         # Sort files to ensure we process them in chronological order
-        sent_files = sorted(sent_files)
-        
-        for f in sent_files:
-            try:
-                # 1. Extract Date from Filename (Fallback)
-                match = re.search(r"(\d{8})", f.name)
-                if not match: continue
-                file_date_obj = datetime.strptime(match.group(1), "%Y%m%d")
-                
-                # 2. Read CSV
-                temp = pd.read_csv(f)
-                temp.columns = [c.lower() for c in temp.columns]
-                
-                if "symbol" in temp.columns:
-                    temp["symbol"] = temp["symbol"].astype(str).str.upper()
-                    
-                # 3. Filter for Ticker
-                temp = temp[temp["symbol"] == ticker]
-                
-                if not temp.empty:
-                    # --- THE FIX: Priority Check for Internal Date ---
-                    # If the analyzer saved a 'date' column, use it (it contains the real historical dates).
-                    # If not, fall back to the filename date.
-                    if "date" in temp.columns:
-                        temp["date"] = pd.to_datetime(temp["date"])
-                    else:
-                        temp["date"] = file_date_obj
-                        
-                    sent_dfs.append(temp)
-            except: continue
-        
-    sentiment_df = pd.concat(sent_dfs, ignore_index=True) if sent_dfs else pd.DataFrame()
-    
-    if not sentiment_df.empty:
-        # --- DEDUPLICATION LOGIC ---
-        # 1. Ensure date is datetime for sorting
-        sentiment_df["date"] = pd.to_datetime(sentiment_df["date"])
-        
-        # 2. Sort by date
-        sentiment_df = sentiment_df.sort_values("date")
-        
-        # 3. Drop Duplicates
-        # If we have multiple rows for "Dec 2nd", keep the LAST one loaded (the most recent run)
-        sentiment_df = sentiment_df.drop_duplicates(subset=['date', 'symbol'], keep='last')
+        return sorted(sent_files)
 
-    return sentiment_df
+    return cached_frame(("summary", "csv", source, ticker, indexed), summary_files,
+                        lambda f: _read_summary_csv(f, ticker, indexed), _combine_summaries)
 
-@st.cache_data
 def load_detailed_sentiment(ticker, source="stocktwits"):
     """
-    Loads per-post sentiment data to calculate daily average sentiment.
-    FIXED: Now explicitly checks 'data/processed/finbert/{source}' which is where your analyzer saves files.
+    Daily average sentiment per post, from the materialized per-day aggregates
+    (data/aggregates/daily_sentiment/{source}/{TICKER}.csv, kept up to date by the analyzers).
+    The first request for a ticker without that file builds it once from the enriched files.
     """
-    # 1. Try the specific path structure from your Reddit Analyzer (includes 'finbert')
-    path_finbert = PROJECT_ROOT / "data" / "processed" / "finbert" / source
-    # 2. Fallback to standard path
-    path_standard = PROJECT_ROOT / "data" / "processed" / source
-    
-    processed_root = None
-    if path_finbert.exists():
-        processed_root = path_finbert
-    elif path_standard.exists():
-        processed_root = path_standard
-    else:
+    path = aggregate_path(source, ticker)
+    if not path.exists() and processed_files(source, ticker):
+        refresh(source, ticker)
+    daily = cached_frame(("detailed", source, ticker), lambda: [path], lambda f: load_daily(ticker, source))
+    if daily.empty:
         return pd.DataFrame()
+    return daily.rename(columns={"mean": "score"}).sort_values("date")
 
-    files = list(processed_root.rglob(f"*{ticker}*with_finbert.csv"))
-    
-    df_list = []
-    for f in files:
-        try:
-            temp = pd.read_csv(f)
-            
-            # Identify the score column
-            if 'sentiment_signed' in temp.columns:
-                score_col = 'sentiment_signed'
-            elif 'sentiment_score' in temp.columns:
-                score_col = 'sentiment_score'
-            else:
-                continue 
-                
-            # Date extraction
-            if 'timestamp_iso' in temp.columns:
-                temp['date'] = pd.to_datetime(temp['timestamp_iso']).dt.date
-            else:
-                match = re.search(r"(\d{8})", f.name)
-                if match:
-                    temp['date'] = datetime.strptime(match.group(1), "%Y%m%d").date()
-                else:
-                    continue
-
-            subset = temp[['date', score_col]].copy()
-            subset.rename(columns={score_col: 'score'}, inplace=True)
-            df_list.append(subset)
-            
-        except Exception:
-            continue
-            
-    if not df_list:
-        return pd.DataFrame()
-    
-    combined = pd.concat(df_list, ignore_index=True)
-    
-    # Group by Date for Daily Average
-    daily_sent = combined.groupby('date')['score'].mean().reset_index()
-    daily_sent['date'] = pd.to_datetime(daily_sent['date'])
-    daily_sent = daily_sent.sort_values('date')
-    
-    return daily_sent
+def load_all_daily_sentiment(source="stocktwits"):
+    """Materialized daily sentiment of every ticker of a source (for the overview page)."""
+    folder = AGG_DIR / source
+    return cached_frame(("daily_all", source), lambda: sorted(folder.glob("*.csv")),
+                        lambda f: pd.read_csv(f, usecols=["source", "symbol", "date", "n", "sum_signed", "mean"],
+                                              parse_dates=["date"]))
+
+def load_intraday_sentiment(ticker, source="stocktwits", bucket_minutes=DEFAULT_BUCKET_MINUTES):
+    """Per-bucket sentiment of every stored day (one .npz per ticker, re-read only when it changed)."""
+    path = intraday_path(source, ticker)
+    return cached_frame(("intraday_sentiment", source, ticker, bucket_minutes), lambda: [path],
+                        lambda f: load_intraday(ticker, source, bucket_minutes))
+
+def load_fused(ticker):
+    """Cross-source (symbol, date) rows of one ticker (Analytics/fusion.py)."""
+    path = fusion_path(ticker)
+    return cached_frame(("fused", ticker), lambda: [path], pd.read_parquet)
+
+@st.cache_data
+def load_intraday_days(ticker, source="stocktwits", bucket_minutes=5):
+    """UTC days that have intraday bucket arrays for this ticker."""
+    dates, _ = load_buckets(source, ticker, bucket_minutes)
+    return [pd.Timestamp(d).date() for d in dates]
+
+@st.cache_data
+def load_intraday_profile(ticker, source, day, bucket_minutes=5):
+    """Per-bucket counts, trailing baseline and z-score for one day."""
+    return day_profile(source, ticker, day, bucket_minutes)
 
 @st.cache_data
 def get_stock_price(ticker, start, end):
     try:
-        # Fetch history using yfinance
-        df = yf.Ticker(ticker).history(start=start, end=end + timedelta(days=1))
-        return df
+        # Local OHLCV store, topped up from yfinance only for sessions it does not hold yet
+        return get_prices(ticker, start, end)
     except Exception:
         return pd.DataFrame()
 
@@ -255,7 +277,67 @@ def render_home():
     st.info("Navigate to **Terminal** in the sidebar to visualize the data.")
 
 # ==============================================================================
-# 4. PAGE: TERMINAL
+# 4. PAGE: OVERVIEW
+# ==============================================================================
+def render_overview():
+    st.title("Market Overview")
+
+    st.sidebar.header("Overview Settings")
+    sources = st.sidebar.multiselect("Sources", ["reddit", "stocktwits"], default=["reddit", "stocktwits"])
+    window = st.sidebar.slider("Baseline (days)", 5, 60, BASELINE_DAYS)
+
+    # All tickers at once from the cached per-source frames, then one vectorized pass
+    volume = [v for v in (load_volume_data(s) for s in sources) if not v.empty]
+    daily = [d for d in (load_all_daily_sentiment(s) for s in sources) if not d.empty]
+    volume = pd.concat(volume, ignore_index=True) if volume else pd.DataFrame()
+    daily = pd.concat(daily, ignore_index=True) if daily else pd.DataFrame()
+    ov = market_overview(volume, daily, window)
+
+    if ov.empty:
+        st.info("No volume or daily sentiment data yet. Run the pipelines (or `python Sentiment_Analysis/daily_aggregates.py`).")
+        return
+
+    sort_col = st.sidebar.selectbox("Sort by", list(METRICS), format_func=METRICS.get)
+    descending = st.sidebar.checkbox("Descending", value=True)
+    max_rows = st.sidebar.number_input("Heatmap rows", min_value=5, max_value=1000, value=50, step=5)
+    ov = ov.sort_values(sort_col, ascending=not descending, na_position="last")
+
+    k1, k2, k3 = st.columns(3)
+    with k1: st.metric("Tickers", f"{ov['symbol'].nunique()}")
+    with k2: st.metric("Velocity z ≥ 2", f"{int((ov['velocity_z'] >= 2).sum())}")
+    with k3: st.metric("Latest Day", f"{ov['last_date'].max():%Y-%m-%d}" if ov['last_date'].notna().any() else "N/A")
+
+    # --- HEATMAP: color is each metric's z-score across tickers, text the actual value ---
+    top = ov.head(int(max_rows))
+    metrics = list(METRICS)
+    text = pd.DataFrame({
+        "velocity_z": top["velocity_z"].map(lambda v: f"{v:+.2f}"),
+        "volume_change": top["volume_change"].map(lambda v: f"{v:+.0%}"),
+        "sentiment": top["sentiment"].map(lambda v: f"{v:+.3f}"),
+        "sentiment_change": top["sentiment_change"].map(lambda v: f"{v:+.3f}"),
+    }).where(top[metrics].notna(), "")
+    fig_heat = go.Figure(go.Heatmap(
+        z=heatmap_colors(top, metrics),
+        x=[METRICS[m] for m in metrics],
+        y=[f"{sym} · {src}" for sym, src in zip(top["symbol"], top["source"])],
+        text=text.to_numpy(), texttemplate="%{text}",
+        colorscale="RdYlGn", zmid=0, zmin=-3, zmax=3, showscale=False,
+        hovertemplate="%{y}<br>%{x}: %{text}<extra></extra>"
+    ))
+    fig_heat.update_layout(
+        template="plotly_dark",
+        height=max(300, 24 * len(top) + 60),
+        margin=dict(l=10, r=10, t=30, b=10),
+        yaxis=dict(autorange="reversed")
+    )
+    st.plotly_chart(fig_heat, use_container_width=True)
+
+    # --- TABLE: every ticker, sortable by clicking a column header ---
+    st.dataframe(ov.round({c: 3 for c in ["msgs_per_hour", *METRICS]}).rename(columns={"msgs_per_hour": "msgs/hour", **METRICS}),
+                 use_container_width=True, hide_index=True)
+
+# ==============================================================================
+# 5. PAGE: TERMINAL
 # ==============================================================================
 def render_terminal():
     st.title("Market Terminal")
@@ -304,6 +386,11 @@ def render_terminal():
         default_val = min(50.0, float(curr_max))
         y_limit = st.sidebar.slider("Max Velocity", 5.0, 500.0, default_val)
 
+    # Long ranges are downsampled on the server; a range that fits the budget is drawn exactly
+    max_points = st.sidebar.slider("Chart Detail (max points)", 200, 3000, DEFAULT_MAX_POINTS, step=100,
+                                   help="Roughly the chart width in pixels. Narrow the date range for exact data.")
+    bar_freq, bar_label = bucket_freq(start_d, end_d, max_points)
+
     # --- FILTERING LOGIC ---
     def filter_date(df, date_col):
         if df.empty or date_col not in df.columns:
@@ -336,7 +423,7 @@ def render_terminal():
     st.markdown("---")
     st.subheader(f"Price Action ({ticker})")
     
-    price_df = get_stock_price(ticker, start_d, end_d)
+    price_df = bucket_ohlc(get_stock_price(ticker, start_d, end_d), bar_freq)
     
     if not price_df.empty:
         fig_price = go.Figure(data=[go.Candlestick(
@@ -361,20 +448,22 @@ def render_terminal():
         st.warning(f"Could not load price data for {ticker}. Ensure the ticker is a valid Yahoo Finance symbol.")
 
     # --- CHART 1: DAILY MESSAGE VOLUME ---
-    st.subheader("Daily Message Volume")
+    st.subheader("Daily Message Volume" if bar_freq == "D" else f"Message Volume per {bar_label.title()}")
     
     if not v1.empty:
         fig_vol = go.Figure()
+        v1_bars = bucket_bars(v1, "date_utc", bar_freq, sums=["messages"])
         
         fig_vol.add_trace(go.Bar(
-            x=v1['date_utc'], y=v1['messages'],
+            x=v1_bars['date_utc'], y=v1_bars['messages'],
             name=ticker,
             marker_color='#87CEFA'
         ))
         
         if not v2.empty:
+            v2_bars = bucket_bars(v2, "date_utc", bar_freq, sums=["messages"])
             fig_vol.add_trace(go.Bar(
-                x=v2['date_utc'], y=v2['messages'],
+                x=v2_bars['date_utc'], y=v2_bars['messages'],
                 name=ticker2,
                 marker_color='#D033FF',
                 opacity=0.8
@@ -397,15 +486,17 @@ def render_terminal():
     if not v1.empty:
         fig_vel = go.Figure()
         
+        v1_line = downsample_line(v1, "date_utc", "msgs_per_hour", max_points)
         fig_vel.add_trace(go.Scatter(
-            x=v1['date_utc'], y=v1['msgs_per_hour'],
+            x=v1_line['date_utc'], y=v1_line['msgs_per_hour'],
             mode='lines+markers', name=f"{ticker}",
             line=dict(color='#00F5FF', width=2), marker=dict(size=4)
         ))
         
         if not v2.empty:
+            v2_line = downsample_line(v2, "date_utc", "msgs_per_hour", max_points)
             fig_vel.add_trace(go.Scatter(
-                x=v2['date_utc'], y=v2['msgs_per_hour'],
+                x=v2_line['date_utc'], y=v2_line['msgs_per_hour'],
                 mode='lines', name=f"{ticker2}",
                 line=dict(color='#FF00FF', width=2, dash='dot')
             ))
@@ -423,6 +514,43 @@ def render_terminal():
         )
         st.plotly_chart(fig_vel, use_container_width=True)
 
+    # --- CHART 2b: INTRADAY VELOCITY ---
+    st.subheader("Intraday Hype Velocity")
+    c_bucket, c_day = st.columns([1, 3])
+    with c_bucket:
+        bucket_minutes = st.selectbox("Bucket (min)", list(BUCKET_MINUTES), index=1, key="intraday_bucket")
+    intraday_days = [d for d in load_intraday_days(ticker, data_source, bucket_minutes) if start_d <= d <= end_d]
+
+    if intraday_days:
+        with c_day:
+            intraday_day = st.selectbox("Day (UTC)", intraday_days[::-1], index=0, key="intraday_day")
+        prof = load_intraday_profile(ticker, data_source, intraday_day, bucket_minutes)
+        burst = (prof['z'] >= Z_THRESHOLD) & (prof['messages'] >= MIN_BURST_COUNT)
+
+        fig_intra = go.Figure()
+        fig_intra.add_trace(go.Bar(
+            x=prof['bucket_start_utc'], y=prof['msgs_per_hour'],
+            name="Velocity",
+            marker_color=['#FF4444' if b else '#00F5FF' for b in burst]
+        ))
+        fig_intra.add_trace(go.Scatter(
+            x=prof['bucket_start_utc'], y=prof['baseline'] * (60.0 / bucket_minutes),
+            mode='lines', name="Trailing baseline",
+            line=dict(color='#FFD700', width=1, dash='dot')
+        ))
+        fig_intra.update_layout(
+            template="plotly_dark",
+            height=300,
+            margin=dict(l=10, r=10, t=30, b=10),
+            legend=dict(orientation="h", y=1.1),
+            hovermode="x unified",
+            yaxis_title="Messages per Hour"
+        )
+        st.plotly_chart(fig_intra, use_container_width=True)
+        st.caption(f"Red bars are bursts: z ≥ {Z_THRESHOLD:g} vs. the trailing 24h baseline and at least {MIN_BURST_COUNT} messages in the bucket.")
+    else:
+        st.info("No intraday buckets for this ticker in the selected range. Re-run the volume script to generate them.")
+
     # --- CHART 3: DAILY SENTIMENT (With Toggle & Safety Check) ---
     st.markdown("---")
     st.subheader(f"Daily Average Sentiment ({ticker})")
@@ -459,6 +587,15 @@ def render_terminal():
             st.warning(f"Metric '{y_col}' not found. Please run your updated pipeline to generate scores.")
         else:
             fig_sent = go.Figure()
+            if plot_df is s_daily:
+                plot_df = bucket_sentiment(plot_df, bar_freq)
+            else:
+                has_counts = "messages" in plot_df.columns
+                plot_df = bucket_bars(plot_df, "date", bar_freq, sums=["messages"] if has_counts else (),
+                                      weight="messages" if has_counts else None,
+                                      means=[c for c in ("sentiment_mean", "sentiment_weighted") if c in plot_df.columns])
+            if bar_freq != "D":
+                st.caption(f"One bar per {bar_label} for this range.")
             
             # Dynamic Color Logic
             colors = ['#00FF7F' if val >= 0 else '#FF4444' for val in plot_df[y_col]]
@@ -484,15 +621,168 @@ def render_terminal():
     else:
         st.info(f"No sentiment data available for {ticker} in this range.")
 
+    # --- CHART 3b: INTRADAY SENTIMENT ---
+    st.subheader(f"Intraday Sentiment ({ticker})")
+    c_sbucket, c_sday, c_sdays = st.columns([1, 2, 1])
+    with c_sbucket:
+        sent_bucket = st.selectbox("Bucket (min)", list(SENT_BUCKET_MINUTES),
+                                   index=list(SENT_BUCKET_MINUTES).index(DEFAULT_BUCKET_MINUTES), key="sent_bucket")
+    intra_sent = load_intraday_sentiment(ticker, data_source, sent_bucket)
+    sent_days = []
+    if not intra_sent.empty:
+        has_msgs = intra_sent[intra_sent["n"] > 0]
+        sent_days = sorted({d for d in has_msgs["bucket_start_utc"].dt.date if start_d <= d <= end_d})
+
+    if sent_days:
+        with c_sday:
+            sent_last_day = st.selectbox("Last day (UTC)", sent_days[::-1], index=0, key="sent_day")
+        with c_sdays:
+            sent_span = st.number_input("Days", min_value=1, max_value=14, value=3, key="sent_span")
+        first_day = sent_last_day - pd.Timedelta(days=int(sent_span) - 1)
+        day_of = intra_sent["bucket_start_utc"].dt.date
+        prof = intra_sent[(day_of >= first_day) & (day_of <= sent_last_day)]
+
+        fig_isent = make_subplots(specs=[[{"secondary_y": True}]])
+        fig_isent.add_trace(go.Bar(
+            x=prof['bucket_start_utc'], y=prof['n'],
+            name="Messages", marker_color='#30363D'
+        ), secondary_y=True)
+        fig_isent.add_trace(go.Scatter(
+            x=prof['bucket_start_utc'], y=prof['mean'],
+            mode='lines+markers', name="Mean sentiment", connectgaps=False,
+            line=dict(color='#00FF7F', width=2), marker=dict(size=4)
+        ), secondary_y=False)
+        if data_source == "reddit":
+            fig_isent.add_trace(go.Scatter(
+                x=prof['bucket_start_utc'], y=prof['weighted'],
+                mode='lines', name="Crowd weighted", connectgaps=False,
+                line=dict(color='#FFD700', width=1, dash='dot')
+            ), secondary_y=False)
+        fig_isent.add_hline(y=0, line_dash="solid", line_color="white", line_width=1)
+        fig_isent.update_layout(
+            template="plotly_dark",
+            height=320,
+            margin=dict(l=10, r=10, t=30, b=10),
+            legend=dict(orientation="h", y=1.1),
+            hovermode="x unified"
+        )
+        fig_isent.update_yaxes(title_text="Score (-1 to +1)", secondary_y=False)
+        fig_isent.update_yaxes(title_text="Messages", showgrid=False, secondary_y=True)
+        st.plotly_chart(fig_isent, use_container_width=True)
+        st.caption(f"Raw (unsmoothed) mean per {sent_bucket}-minute UTC bucket; buckets without messages are left empty.")
+    else:
+        st.info("No intraday sentiment for this ticker in the selected range. Run `python Sentiment_Analysis/intraday_sentiment.py` to build it.")
+
+    # --- CHART 3c: ALL SOURCES ---
+    st.subheader(f"Sentiment Across Sources ({ticker})")
+    fused = filter_date(load_fused(ticker), "date")
+    if not fused.empty and fused["sources"].max() > 0:
+        # Each source's mean is weighted by its own post count when days are bucketed. Daily rows come back
+        # whole from bucket_bars, so keep only each part's own columns before merging.
+        parts = [bucket_bars(fused, "date", bar_freq, sums=[f"{src}_messages"], means=[f"{src}_sentiment"], weight=f"{src}_n")
+                 [["date", f"{src}_messages", f"{src}_sentiment"]] for src in SOURCES]
+        parts.append(bucket_bars(fused, "date", bar_freq, means=["sentiment", "sentiment_balanced"], weight="n")
+                     [["date", "sentiment", "sentiment_balanced"]])
+        cross = parts[0]
+        for part in parts[1:]:
+            cross = cross.merge(part, on="date", how="outer")
+
+        src_colors = {"reddit": "#FF4500", "stocktwits": "#00F5FF"}
+        fig_cross = make_subplots(specs=[[{"secondary_y": True}]])
+        for src in SOURCES:
+            fig_cross.add_trace(go.Bar(
+                x=cross['date'], y=cross[f"{src}_messages"],
+                name=f"{src.title()} messages", marker_color=src_colors.get(src), opacity=0.35
+            ), secondary_y=True)
+            fig_cross.add_trace(go.Scatter(
+                x=cross['date'], y=cross[f"{src}_sentiment"],
+                mode='lines', name=f"{src.title()} sentiment", connectgaps=False,
+                line=dict(color=src_colors.get(src), width=1.5)
+            ), secondary_y=False)
+        fig_cross.add_trace(go.Scatter(
+            x=cross['date'], y=cross['sentiment'],
+            mode='lines', name="Pooled", line=dict(color='#FFFFFF', width=2)
+        ), secondary_y=False)
+        fig_cross.add_trace(go.Scatter(
+            x=cross['date'], y=cross['sentiment_balanced'],
+            mode='lines', name="Balanced", line=dict(color='#FFD700', width=1, dash='dot')
+        ), secondary_y=False)
+        fig_cross.update_layout(
+            template="plotly_dark",
+            height=350,
+            barmode="stack",
+            margin=dict(l=10, r=10, t=30, b=10),
+            legend=dict(orientation="h", y=1.1),
+            hovermode="x unified"
+        )
+        fig_cross.update_yaxes(title_text="Score (-1 to +1)", secondary_y=False)
+        fig_cross.update_yaxes(title_text="Messages", showgrid=False, secondary_y=True)
+        st.plotly_chart(fig_cross, use_container_width=True)
+        st.caption("Pooled: every post counts once. Balanced: each source's daily mean counts once, whatever its volume.")
+    else:
+        st.info("No cross-source rows for this ticker yet. Run `python Analytics/fusion.py` to build them.")
+
+    # --- CHART 4: LEAD / LAG VS. RETURNS ---
+    st.markdown("---")
+    st.subheader(f"Sentiment & Volume vs. Returns ({ticker})")
+    ll_window = st.select_slider("Rolling window (sessions)", options=list(WINDOWS), value=DEFAULT_WINDOW, key="ll_window")
+    try:
+        # Computed for all tickers at once and cached on disk until the pipeline writes new data
+        ll = ticker_results(data_source, ticker, ll_window)
+    except Exception as e:
+        ll = None
+        st.warning(f"Lead/lag analytics unavailable: {e}")
+
+    if ll is not None and not ll["xcorr"].empty and ll["xcorr"]["corr"].notna().any():
+        signal_colors = {"sentiment": '#00FF7F', "volume": '#87CEFA'}
+        c_xc, c_roll = st.columns(2)
+        with c_xc:
+            fig_xc = go.Figure()
+            for name, grp in ll["xcorr"].groupby("signal"):
+                fig_xc.add_trace(go.Bar(x=grp['lag'], y=grp['corr'], name=name, marker_color=signal_colors.get(name)))
+            fig_xc.update_layout(
+                template="plotly_dark", height=320, margin=dict(l=10, r=10, t=30, b=10), barmode='group',
+                xaxis_title="Lag k (sessions, k > 0: signal leads)", yaxis_title="corr(signal_t, return_t+k)",
+                legend=dict(orientation="h", y=1.1)
+            )
+            st.plotly_chart(fig_xc, use_container_width=True)
+        with c_roll:
+            fig_roll = go.Figure()
+            roll = ll["rolling"]
+            roll = roll[(roll['date'].dt.date >= start_d) & (roll['date'].dt.date <= end_d)]
+            for name, grp in roll.groupby("signal"):
+                grp = downsample_line(grp, "date", "corr", max_points)
+                fig_roll.add_trace(go.Scatter(x=grp['date'], y=grp['corr'], mode='lines', name=name,
+                                              line=dict(color=signal_colors.get(name), width=2)))
+            fig_roll.add_hline(y=0, line_dash="solid", line_color="white", line_width=1)
+            fig_roll.update_layout(
+                template="plotly_dark", height=320, margin=dict(l=10, r=10, t=30, b=10),
+                yaxis=dict(title=f"{ll_window}-session correlation", range=[-1, 1]),
+                legend=dict(orientation="h", y=1.1), hovermode="x unified"
+            )
+            st.plotly_chart(fig_roll, use_container_width=True)
+
+        cols = st.columns(len(ll["summary"]))
+        for col, (_, row) in zip(cols, ll["summary"].iterrows()):
+            with col:
+                p = row['granger_p']
+                st.metric(f"{row['signal'].title()} → returns (Granger p)", f"{p:.3f}" if pd.notna(p) else "N/A",
+                          help=f"Reverse direction p = {row['reverse_p']:.3f}" if pd.notna(row['reverse_p']) else None)
+        st.caption("Daily log returns from the local price store; weekend posts count towards the next session.")
+    elif ll is not None:
+        st.info(f"Not enough overlapping price and {data_source} history for {ticker} yet.")
+
 # ==============================================================================
 # MAIN NAVIGATION
 # ==============================================================================
 def main():
     st.sidebar.title("Navigation")
-    page = st.sidebar.radio("Go to", ["Home", "Terminal"])
+    page = st.sidebar.radio("Go to", ["Home", "Overview", "Terminal"])
     
     if page == "Home":
         render_home()
+    elif page == "Overview":
+        render_overview()
     else:
         render_terminal()
 
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+import pandas as pd
+from pathlib import Path
+
+# File-change-aware cache for the dashboard loaders.
+#
+# A loader's data is a set of partitions, one file each (a lake partition, a volume CSV, a summary report,
+# an aggregate file). On every call the partitions are listed and stat'ed; only files whose (mtime, size)
+# changed since the last call are read again and spliced into the cached frame, deleted files drop out.
+# The check is throttled to once per CHECK_INTERVAL_SEC per loader and arguments, so widget reruns cost
+# nothing and fresh pipeline output shows up on the next rerun a few seconds later, without a full reload.
+#
+# The cache lives at module level: Streamlit imports this module once per server process, so every
+# session shares it and it survives script reruns (unlike locals of the dashboard script).
+
+CHECK_INTERVAL_SEC = 3.0
+
+
+def file_stamp(path) -> tuple | None:
+    """(mtime_ns, size) of a file, None if it is gone."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _concat(frames) -> pd.DataFrame:
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+class PartitionedFrame:
+    """
+    A frame assembled from per-file parts.
+    list_partitions() -> paths (order is kept when combining), read_partition(path) -> DataFrame,
+    combine([DataFrame]) -> DataFrame (default: concat).
+    """
+
+    def __init__(self, list_partitions, read_partition, combine=None):
+        self.list_partitions = list_partitions
+        self.read_partition = read_partition
+        self.combine = combine or _concat
+        self.parts = {}  # path -> (stamp, frame)
+        self.frame = None
+        self.checked = 0.0
+        self.reads = 0
+        self.lock = threading.Lock()
+
+    def get(self) -> pd.DataFrame:
+        with self.lock:
+            now = time.monotonic()
+            if self.frame is not None and now - self.checked < CHECK_INTERVAL_SEC:
+                return self.frame
+            self.checked = now
+
+            paths = [Path(p) for p in self.list_partitions()]
+            stamps = {p: file_stamp(p) for p in paths}
+            paths = [p for p in paths if stamps[p] is not None]
+            removed = set(self.parts) - set(paths)
+            changed = [p for p in paths if p not in self.parts or self.parts[p][0] != stamps[p]]
+            if self.frame is not None and not removed and not changed:
+                return self.frame
+
+            for p in removed:
+                del self.parts[p]
+            for p in changed:
+                try:
+                    self.parts[p] = (stamps[p], self.read_partition(p))
+                    self.reads += 1
+                except Exception as e:
+                    # Keep the previous version (if any); the stale stamp makes the next check retry
+                    print(f"⚠ Dashboard cache: could not read {p}: {e}")
+            self.frame = self.combine([self.parts[p][1] for p in paths if p in self.parts])
+            return self.frame
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def cached_frame(key, list_partitions, read_partition, combine=None) -> pd.DataFrame:
+    """
+    The current frame for `key` (loader name + arguments), re-reading only changed partitions.
+    Returns a copy, callers may modify it.
+    """
+    with _CACHES_LOCK:
+        entry = _CACHES.get(key)
+        if entry is None:
+            entry = _CACHES[key] = PartitionedFrame(list_partitions, read_partition, combine)
+    return entry.get().copy()
+
+
+def clear():
+    with _CACHES_LOCK:
+        _CACHES.clear()
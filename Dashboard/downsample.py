@@ -0,0 +1,109 @@
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Sentiment_Analysis.daily_aggregates import STAT_COLUMNS, merge, finalize
+
+# Server-side downsampling for the long-range dashboard charts, so Plotly gets about as many points as
+# the chart has pixels instead of every day since 2014:
+#
+#   lines  LTTB (largest triangle three buckets): max_points points that keep the visual shape, peaks included
+#   bars   re-bucketed to day / week / month / quarter, the finest that gives at most max_bars bars. The
+#          bucket size comes from the selected date range, so compared tickers share the same buckets.
+#   OHLC   same buckets: first open, highest high, lowest low, last close
+#
+# A range that fits the budget is returned untouched: narrowing the date range shows the exact data.
+# Sentiment bars are recomputed from the daily sufficient statistics, so a weekly bar is the exact mean
+# of that week's posts rather than a mean of daily means.
+
+DEFAULT_MAX_POINTS = 800
+FREQS = [("D", "day", 1.0), ("W", "week", 7.0), ("M", "month", 30.44), ("Q", "quarter", 91.31)]
+
+
+def bucket_freq(start, end, max_bars: int = DEFAULT_MAX_POINTS) -> tuple:
+    """(pandas period code, label) of the finest bucket giving at most max_bars bars over [start, end]."""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for code, label, length in FREQS:
+        if days / length + 1 <= max_bars:
+            return code, label
+    return FREQS[-1][:2]
+
+
+def bucket_start(dates: pd.Series, freq: str) -> pd.Series:
+    return dates.dt.to_period(freq).dt.start_time
+
+
+def bucket_bars(df: pd.DataFrame, date_col: str, freq: str, sums=(), means=(), weight: str | None = None) -> pd.DataFrame:
+    """
+    One row per bucket: `sums` columns added up, `means` columns averaged (weighted by the `weight`
+    column when given). Daily data with one row per day is returned as is.
+    """
+    if df.empty or (freq == "D" and not df[date_col].duplicated().any()):
+        return df
+    key = bucket_start(df[date_col], freq).rename(date_col)
+    out = df.groupby(key)[list(sums)].sum() if sums else pd.DataFrame(index=key.drop_duplicates().sort_values())
+    for col in means:
+        if weight is not None:
+            w = df[weight].where(df[col].notna(), 0)
+            out[col] = (df[col] * w).groupby(key).sum() / w.groupby(key).sum().replace(0, np.nan)
+        else:
+            out[col] = df[col].groupby(key).mean()
+    return out.reset_index()
+
+
+def bucket_sentiment(daily: pd.DataFrame, freq: str, date_col: str = "date") -> pd.DataFrame:
+    """Re-bucket materialized daily sentiment rows (with their STAT_COLUMNS) exactly; 'mean' becomes 'score'."""
+    if daily.empty or freq == "D" or not set(STAT_COLUMNS) <= set(daily.columns):
+        return daily
+    stats = daily[[date_col] + STAT_COLUMNS].assign(**{date_col: bucket_start(daily[date_col], freq)})
+    return finalize(merge([stats], keys=[date_col])).rename(columns={"mean": "score"})
+
+
+def bucket_ohlc(prices: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Candles per bucket from daily candles indexed by date."""
+    if prices.empty or freq == "D":
+        return prices
+    key = prices.index.to_period(freq).start_time
+    g = prices.groupby(key)
+    out = pd.DataFrame({"Open": g["Open"].first(), "High": g["High"].max(), "Low": g["Low"].min(), "Close": g["Close"].last()})
+    if "Volume" in prices.columns:
+        out["Volume"] = g["Volume"].sum()
+    out.index.name = prices.index.name
+    return out
+
+
+def lttb_indices(x, y, threshold: int) -> np.ndarray:
+    """Positions of the `threshold` points LTTB keeps out of (x, y); all of them if there are not more."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last point are always kept; the others are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # Twice the area of the triangle (previous kept point, candidate, average of the next bucket)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_line(df: pd.DataFrame, x_col: str, y_col: str, max_points: int = DEFAULT_MAX_POINTS) -> pd.DataFrame:
+    """The rows of df (sorted by x) that LTTB keeps for the y_col line."""
+    df = df.dropna(subset=[y_col]).sort_values(x_col)
+    if len(df) <= max_points:
+        return df
+    x = pd.to_datetime(df[x_col]).astype("int64") if not pd.api.types.is_numeric_dtype(df[x_col]) else df[x_col]
+    return df.iloc[lttb_indices(x.to_numpy(), df[y_col].to_numpy(), max_points)]
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Market overview: one row per (source, symbol) with the latest day against its trailing baseline,
+# computed with a few groupby passes over the daily volume and daily sentiment frames of all tickers
+# (no per-ticker loop, so hundreds of tickers cost about the same as ten).
+#
+#   velocity_z        (latest msgs/hour - baseline mean) / baseline std
+#   volume_change     latest messages / baseline median - 1
+#   sentiment         latest day's mean signed sentiment
+#   sentiment_change  latest minus the baseline's post-weighted mean (sum_signed / n over the window)
+#
+# The baseline is the BASELINE_DAYS rows before the latest one; with fewer than MIN_BASELINE_DAYS
+# the comparisons are left empty.
+
+BASELINE_DAYS = 14
+MIN_BASELINE_DAYS = 3
+KEYS = ["source", "symbol"]
+METRICS = {
+    "velocity_z": "Velocity z",
+    "volume_change": "Volume vs. baseline",
+    "sentiment": "Sentiment",
+    "sentiment_change": "Sentiment vs. baseline",
+}
+COLUMNS = KEYS + ["last_date", "messages", "msgs_per_hour", "velocity_z", "volume_change",
+                  "sentiment_date", "sentiment", "sentiment_change"]
+
+
+def _latest_and_baseline(df: pd.DataFrame, date_col: str, window: int):
+    """Each group's newest row (indexed by KEYS) and the `window` rows before it."""
+    tail = df.sort_values(KEYS + [date_col]).groupby(KEYS, sort=False).tail(window + 1)
+    is_latest = tail.groupby(KEYS, sort=False).cumcount(ascending=False) == 0
+    return tail[is_latest].set_index(KEYS), tail[~is_latest]
+
+
+def volume_overview(volume: pd.DataFrame, window: int = BASELINE_DAYS) -> pd.DataFrame:
+    if volume.empty:
+        return pd.DataFrame()
+    latest, base = _latest_and_baseline(volume, "date_utc", window)
+    g = base.groupby(KEYS)
+    out = latest[["date_utc", "messages", "msgs_per_hour"]].join(pd.DataFrame({
+        "vel_mean": g["msgs_per_hour"].mean(),
+        "vel_std": g["msgs_per_hour"].std(),
+        "msg_median": g["messages"].median(),
+        "base_days": g.size(),
+    }))
+    enough = out["base_days"].fillna(0) >= MIN_BASELINE_DAYS
+    out["velocity_z"] = ((out["msgs_per_hour"] - out["vel_mean"]) / out["vel_std"].where(out["vel_std"] > 0)).where(enough)
+    out["volume_change"] = (out["messages"] / out["msg_median"].where(out["msg_median"] > 0) - 1).where(enough)
+    return out.rename(columns={"date_utc": "last_date"})[["last_date", "messages", "msgs_per_hour", "velocity_z", "volume_change"]]
+
+
+def sentiment_overview(daily: pd.DataFrame, window: int = BASELINE_DAYS) -> pd.DataFrame:
+    """From materialized daily sentiment rows (source, symbol, date, n, sum_signed, mean)."""
+    if daily.empty:
+        return pd.DataFrame()
+    latest, base = _latest_and_baseline(daily, "date", window)
+    g = base.groupby(KEYS)
+    n = g["n"].sum()
+    out = latest[["date", "mean"]].join(pd.DataFrame({"base_mean": g["sum_signed"].sum() / n.where(n > 0), "base_days": g.size()}))
+    enough = out["base_days"].fillna(0) >= MIN_BASELINE_DAYS
+    out["sentiment_change"] = (out["mean"] - out["base_mean"]).where(enough)
+    return out.rename(columns={"date": "sentiment_date", "mean": "sentiment"})[["sentiment_date", "sentiment", "sentiment_change"]]
+
+
+def market_overview(volume: pd.DataFrame, daily: pd.DataFrame, window: int = BASELINE_DAYS) -> pd.DataFrame:
+    """One row per (source, symbol) present in either frame."""
+    parts = [p for p in (volume_overview(volume, window), sentiment_overview(daily, window)) if not p.empty]
+    if not parts:
+        return pd.DataFrame()
+    out = parts[0].join(parts[1], how="outer") if len(parts) == 2 else parts[0]
+    return out.reset_index().reindex(columns=COLUMNS)
+
+
+def heatmap_colors(df: pd.DataFrame, columns) -> np.ndarray:
+    """Per-column z-scores across tickers (clipped to +-3), so metrics on different scales share one color map."""
+    values = df[list(columns)].astype(np.float64)
+    std = values.std().replace(0, np.nan)
+    return ((values - values.mean()) / std).clip(-3, 3).to_numpy()
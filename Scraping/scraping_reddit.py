@@ -2,15 +2,27 @@ import requests
 import time
 import re
 import os
+import math
+import sys
 import csv
-import yfinance as yf
 from datetime import datetime, timezone
+from functools import lru_cache
 from dotenv import load_dotenv
 from pathlib import Path
 import pandas as pd
 
 # Load environment variables from .env file in project root
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Automation import metrics
+from Storage.price_store import company_name
+from Volume.stream_detector import BurstDetector
+from Storage.lake import safe_write_frame
+from Storage.catalog import safe_register
+from Storage.schema import read_messages, compact_messages, to_csv_frame
+
 env_path = PROJECT_ROOT / ".env"
 load_dotenv(dotenv_path=env_path)
 
@@ -18,6 +30,7 @@ load_dotenv(dotenv_path=env_path)
 CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
 CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 USER_AGENT = os.getenv("REDDIT_USER_AGENT", "wsb-ticker-scraper/0.1 by Niels van Brussel")
+SYMBOL = "META"  # defaults for running this file directly; the pipeline passes its own
 SUBREDDIT = "QuantFinance"
 
 # Validate credentials
@@ -30,21 +43,20 @@ def get_reddit_token():
     data = {'grant_type': 'client_credentials'}
     headers = {'User-Agent': USER_AGENT}
     
-    res = requests.post('https://www.reddit.com/api/v1/access_token', 
-                       auth=auth, data=data, headers=headers)
+    with metrics.span("oauth"):
+        metrics.count("http_requests")
+        res = requests.post('https://www.reddit.com/api/v1/access_token', 
+                           auth=auth, data=data, headers=headers)
     
     if res.status_code != 200:
         raise Exception(f"OAuth failed: {res.status_code} {res.text}")
     
     return res.json()['access_token']
 
+@lru_cache(maxsize=None)
 def get_queries(symbol):
-    """Generate search queries for a symbol using yfinance."""
-    try:
-        t = yf.Ticker(symbol)
-        name = t.info.get('shortName') or t.info.get('longName')
-    except:
-        name = None
+    """Generate search queries for a symbol from its company name (cached in the price store metadata)."""
+    name = company_name(symbol)
     
     if not name:
         print(f"Warning: Could not fetch name for {symbol}. Using ticker only.")
@@ -62,29 +74,41 @@ def get_queries(symbol):
         f'"{clean_name.lower()}"'
     ]
     
-    return list(set(queries))
+    return sorted(set(queries))
 
-def script_scrape_reddit():
-    """Main Reddit scraping function."""
+def script_scrape_reddit(symbol: str = SYMBOL, subreddit: str = SUBREDDIT, token: str | None = None,
+                         max_requests: int | None = None, stop_before_utc: float | None = None,
+                         stats: dict | None = None) -> str | None:
+    """
+    Scrape one subreddit for a symbol and merge the posts into today's CSV.
+    Pass a token to reuse one OAuth login across calls. Returns the CSV path (None if nothing was saved).
+    Scheduler knobs: max_requests caps the search calls (429 retries included; each query gets its share of
+    what is left), stop_before_utc stops paging a query once a page holds nothing newer than it (instead of the
+    page/post caps), and stats receives {"requests", "created", "oldest", "complete"} for the call.
+    """
     print("Reddit Scraping Script Start")
     
-    symbol = "META"  # Will be replaced by daily_pipeline_reddit.py
-    
     # Authenticate
-    token = get_reddit_token()
-    print(f"Successfully authenticated! Token: {token[:10]}...")
+    if token is None:
+        token = get_reddit_token()
+        print(f"Successfully authenticated! Token: {token[:10]}...")
     
     # Get search queries
     queries = get_queries(symbol)
-    url = f"https://oauth.reddit.com/r/{SUBREDDIT}/search.json"
+    url = f"https://oauth.reddit.com/r/{subreddit}/search.json"
     print(f"Generated Queries for {symbol}: {queries}")
     
     # Scraping parameters
     TARGET_POSTS = 2000
     MAX_PAGES = 50
     SLEEP_SEC = 2
+    if stop_before_utc is not None:
+        # The watermark / backfill cutoff is the depth: page until it is reached
+        TARGET_POSTS = MAX_PAGES = math.inf
     
     all_unique_posts = {}
+    # Live burst detection: new posts are fed per scrape instead of waiting for the nightly volume run
+    detector = BurstDetector()
     
     print(f"--- Starting Scraping for {symbol} ---")
     
@@ -93,63 +117,100 @@ def script_scrape_reddit():
         'Authorization': f'bearer {token}'
     }
     
-    for query in queries:
-        print(f"--- Started scraping for {SUBREDDIT} ---")
-        print(f"--- Started scraping for {query} ---")
+    requests_made = 0
+    complete = True  # every query paged to the end of its results or down to stop_before_utc
+    with metrics.span("paging", symbol=symbol, subreddit=subreddit):
+        for qi, query in enumerate(queries):
+            if max_requests is not None and requests_made >= max_requests:
+                print(f"Request budget of {max_requests} used up")
+                complete = False
+                break
+            print(f"--- Started scraping for {subreddit} ---")
+            print(f"--- Started scraping for {query} ---")
         
-        after = None
-        pages_scraped = 0
+            after = None
+            pages_scraped = 0
+            reached = False
+            # A request budget is shared by the queries still to run, so the first one cannot page it all away
+            query_pages = MAX_PAGES
+            if max_requests is not None:
+                query_pages = min(MAX_PAGES, max(1, (max_requests - requests_made) // (len(queries) - qi)))
         
-        while pages_scraped < MAX_PAGES and len(all_unique_posts) < TARGET_POSTS:
-            params = {
-                "q": query,
-                "restrict_sr": "1",
-                "sort": "new",
-                "limit": "100",
-                "after": after,
-                "include_over_18": "on",
-                "t": "all"
-            }
+            while pages_scraped < query_pages and len(all_unique_posts) < TARGET_POSTS:
+                params = {
+                    "q": query,
+                    "restrict_sr": "1",
+                    "sort": "new",
+                    "limit": "100",
+                    "after": after,
+                    "include_over_18": "on",
+                    "t": "all"
+                }
             
-            try:
-                res = requests.get(url, headers=headers, params=params)
+                try:
+                    if max_requests is not None and requests_made >= max_requests:
+                        break
+                    res = requests.get(url, headers=headers, params=params)
+                    requests_made += 1
+                    metrics.count("http_requests")
                 
-                if res.status_code == 429:
-                    print("Rate limited. Sleep for 5 seconds...")
-                    time.sleep(5)
-                    continue
+                    if res.status_code == 429:
+                        print("Rate limited. Sleep for 5 seconds...")
+                        metrics.count("http_429")
+                        metrics.count("sleep_s", 5)
+                        time.sleep(5)
+                        continue
                 
-                res.raise_for_status()
-                data = res.json()
+                    res.raise_for_status()
+                    data = res.json()
                 
-                children = data.get("data", {}).get("children", [])
-                if not children:
-                    print("No more results found")
-                    break
+                    children = data.get("data", {}).get("children", [])
+                    if not children:
+                        print("No more results found")
+                        reached = True
+                        break
                 
-                new_posts = 0
-                for child in children:
-                    post_id = child['data']['name']
-                    if post_id not in all_unique_posts:
-                        all_unique_posts[post_id] = child['data']
-                        new_posts += 1
+                    new_posts = 0
+                    for child in children:
+                        post_id = child['data']['name']
+                        if post_id not in all_unique_posts:
+                            all_unique_posts[post_id] = child['data']
+                            new_posts += 1
+                    metrics.count("posts_new", new_posts)
                 
-                after = data.get("data", {}).get("after")
-                pages_scraped += 1
+                    after = data.get("data", {}).get("after")
+                    pages_scraped += 1
                 
-                print(f"Page {pages_scraped}: Found {len(children)} posts ({new_posts} new). Total Unique: {len(all_unique_posts)}")
+                    print(f"Page {pages_scraped}: Found {len(children)} posts ({new_posts} new). Total Unique: {len(all_unique_posts)}")
                 
-                if not after:
-                    print("Reached the end of the stream.")
-                    break
+                    if not after:
+                        print("Reached the end of the stream.")
+                        reached = True
+                        break
+
+                    # sort=new: once a whole page is older than what we already have, deeper pages are too
+                    if stop_before_utc is not None and all(c['data'].get('created_utc', 0) <= stop_before_utc for c in children):
+                        print("Caught up with previously scraped posts.")
+                        reached = True
+                        break
                 
-                time.sleep(SLEEP_SEC)
+                    metrics.count("sleep_s", SLEEP_SEC)
+                    time.sleep(SLEEP_SEC)
                 
-            except Exception as e:
-                print(f"Error on page {pages_scraped}: {e}")
-                break
+                except Exception as e:
+                    print(f"Error on page {pages_scraped}: {e}")
+                    break
+
+            complete = complete and reached
     
+    # All queries at once: each query pages newest-first, so per query the detector would see them out of order
+    detector.observe_many(symbol, [p.get('created_utc') for p in all_unique_posts.values()], feed=subreddit)
+    detector.save()
     print(f"\n--- Finished. Collected {len(all_unique_posts)} UNIQUE posts. ---")
+    if stats is not None:
+        created = [p.get('created_utc') or 0 for p in all_unique_posts.values()]
+        stats.update(requests=requests_made, created=created, oldest=min(filter(None, created), default=None),
+                     complete=complete)
     
     # Prepare data for CSV
     posts_data = []
@@ -172,7 +233,7 @@ def script_scrape_reddit():
             'timestamp_raw': str(created_utc) if created_utc else '',
             'timestamp_iso': timestamp_iso,
             'post_id': post.get('name', ''),
-            'subreddit': SUBREDDIT
+            'subreddit': subreddit
         })
     
     # Path: data/raw/reddit/{SYMBOL}/{YEAR}/{MONTH}/{DAY}/
@@ -183,15 +244,15 @@ def script_scrape_reddit():
     
     filename = os.path.join(out_dir, f"reddit_posts_{symbol}_{today:%Y%m%d}.csv")
     
-    # 1. Convert new data to DataFrame
-    new_df = pd.DataFrame(posts_data)
+    # 1. Convert new data to DataFrame (typed: categorical symbol/subreddit, 'ts' from created_utc)
+    new_df = compact_messages(pd.DataFrame(posts_data))
     
     # 2. Load existing data if file exists
     if os.path.exists(filename):
         try:
-            existing_df = pd.read_csv(filename)
+            existing_df = read_messages(filename)
             # Combine old and new
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
+            combined_df = compact_messages(pd.concat([existing_df, new_df], ignore_index=True))
         except pd.errors.EmptyDataError:
             combined_df = new_df
     else:
@@ -202,20 +263,26 @@ def script_scrape_reddit():
         # Deduplicate, but updating UPVOTES/DOWNVOTES per post
         combined_df = combined_df.drop_duplicates(subset=['post_id'], keep='last')
     
-        # Force 'timestamp_raw' to numeric so sorting works
-        combined_df['timestamp_raw'] = pd.to_numeric(combined_df['timestamp_raw'], errors='coerce')
-        combined_df = combined_df.dropna(subset=['timestamp_raw'])
+        # 'ts' is the parsed created_utc; posts without one are dropped
+        combined_df = combined_df.dropna(subset=['ts'])
     
-        # SORT: Now this will work because everything is a number
-        combined_df = combined_df.sort_values(by='timestamp_raw', ascending=False)
+        # SORT: newest first, on the int64-backed timestamp
+        combined_df = combined_df.sort_values(by='ts', ascending=False)
         
-        combined_df.to_csv(filename, index=False)
+        with metrics.span("write", symbol=symbol):
+            metrics.count("rows_out", len(combined_df))
+            csv_df = to_csv_frame(combined_df)
+            csv_df.to_csv(filename, index=False)
+            safe_write_frame(csv_df, "raw", "reddit")
+            safe_register(filename, "raw", "reddit", symbol, csv_df)
         
         print(f"\nSaved {len(combined_df)} sorted posts to {filename}")
     else:
         print("\nNo data to save.")
+        filename = None
 
     print("Script Finished")
+    return filename
 
 if __name__ == "__main__":
     script_scrape_reddit()
\ No newline at end of file
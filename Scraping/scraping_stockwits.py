@@ -3,8 +3,22 @@ from bs4 import BeautifulSoup
 from datetime import datetime, timedelta, timezone
 import re
 import os
+import sys
 import time
 import csv
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Automation import metrics
+from Volume.stream_detector import BurstDetector
+from Storage.lake import safe_write_frame
+from Storage.catalog import safe_register
+
+SYMBOL = "DGXX"  # default for running this file directly; the pipeline passes its own
 
 def normalize_time(raw, now = None):
     now = now or datetime.now(timezone.utc)
@@ -24,15 +38,17 @@ def normalize_time(raw, now = None):
         return (now - d).isoformat()
     return raw
 
-def script_scrape_stockwits():
+def script_scrape_stockwits(symbol: str = SYMBOL) -> str:
+    """Scrape the Stocktwits stream of one symbol into a new timestamped CSV. Returns its path."""
     print("Script Start")
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
         page = browser.new_page()
-        symbol = "DGXX"
         url = f"https://stocktwits.com/symbol/{symbol}"
         print ("Navigating to Symbol Stock Page...")
         page.goto(url)
+        metrics.count("http_requests")
+        metrics.count("sleep_s", 10)
         time.sleep(10)
         cookies_button = page.get_by_role("button", name = "I Accept")
         match_count = cookies_button.count()
@@ -47,12 +63,14 @@ def script_scrape_stockwits():
                     
             # Wait to see the result and check if we get blocked
             print("Waiting 10 seconds to observe the page behavior...")
+            metrics.count("sleep_s", 5)
             time.sleep(5)
 
         # Scroll down multiple times to load more messages
         print("\nScrolling to load more messages...")
         for i in range(8):  # adjust 4–12 depending on how much you want
             page.mouse.wheel(0, 3000)  # scroll down
+            metrics.count("sleep_s", 2)
             time.sleep(2)  # let new messages load
             print("Done scrolling.\n")  
         
@@ -103,6 +121,11 @@ def script_scrape_stockwits():
             })
             print(f"Message {i}:\n    {message_text}")
 
+
+        # Live burst detection on the freshly scraped messages
+        detector = BurstDetector()
+        detector.observe_many(symbol, [m['timestamp_iso'] for m in messages], feed="stocktwits")
+        detector.save()
         
         # Save to data/raw/stocktwits/TICKER/YYYY/MM/DD/
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -111,14 +134,19 @@ def script_scrape_stockwits():
         os.makedirs(out_dir, exist_ok=True)
         filename = os.path.join(out_dir, f"stocktwits_messages_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
         
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['index', 'symbol', 'message', 'timestamp_raw', 'timestamp_iso'])
-            writer.writeheader()
-            writer.writerows(messages)
-        print(f"\nSaved {len(messages)} messages to {filename}")
+        with metrics.span("write", symbol=symbol):
+            metrics.count("rows_out", len(messages))
+            with open(filename, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=['index', 'symbol', 'message', 'timestamp_raw', 'timestamp_iso'])
+                writer.writeheader()
+                writer.writerows(messages)
+            print(f"\nSaved {len(messages)} messages to {filename}")
+            safe_write_frame(pd.DataFrame(messages), "raw", "stocktwits", fallback_date=today)
+            safe_register(filename, "raw", "stocktwits", symbol, pd.DataFrame(messages))
 
         browser.close()
         print("Script Finished")
+        return filename
 
 if __name__ == "__main__":
     script_scrape_stockwits()
\ No newline at end of file
@@ -0,0 +1,218 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage import catalog
+from Storage.schema import read_messages, dedupe_keys
+
+# Daily sentiment materialization: one small CSV per (source, symbol) with a row per day,
+#   data/aggregates/daily_sentiment/{source}/{SYMBOL}.csv
+# so the dashboard never has to read per-message files.
+#
+# Rows hold sufficient statistics (counts and sums), which add up across sources, weeks or partial
+# recomputes; the readable columns (mean, weighted, std, shares) are derived from them by finalize().
+# Messages are deduplicated across runs (post_id, else message + timestamp; newest run wins) before
+# counting. refresh() recomputes only the days touched by a new enriched file; callers that refresh several
+# materializations pass the messages they loaded once (msgs=) instead of each re-reading the enriched files.
+
+AGG_DIR = PROJECT_ROOT / "data" / "aggregates" / "daily_sentiment"
+PROCESSED_ROOT = PROJECT_ROOT / "data" / "processed" / "finbert"
+
+KEYS = ["source", "symbol", "date"]
+STAT_COLUMNS = [
+    "n", "sum_signed", "sumsq_signed", "sum_weight", "sum_weighted_signed",
+    "n_positive", "n_negative", "n_neutral",
+    "sum_confidence", "sum_prob_positive", "sum_prob_negative", "sum_prob_neutral",
+]
+READ_COLUMNS = {
+    "symbol", "post_id", "message", "timestamp_raw", "timestamp_iso", "score", "pred_label", "confidence",
+    "prob_positive", "prob_negative", "prob_neutral", "sentiment_signed", "sentiment_score",
+}
+
+
+def message_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-message STAT_COLUMNS plus symbol and ts (rows without a timestamp or score are dropped)."""
+    signed_col = "sentiment_signed" if "sentiment_signed" in df.columns else "sentiment_score"
+    df = df.dropna(subset=["ts", signed_col])
+    signed = df[signed_col].astype(np.float64)
+    # Same crowd weight as the Reddit summary (upvotes, at least 1); Stocktwits has none -> 1
+    weight = df["score"].astype(np.float64).clip(lower=1).fillna(1) if "score" in df.columns else pd.Series(1.0, index=df.index)
+    label = df["pred_label"].astype(str) if "pred_label" in df.columns else pd.Series("", index=df.index)
+
+    def col(name):
+        return df[name].astype(np.float64) if name in df.columns else pd.Series(np.nan, index=df.index)
+
+    return pd.DataFrame({
+        "symbol": df["symbol"].astype(str).str.strip().str.upper(),
+        "ts": df["ts"],
+        "n": 1,
+        "sum_signed": signed,
+        "sumsq_signed": signed * signed,
+        "sum_weight": weight,
+        "sum_weighted_signed": signed * weight,
+        "n_positive": (label == "positive").astype(int),
+        "n_negative": (label == "negative").astype(int),
+        "n_neutral": (label == "neutral").astype(int),
+        "sum_confidence": col("confidence"),
+        "sum_prob_positive": col("prob_positive"),
+        "sum_prob_negative": col("prob_negative"),
+        "sum_prob_neutral": col("prob_neutral"),
+    })
+
+
+def message_stats(df: pd.DataFrame, source: str) -> pd.DataFrame:
+    """Per (symbol, date) sufficient statistics of a deduplicated message frame with a 'ts' column."""
+    parts = message_columns(df)
+    parts = parts.assign(date=parts.pop("ts").dt.strftime("%Y-%m-%d"))
+    out = parts.groupby(["symbol", "date"], sort=True).sum(min_count=1).reset_index()
+    out.insert(0, "source", source)
+    return out
+
+
+def merge(frames, keys=KEYS) -> pd.DataFrame:
+    """Add up statistics rows sharing `keys` (e.g. keys=['symbol', 'date'] to combine sources)."""
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=keys + STAT_COLUMNS)
+    stats = pd.concat(frames, ignore_index=True)
+    return stats.groupby(keys, sort=True)[STAT_COLUMNS].sum(min_count=1).reset_index()
+
+
+def finalize(stats: pd.DataFrame) -> pd.DataFrame:
+    """Readable daily columns from the sums: mean, weighted mean, std, label shares, mean probabilities."""
+    out = stats.copy()
+    n = out["n"].where(out["n"] > 0)
+    out["mean"] = out["sum_signed"] / n
+    out["weighted"] = out["sum_weighted_signed"] / out["sum_weight"].where(out["sum_weight"] > 0)
+    out["std"] = np.sqrt((out["sumsq_signed"] / n - out["mean"] ** 2).clip(lower=0))
+    for label in ("positive", "negative", "neutral"):
+        out[f"{label[:3]}_share"] = out[f"n_{label}"] / n
+        out[f"prob_{label[:3]}_mean"] = out[f"sum_prob_{label}"] / n
+    out["confidence_mean"] = out["sum_confidence"] / n
+    return out
+
+
+def aggregate_path(source: str, symbol: str) -> Path:
+    return AGG_DIR / source / f"{symbol.upper()}.csv"
+
+
+def processed_files(source: str, symbol: str, start=None, end=None) -> list:
+    """Enriched files for a symbol, oldest run first (catalog when populated, else the folder tree)."""
+    if catalog.is_populated():
+        return [p for p in catalog.find("processed", source, symbol, start=start, end=end) if p.exists()]
+    root = PROCESSED_ROOT / source / symbol.upper()
+    return sorted(root.rglob("*_with_finbert.csv"), key=lambda p: (p.stat().st_mtime, p.name)) if root.exists() else []
+
+
+def touched_dates(enriched: pd.DataFrame) -> list:
+    """Sorted YYYY-MM-DD days with messages in a per-message frame with 'ts'."""
+    return sorted(enriched["ts"].dropna().dt.strftime("%Y-%m-%d").unique())
+
+
+def on_dates(msgs: pd.DataFrame, dates=None) -> pd.DataFrame:
+    """Messages whose 'ts' falls on one of `dates` (all of them without dates)."""
+    if not dates or msgs.empty:
+        return msgs
+    return msgs[msgs["ts"].dt.strftime("%Y-%m-%d").isin(set(dates))]
+
+
+def load_messages(source: str, symbol: str, dates=None) -> pd.DataFrame:
+    """Deduplicated enriched messages of a symbol, restricted to `dates` (YYYY-MM-DD strings) if given."""
+    start, end = (min(dates), max(dates)) if dates else (None, None)
+    frames = []
+    for path in processed_files(source, symbol, start, end):
+        try:
+            frames.append(read_messages(path, usecols=lambda c: c in READ_COLUMNS))
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, ValueError) as e:
+            print(f"⚠ Skipping {path}: {e}")
+    if not frames:
+        return pd.DataFrame()
+    msgs = pd.concat(frames, ignore_index=True)
+    if "symbol" in msgs.columns:
+        msgs = msgs[msgs["symbol"].astype(str).str.strip().str.upper() == symbol.upper()]
+    keys = dedupe_keys(msgs)
+    if keys:
+        msgs = msgs.drop_duplicates(subset=keys, keep="last")  # files are oldest run first: newest run wins
+    return on_dates(msgs, dates)
+
+
+def compute(source: str, symbol: str, dates=None, msgs: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Statistics for a symbol from its enriched files (or the already loaded `msgs`), restricted to `dates`
+    (YYYY-MM-DD strings) if given.
+    """
+    msgs = load_messages(source, symbol, dates) if msgs is None else on_dates(msgs, dates)
+    if msgs.empty:
+        return pd.DataFrame(columns=KEYS + STAT_COLUMNS)
+    return message_stats(msgs, source)
+
+
+def _write(stats: pd.DataFrame, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    finalize(stats).round(6).to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def refresh(source: str, symbol: str, enriched: pd.DataFrame | None = None, msgs: pd.DataFrame | None = None) -> Path:
+    """
+    Recompute the days covered by `enriched` (a freshly written per-message frame with 'ts') and splice
+    them into the symbol's aggregate file. Without a frame, the whole file is rebuilt.
+    msgs: the symbol's deduplicated messages if the caller already loaded them (at least those days).
+    """
+    symbol = symbol.upper()
+    path = aggregate_path(source, symbol)
+    dates = None
+    if enriched is not None and path.exists():
+        dates = touched_dates(enriched)
+    fresh = compute(source, symbol, dates, msgs)
+    if dates:
+        old = pd.read_csv(path, usecols=KEYS + STAT_COLUMNS, dtype={"date": str})
+        fresh = pd.concat([old[~old["date"].isin(dates)], fresh], ignore_index=True).sort_values("date")
+    _write(fresh, path)
+    return path
+
+
+def safe_refresh(source: str, symbol: str, enriched: pd.DataFrame | None = None, msgs: pd.DataFrame | None = None):
+    """refresh() for pipeline stages: a failed materialization must not fail the analyzer run."""
+    try:
+        path = refresh(source, symbol, enriched, msgs)
+        print(f"Updated daily sentiment: {path}")
+    except Exception as e:
+        print(f"⚠ Daily sentiment update failed for {source}/{symbol}: {e}")
+
+
+def rebuild(sources=("reddit", "stocktwits")) -> list:
+    """Rebuild every aggregate file from the enriched files on disk."""
+    written = []
+    for source in sources:
+        root = PROCESSED_ROOT / source
+        symbols = sorted(p.name for p in root.iterdir() if p.is_dir() and p.name != "_tokens") if root.exists() else []
+        for sym in symbols:
+            written.append(refresh(source, sym))
+            print(f"✓ {source}/{sym}")
+    return written
+
+
+def load_daily(symbol: str, source: str) -> pd.DataFrame:
+    """The materialized daily rows for one symbol (empty frame if none)."""
+    path = aggregate_path(source, symbol)
+    if not path.exists():
+        return pd.DataFrame()
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize daily sentiment aggregates from the enriched files")
+    parser.add_argument("--source", choices=["reddit", "stocktwits"], action="append", help="default: both")
+    args = parser.parse_args()
+    print(f"{len(rebuild(tuple(args.source or ('reddit', 'stocktwits'))))} aggregate file(s) written")
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Startup-optimized FinBERT loader shared by both analyzers.
+#
+# torch / transformers are only imported inside load_finbert(), so anything that just
+# imports this module stays cheap. Once a snapshot has been materialized under
+# models/finbert/{commit}/ (safetensors weights, pinned commit), the model is loaded
+# from disk with local_files_only: no network round trips, no cache lookups.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Automation import metrics
+
+MODEL_ID = "ProsusAI/finbert"
+MODEL_REVISION = os.getenv("FINBERT_REVISION", "main")  # branch, tag or commit to pin when materializing
+SNAPSHOT_ROOT = PROJECT_ROOT / "models" / "finbert"
+PINNED_FILE = SNAPSHOT_ROOT / "PINNED"  # holds the commit sha of the snapshot in use
+
+SNAPSHOT_FILES = ["config.json", "vocab.txt", "tokenizer_config.json", "special_tokens_map.json", "tokenizer.json", "*.safetensors"]
+
+_T0 = time.perf_counter()
+TIMINGS = {}  # label -> seconds, in the order they happened
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+@contextmanager
+def timed(label: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS[label] = time.perf_counter() - start
+
+
+def local_snapshot() -> Path | None:
+    """Path of the pinned local snapshot, or None if none has been materialized."""
+    if not PINNED_FILE.exists():
+        return None
+    snap = SNAPSHOT_ROOT / PINNED_FILE.read_text(encoding="utf-8").strip()
+    if (snap / "config.json").exists() and any(snap.glob("*.safetensors")):
+        return snap
+    return None
+
+
+def model_tag() -> str:
+    """Identity of the weights load_finbert() will use (pinned snapshot commit, else hub id@revision)."""
+    snap = local_snapshot()
+    return f"{MODEL_ID}@{snap.name}" if snap is not None else f"{MODEL_ID}@{MODEL_REVISION}"
+
+
+def materialize_snapshot(model_id: str = MODEL_ID, revision: str = MODEL_REVISION) -> Path:
+    """
+    Download the model once into models/finbert/{commit}/ as safetensors and pin it.
+    Repos that only ship pytorch_model.bin are converted locally.
+    """
+    from huggingface_hub import HfApi, snapshot_download
+
+    sha = HfApi().model_info(model_id, revision=revision).sha
+    target = SNAPSHOT_ROOT / sha
+    target.mkdir(parents=True, exist_ok=True)
+    snapshot_download(model_id, revision=sha, local_dir=target, allow_patterns=SNAPSHOT_FILES)
+
+    if not any(target.glob("*.safetensors")):
+        print("No safetensors weights in the repo, converting pytorch_model.bin ...")
+        from transformers import AutoModelForSequenceClassification
+        clf = AutoModelForSequenceClassification.from_pretrained(model_id, revision=sha)
+        clf.save_pretrained(target, safe_serialization=True)
+
+    meta = {
+        "model_id": model_id,
+        "revision": revision,
+        "commit": sha,
+        "materialized_utc": datetime.now(timezone.utc).isoformat(),
+    }
+    (target / "snapshot.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    PINNED_FILE.write_text(sha, encoding="utf-8")
+    print(f"✓ Snapshot pinned at {target}")
+    return target
+
+
+def load_finbert(device: int | None = None):
+    """
+    Load tokenizer, model and text-classification pipeline.
+    Returns (tok, clf, pipe, device). Uses the local snapshot (never the network) when one exists.
+    """
+    snap = local_snapshot()
+    if snap is not None:
+        # local_files_only per call: the HF_HUB_OFFLINE variable is only read when huggingface_hub is imported
+        source, tok_kwargs = str(snap), {"local_files_only": True}
+        kwargs = {**tok_kwargs, "use_safetensors": True}
+    else:
+        print(f"⚠ No local FinBERT snapshot, resolving {MODEL_ID}@{MODEL_REVISION} via the hub. "
+              f"Run `python Sentiment_Analysis/finbert_model.py materialize` for fast starts.")
+        source, kwargs = MODEL_ID, {"revision": MODEL_REVISION}
+        tok_kwargs = kwargs
+
+    with timed("import torch"):
+        import torch
+    with timed("import transformers"):
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+
+    if device is None:
+        device = 0 if torch.cuda.is_available() else -1
+
+    with timed("load tokenizer"):
+        tok = AutoTokenizer.from_pretrained(source, **tok_kwargs)
+    with timed("load model"):
+        clf = AutoModelForSequenceClassification.from_pretrained(source, **kwargs)
+    with timed("build pipeline"):
+        pipe = pipeline("text-classification", model = clf, tokenizer = tok, top_k = None, truncation = True, device = device)
+    TIMINGS["ready (since import)"] = time.perf_counter() - _T0
+    return tok, clf, pipe, device
+
+
+def shared_finbert(device: int | None = None):
+    """load_finbert() once per process: in-process pipeline runs reuse one model for every symbol."""
+    with _SHARED_LOCK:
+        if device not in _SHARED:
+            with metrics.span("model_load"):
+                _SHARED[device] = load_finbert(device)
+        return _SHARED[device]
+
+
+def mark_first_batch():
+    """Call once the first batch has been scored."""
+    if "first batch (since import)" not in TIMINGS:
+        TIMINGS["first batch (since import)"] = time.perf_counter() - _T0
+
+
+def startup_report() -> str:
+    lines = ["Startup latency:"]
+    for label, sec in TIMINGS.items():
+        lines.append(f"  {label:<28}{sec:8.2f}s")
+    snap = local_snapshot()
+    lines.append(f"  model source: {snap if snap is not None else MODEL_ID + '@' + MODEL_REVISION}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FinBERT snapshot management and startup report")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("materialize", help="download and pin a local safetensors snapshot")
+    m.add_argument("--revision", default=MODEL_REVISION)
+    r = sub.add_parser("report", help="load the model, score one batch and print the latency report")
+    r.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.cmd == "materialize":
+        materialize_snapshot(revision=args.revision)
+        sys.exit(0)
+
+    tok, clf, pipe, device = load_finbert()
+    with timed("first batch"):
+        pipe(["$NVDA earnings beat, guidance raised"] * args.batch_size)
+    mark_first_batch()
+    print(startup_report())
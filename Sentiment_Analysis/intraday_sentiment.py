@@ -0,0 +1,180 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Sentiment_Analysis import daily_aggregates
+from Sentiment_Analysis.daily_aggregates import (
+    STAT_COLUMNS, PROCESSED_ROOT, message_columns, load_messages, touched_dates, on_dates, finalize,
+)
+
+# Intraday sentiment: the daily_aggregates sufficient statistics per fixed UTC bucket, so a move within a
+# few hours is not washed out by the daily mean.
+#
+# Storage: data/aggregates/intraday_sentiment/{source}/{SYMBOL}.npz
+#   dates   datetime64[D], one entry per stored day (sorted)
+#   stats   float32 [days, 1440 // STORE_MINUTES, len(STAT_COLUMNS)]
+# Only the finest bucket is stored: the statistics are sums, so any coarser bucket in BUCKET_MINUTES is a
+# reshape + sum on read, and the readable columns (mean, weighted, std, shares, ...) come from finalize()
+# like the daily rows. refresh() recomputes only the days a new enriched file touches (messages
+# deduplicated across runs, as for the daily aggregates) and replaces those day rows. The analyzers call
+# safe_refresh_all(), which reads the enriched files once for both the daily and the intraday refresh.
+
+INTRADAY_DIR = PROJECT_ROOT / "data" / "aggregates" / "intraday_sentiment"
+STORE_MINUTES = 15
+BUCKET_MINUTES = (15, 30, 60, 120, 240)
+DEFAULT_BUCKET_MINUTES = 60
+
+
+def buckets_per_day(bucket_minutes: int = STORE_MINUTES) -> int:
+    if 1440 % bucket_minutes or bucket_minutes % STORE_MINUTES:
+        raise ValueError(f"bucket_minutes must be a multiple of {STORE_MINUTES} dividing a day, got {bucket_minutes}")
+    return 1440 // bucket_minutes
+
+
+def intraday_path(source: str, symbol: str) -> Path:
+    return INTRADAY_DIR / source / f"{symbol.upper()}.npz"
+
+
+def bucket_stats(msgs: pd.DataFrame):
+    """(dates datetime64[D], stats [days, buckets, stats]) of one symbol's deduplicated messages."""
+    parts = message_columns(msgs)
+    nb = buckets_per_day()
+    if parts.empty:
+        return np.array([], dtype="datetime64[D]"), np.zeros((0, nb, len(STAT_COLUMNS)), dtype=np.float32)
+    ts = parts["ts"].dt.tz_localize(None) if parts["ts"].dt.tz is not None else parts["ts"]
+    day = ts.dt.floor("D")
+    bucket = ((ts - day).dt.total_seconds().to_numpy() // (STORE_MINUTES * 60)).astype(np.int64)
+    dates, day_idx = np.unique(day.to_numpy().astype("datetime64[D]"), return_inverse=True)
+
+    stats = np.zeros((len(dates) * nb, len(STAT_COLUMNS)))
+    np.add.at(stats, day_idx * nb + bucket, np.nan_to_num(parts[STAT_COLUMNS].to_numpy(np.float64)))
+    return dates, stats.reshape(len(dates), nb, len(STAT_COLUMNS)).astype(np.float32)
+
+
+def load_stats(source: str, symbol: str):
+    """(dates, stats) as stored, or empty arrays."""
+    path = intraday_path(source, symbol)
+    if not path.exists():
+        return np.array([], dtype="datetime64[D]"), np.zeros((0, buckets_per_day(), len(STAT_COLUMNS)), dtype=np.float32)
+    with np.load(path) as z:
+        return z["dates"], z["stats"]
+
+
+def save_stats(source: str, symbol: str, dates: np.ndarray, stats: np.ndarray, replace_dates=None) -> Path:
+    """Merge day rows into the stored arrays; days in `replace_dates` (default: `dates`) are replaced."""
+    old_dates, old_stats = load_stats(source, symbol)
+    keep = ~np.isin(old_dates, dates if replace_dates is None else replace_dates)
+    all_dates = np.concatenate([old_dates[keep], dates])
+    all_stats = np.concatenate([old_stats[keep], stats])
+    order = np.argsort(all_dates)
+
+    path = intraday_path(source, symbol)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + f".{os.getpid()}.tmp.npz")
+    np.savez_compressed(tmp, dates=all_dates[order], stats=all_stats[order])
+    os.replace(tmp, path)
+    return path
+
+
+def refresh(source: str, symbol: str, enriched: pd.DataFrame | None = None, msgs: pd.DataFrame | None = None) -> Path:
+    """
+    Recompute the days covered by `enriched` (a freshly written per-message frame with 'ts') and replace
+    them in the symbol's file. Without a frame, the whole file is rebuilt.
+    msgs: the symbol's deduplicated messages if the caller already loaded them (at least those days).
+    """
+    symbol = symbol.upper()
+    dates = None
+    if enriched is not None and intraday_path(source, symbol).exists():
+        dates = touched_dates(enriched)
+    msgs = load_messages(source, symbol, dates) if msgs is None else on_dates(msgs, dates)
+    new_dates, stats = bucket_stats(msgs)
+    # Replace every recomputed day, including touched days that no longer have any messages
+    replace = load_stats(source, symbol)[0] if dates is None else np.array(dates, dtype="datetime64[D]")
+    return save_stats(source, symbol, new_dates, stats, replace_dates=replace)
+
+
+def safe_refresh(source: str, symbol: str, enriched: pd.DataFrame | None = None, msgs: pd.DataFrame | None = None):
+    """refresh() for pipeline stages: a failed materialization must not fail the analyzer run."""
+    try:
+        path = refresh(source, symbol, enriched, msgs)
+        print(f"Updated intraday sentiment: {path}")
+    except Exception as e:
+        print(f"⚠ Intraday sentiment update failed for {source}/{symbol}: {e}")
+
+
+def safe_refresh_all(source: str, symbol: str, enriched: pd.DataFrame):
+    """
+    Daily and intraday refresh after an analyzer run from one read of the enriched files: the days the new
+    file touches (files picked by their catalog date range), or every day while either output is missing.
+    """
+    symbol = symbol.upper()
+    full = not (daily_aggregates.aggregate_path(source, symbol).exists() and intraday_path(source, symbol).exists())
+    try:
+        msgs = load_messages(source, symbol, None if full else touched_dates(enriched))
+    except Exception as e:
+        print(f"⚠ Loading messages for the sentiment aggregates failed for {source}/{symbol}: {e}")
+        return
+    daily_aggregates.safe_refresh(source, symbol, enriched, msgs)
+    safe_refresh(source, symbol, enriched, msgs)
+
+
+def rebuild(sources=("reddit", "stocktwits")) -> list:
+    """Rebuild every intraday file from the enriched files on disk."""
+    written = []
+    for source in sources:
+        root = PROCESSED_ROOT / source
+        symbols = sorted(p.name for p in root.iterdir() if p.is_dir() and p.name != "_tokens") if root.exists() else []
+        for sym in symbols:
+            written.append(refresh(source, sym))
+            print(f"✓ {source}/{sym}")
+    return written
+
+
+def stored_days(source: str, symbol: str) -> list:
+    """UTC days with intraday sentiment for a symbol."""
+    dates, _ = load_stats(source, symbol)
+    return [pd.Timestamp(d).date() for d in dates]
+
+
+def load_intraday(symbol: str, source: str, bucket_minutes: int = DEFAULT_BUCKET_MINUTES,
+                  first_day=None, last_day=None) -> pd.DataFrame:
+    """
+    One row per bucket (bucket_start_utc, the statistics and the finalize() columns) on a gap-free grid
+    from the first to the last stored day in range; buckets without messages have n = 0 and empty means.
+    """
+    dates, stats = load_stats(source, symbol)
+    if first_day is not None:
+        sel = dates >= np.datetime64(pd.Timestamp(first_day).date(), "D")
+        dates, stats = dates[sel], stats[sel]
+    if last_day is not None:
+        sel = dates <= np.datetime64(pd.Timestamp(last_day).date(), "D")
+        dates, stats = dates[sel], stats[sel]
+    if len(dates) == 0:
+        return pd.DataFrame()
+
+    nb = buckets_per_day(bucket_minutes)
+    all_days = np.arange(dates.min(), dates.max() + 1, dtype="datetime64[D]")
+    grid = np.zeros((len(all_days), buckets_per_day(), len(STAT_COLUMNS)))
+    grid[(dates - all_days[0]).astype(np.int64)] = stats
+    grid = grid.reshape(len(all_days), nb, -1, len(STAT_COLUMNS)).sum(axis=2).reshape(-1, len(STAT_COLUMNS))
+    starts = (all_days.astype("datetime64[m]")[:, None] + np.arange(nb) * bucket_minutes).ravel()
+
+    out = pd.DataFrame(grid, columns=STAT_COLUMNS)
+    out.insert(0, "bucket_start_utc", pd.to_datetime(starts).tz_localize("UTC"))
+    out.insert(0, "symbol", symbol.upper())
+    out.insert(0, "source", source)
+    return finalize(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize intraday sentiment buckets from the enriched files")
+    parser.add_argument("--source", choices=["reddit", "stocktwits"], action="append", help="default: both")
+    args = parser.parse_args()
+    print(f"{len(rebuild(tuple(args.source or ('reddit', 'stocktwits'))))} intraday file(s) written")
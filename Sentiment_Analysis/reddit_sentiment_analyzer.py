@@ -1,47 +1,52 @@
 import os
+import sys
 import math
 import pandas as pd
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Automation import metrics
+from Sentiment_Analysis.token_cache import build_cache, infer_from_tokens, length_stats
+from Sentiment_Analysis.finbert_model import shared_finbert, mark_first_batch, startup_report
+from Storage.lake import safe_write_frame
+from Storage.catalog import safe_register
+from Storage.schema import read_messages, compact_messages, to_csv_frame
+from Sentiment_Analysis.intraday_sentiment import safe_refresh_all
 
 CSV_PATH = r"C:\Users\nmrva\OneDrive\Desktop\Screening and Scraping\data\raw\reddit\META\2025\12\06\reddit_posts_META_20251206.csv"  # change as needed
 
 # For Reddit, we'll combine title + text for better sentiment analysis
 # TEXT_COL will be created from combining 'title' and 'text' columns
+TEXT_COL = "combined_text"
 SYMBOL_COL = "symbol"
+USE_TOKEN_CACHE = False  # True: pre-tokenize once per post and run inference from the cached token ids
 
-df = pd.read_csv(CSV_PATH)
 
-# Combine title and text for better sentiment analysis
-# Reddit posts have both title and text, combining gives more context
-df['title'] = df['title'].fillna('').astype(str)
-df['text'] = df['text'].fillna('').astype(str)
-df['combined_text'] = df['title'] + ' ' + df['text']
-df['combined_text'] = df['combined_text'].astype(str).fillna("")
+def load_posts(csv_path):
+    df = read_messages(csv_path)
 
-# Use combined_text as our TEXT_COL for sentiment analysis
-TEXT_COL = "combined_text"
-
-MODEL_ID = "ProsusAI/finbert"
-DEVICE = 0 if torch.cuda.is_available() else -1
-tok = AutoTokenizer.from_pretrained(MODEL_ID)
-clf = AutoModelForSequenceClassification.from_pretrained(MODEL_ID)
-pipe = pipeline("text-classification", model = clf, tokenizer = tok, top_k = None, truncation = True, device = DEVICE)
+    # Combine title and text for better sentiment analysis
+    # Reddit posts have both title and text, combining gives more context
+    df['title'] = df['title'].fillna('')
+    df['text'] = df['text'].fillna('')
+    df['combined_text'] = df['title'] + ' ' + df['text']
+    return df
 
 
 # Run in batches for stability - same function as stockwits
-def infer_batch(texts, batch_size = 64): #Breaks the list of messages into chunks with batch sizes 64
+def infer_batch(pipe, texts, batch_size = 64): #Breaks the list of messages into chunks with batch sizes 64
     print("Creating Chunks")
     out = [] 
     for i in range(0, len(texts), batch_size): #range(0, N, b)
         out.extend(pipe(texts[i:i+batch_size])) #seq[start:stop]
+        mark_first_batch()
         #[0,b), [b,2b), …, [kb,min((k+1)b,N))
     return out
 
-# Run inference on combined text column
-scores = infer_batch(df[TEXT_COL].tolist())
-
 #We cannot use append here as this would create a nested list 
 
 # Convert scores to numeric columns - same function as stockwits
@@ -62,9 +67,6 @@ def to_row(score_list):
         "sentiment_signed": signed
     })
 
-probs_df = pd.DataFrame([to_row(s) for s in scores])
-res = pd.concat([df.reset_index(drop=True), probs_df], axis=1)
-
 #Each message would produce a list like:
 #[
 #  {"label":"positive","score":p_pos},
@@ -72,7 +74,6 @@ res = pd.concat([df.reset_index(drop=True), probs_df], axis=1)
 #  {"label":"negative","score":p_neg}
 #]
 
-res['date'] = pd.to_datetime(res['timestamp_iso']).dt.date
 # Summarize by symbol - same function as stockwits
 def summarize(group):
     # --- CONFIG ---
@@ -88,7 +89,8 @@ def summarize(group):
     neu_share = (group["pred_label"] == "neutral").mean()
     
     # 2. Weighted Sentiment (Crowd Weight)
-    weights = group["score"].apply(lambda x: max(x, 1)) 
+    # score is a nullable Int32 after compact_messages: vectorized, a missing score weighs 1 (as in daily_aggregates)
+    weights = group["score"].astype("float64").clip(lower=1).fillna(1)
     weighted_sum = (group["sentiment_signed"] * weights).sum()
     total_weight = weights.sum()
     
@@ -120,36 +122,81 @@ def summarize(group):
         "confidence_mean": round(group["confidence"].mean(), 4),
     })
 
-# GROUP BY SYMBOL *AND* DATE
-summary = res.groupby([SYMBOL_COL, 'date'], dropna=False).apply(summarize, include_groups=False).reset_index()
-
-
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-ticker_val = str(df[SYMBOL_COL].iloc[0].strip().upper())
-
-# Write per-message outputs to data/processed/finbert/reddit/{SYMBOL}/{YEAR}/{MONTH}/{DAY}/
-today = datetime.utcnow()
-processed_dir = os.path.join(project_root, 'data', 'processed', 'finbert', 'reddit', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
-os.makedirs(processed_dir, exist_ok=True)
-enriched_out = os.path.join(
-    processed_dir,
-    f"{os.path.splitext(os.path.basename(CSV_PATH))[0]}_with_finbert.csv"
-)
-
-# Write summary to reports/reddit/{SYMBOL}/{YEAR}/{MONTH}/{DAY}/
-reports_dir = os.path.join(project_root, 'reports', 'reddit', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
-os.makedirs(reports_dir, exist_ok=True)
-summary_out = os.path.join(
-    reports_dir,
-    f"summary_reddit_finbert_{ts}.csv"
-)
-
-
-res.to_csv(enriched_out, index=False, encoding="utf-8")
-summary.to_csv(summary_out, index=False, encoding="utf-8")
 
-print(f"Saved per-message results: {enriched_out}")
-print(f"Saved summary: {summary_out}")
-print(summary)
\ No newline at end of file
+def score_posts(df, csv_path, use_token_cache = USE_TOKEN_CACHE):
+    """FinBERT columns for every post of df."""
+    # torch/transformers are imported lazily in here; the model is loaded once per process
+    tok, clf, pipe, device = shared_finbert()
+    if use_token_cache:
+        # Tokenize once per post (cached next to the raw CSV) and stream inference from the token arrays
+        with metrics.span("tokenize"):
+            token_cache = build_cache(csv_path, df, TEXT_COL, tok)
+        print(f"Token lengths: {length_stats(token_cache)}")
+        with metrics.span("inference"):
+            metrics.count("texts", len(df))
+            scores = infer_from_tokens(clf, tok, token_cache, device = device, on_batch = mark_first_batch)
+    else:
+        with metrics.span("inference"):
+            metrics.count("texts", len(df))
+            scores = infer_batch(pipe, df[TEXT_COL].tolist())
+    print(startup_report())
+
+    probs_df = pd.DataFrame([to_row(s) for s in scores])
+    return compact_messages(pd.concat([df.reset_index(drop=True), probs_df], axis=1))
+
+
+def analyze_csv(csv_path = CSV_PATH, use_token_cache = USE_TOKEN_CACHE) -> dict:
+    """Score one raw Reddit CSV and write the enriched file and the per-day summary. Returns the output paths."""
+    with metrics.span("load"):
+        df = load_posts(csv_path)
+        metrics.count("rows_in", len(df))
+    res = score_posts(df, csv_path, use_token_cache)
+    res['date'] = res['ts'].dt.date
+
+    # GROUP BY SYMBOL *AND* DATE
+    with metrics.span("aggregate"):
+        summary = res.groupby([SYMBOL_COL, 'date'], dropna=False, observed=True).apply(summarize, include_groups=False).reset_index()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    ticker_val = str(df[SYMBOL_COL].iloc[0].strip().upper())
+
+    # Write per-message outputs to data/processed/finbert/reddit/{SYMBOL}/{YEAR}/{MONTH}/{DAY}/
+    today = datetime.utcnow()
+    processed_dir = os.path.join(project_root, 'data', 'processed', 'finbert', 'reddit', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
+    os.makedirs(processed_dir, exist_ok=True)
+    enriched_out = os.path.join(
+        processed_dir,
+        f"{os.path.splitext(os.path.basename(csv_path))[0]}_with_finbert.csv"
+    )
+
+    # Write summary to reports/reddit/{SYMBOL}/{YEAR}/{MONTH}/{DAY}/
+    reports_dir = os.path.join(project_root, 'reports', 'reddit', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
+    os.makedirs(reports_dir, exist_ok=True)
+    summary_out = os.path.join(
+        reports_dir,
+        f"summary_reddit_finbert_{ts}.csv"
+    )
+
+    with metrics.span("write"):
+        metrics.count("rows_out", len(res))
+        res_csv = to_csv_frame(res)  # same CSV layout as before (timestamp_raw / timestamp_iso)
+        res_csv.to_csv(enriched_out, index=False, encoding="utf-8")
+        summary.to_csv(summary_out, index=False, encoding="utf-8")
+        # Typed Parquet copies, partitioned by source/symbol, for column-selective readers
+        safe_write_frame(res_csv, "processed", "reddit", fallback_date=today)
+        safe_write_frame(summary, "summary", "reddit", fallback_date=today)
+        safe_register(enriched_out, "processed", "reddit", ticker_val, res_csv)
+        safe_register(summary_out, "summary", "reddit", ticker_val, summary)
+        # Per-day and per-bucket sufficient statistics for the dashboard (only the days this file touches are recomputed)
+        safe_refresh_all("reddit", ticker_val, res)
+
+    print(f"Saved per-message results: {enriched_out}")
+    print(f"Saved summary: {summary_out}")
+    print(summary)
+    return {"symbol": ticker_val, "enriched": enriched_out, "summary": summary_out}
+
+
+if __name__ == "__main__":
+    analyze_csv(CSV_PATH)
@@ -1,26 +1,28 @@
 import os
+import sys
 import math
 import pandas as pd
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 from datetime import datetime
+from pathlib import Path
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-# 1) Input CSV from your scraper
+from Automation import metrics
+from Sentiment_Analysis.token_cache import build_cache, infer_from_tokens, length_stats
+from Sentiment_Analysis.finbert_model import shared_finbert, mark_first_batch, startup_report
+from Storage.lake import safe_write_frame
+from Storage.catalog import safe_register
+from Storage.schema import read_messages, compact_messages, to_csv_frame
+from Sentiment_Analysis.intraday_sentiment import safe_refresh_all
+
+
+# 1) Input CSV from your scraper (default when run directly)
 CSV_PATH = r"C:\Users\nmrva\OneDrive\Desktop\Screening and Scraping\data\raw\stocktwits\2025\11\29\stocktwits_messages_DGXX_20251129_195929.csv"  # change as needed
 TEXT_COL = "message"
 SYMBOL_COL = "symbol"
-
-# 2) Load data
-df = pd.read_csv(CSV_PATH)
-df[TEXT_COL] = df[TEXT_COL].astype(str).fillna("")
-
-# 3) FinBERT pipeline
-MODEL_ID = "ProsusAI/finbert"
-DEVICE = 0 if torch.cuda.is_available() else -1
-tok = AutoTokenizer.from_pretrained(MODEL_ID)
-clf = AutoModelForSequenceClassification.from_pretrained(MODEL_ID)
-pipe = pipeline("text-classification", model = clf, tokenizer = tok, top_k = None, truncation = True, device = DEVICE)
+USE_TOKEN_CACHE = False  # True: pre-tokenize once per message and run inference from the cached token ids
 
 # pk ​= eℓpos ​+ eℓneu ​+ eℓneg​eℓk​​,k ∈ {pos, neu, neg}, softmax function to get probabilities
 
@@ -33,16 +35,15 @@ pipe = pipeline("text-classification", model = clf, tokenizer = tok, top_k = Non
 #]
 
 # 4) Run in batches for stability
-def infer_batch(texts, batch_size = 64): #Breaks the list of messages into chunks with batch sizes 64
+def infer_batch(pipe, texts, batch_size = 64): #Breaks the list of messages into chunks with batch sizes 64
     print("Creating Chunks")
     out = [] 
     for i in range(0, len(texts), batch_size): #range(0, N, b)
         out.extend(pipe(texts[i:i+batch_size])) #seq[start:stop]
+        mark_first_batch()
         #[0,b), [b,2b), …, [kb,min((k+1)b,N))
     return out
 
-scores = infer_batch(df[TEXT_COL].tolist())
-
 #We cannot use append here as this would create a nested list 
 
 # 5) Convert scores to numeric columns
@@ -63,9 +64,6 @@ def to_row(score_list):
         "sentiment_signed": signed
     })
 
-probs_df = pd.DataFrame([to_row(s) for s in scores])
-res = pd.concat([df.reset_index(drop=True), probs_df], axis=1)
-
 #Each message would produce a list like:
 #[
 #  {"label":"positive","score":p_pos},
@@ -101,33 +99,82 @@ def summarize(group):
         "confidence_mean": round(conf_mean, 4),
     })
 
-summary = res.groupby(SYMBOL_COL, dropna=False).apply(summarize, include_groups = False).reset_index()
-
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-ticker_val = str(df[SYMBOL_COL].iloc[0].strip().upper())
-
-# Write per-message outputs to data/processed/finbert/YYYY/MM/DD/
-today = datetime.utcnow()
-processed_dir = os.path.join(project_root, 'data', 'processed', 'finbert', 'stocktwits', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
-os.makedirs(processed_dir, exist_ok=True)
-enriched_out = os.path.join(
-    processed_dir,
-    f"{os.path.splitext(os.path.basename(CSV_PATH))[0]}_with_finbert.csv"
-)
-
-# Write summary to reports/stocktwits/{SYMBOL}/{YEAR}/{MONTH}/{DAY}/
-reports_dir = os.path.join(project_root, 'reports', 'stocktwits', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
-os.makedirs(reports_dir, exist_ok=True)
-summary_out = os.path.join(
-    reports_dir,
-    f"summary_finbert_{ts}.csv"
-)
-
-res.to_csv(enriched_out, index=False, encoding="utf-8")
-summary.to_csv(summary_out, index=False, encoding="utf-8")
 
-print(f"Saved per-message results: {enriched_out}")
-print(f"Saved summary: {summary_out}")
-print(summary)
\ No newline at end of file
+def score_messages(df, csv_path, use_token_cache = USE_TOKEN_CACHE):
+    """FinBERT columns for every message of df."""
+    # 3) FinBERT pipeline
+    # torch/transformers are imported lazily in here; the model is loaded once per process
+    tok, clf, pipe, device = shared_finbert()
+    if use_token_cache:
+        # Tokenize once per post (cached next to the raw CSV) and stream inference from the token arrays
+        with metrics.span("tokenize"):
+            token_cache = build_cache(csv_path, df, TEXT_COL, tok)
+        print(f"Token lengths: {length_stats(token_cache)}")
+        with metrics.span("inference"):
+            metrics.count("texts", len(df))
+            scores = infer_from_tokens(clf, tok, token_cache, device = device, on_batch = mark_first_batch)
+    else:
+        with metrics.span("inference"):
+            metrics.count("texts", len(df))
+            scores = infer_batch(pipe, df[TEXT_COL].tolist())
+    print(startup_report())
+
+    probs_df = pd.DataFrame([to_row(s) for s in scores])
+    return compact_messages(pd.concat([df.reset_index(drop=True), probs_df], axis=1))
+
+
+def analyze_csv(csv_path = CSV_PATH, use_token_cache = USE_TOKEN_CACHE) -> dict:
+    """Score one raw Stocktwits CSV and write the enriched file and the summary. Returns the output paths."""
+    # 2) Load data
+    with metrics.span("load"):
+        df = read_messages(csv_path)
+        df[TEXT_COL] = df[TEXT_COL].fillna("")
+        metrics.count("rows_in", len(df))
+
+    res = score_messages(df, csv_path, use_token_cache)
+    with metrics.span("aggregate"):
+        summary = res.groupby(SYMBOL_COL, dropna=False, observed=True).apply(summarize, include_groups = False).reset_index()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    ticker_val = str(df[SYMBOL_COL].iloc[0].strip().upper())
+
+    # Write per-message outputs to data/processed/finbert/stocktwits/{SYMBOL}/YYYY/MM/DD/
+    today = datetime.utcnow()
+    processed_dir = os.path.join(project_root, 'data', 'processed', 'finbert', 'stocktwits', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
+    os.makedirs(processed_dir, exist_ok=True)
+    enriched_out = os.path.join(
+        processed_dir,
+        f"{os.path.splitext(os.path.basename(csv_path))[0]}_with_finbert.csv"
+    )
+
+    # Write summary to reports/stocktwits/{SYMBOL}/{YEAR}/{MONTH}/{DAY}/
+    reports_dir = os.path.join(project_root, 'reports', 'stocktwits', f"{ticker_val}", f"{today:%Y}", f"{today:%m}", f"{today:%d}")
+    os.makedirs(reports_dir, exist_ok=True)
+    summary_out = os.path.join(
+        reports_dir,
+        f"summary_finbert_{ts}.csv"
+    )
+
+    with metrics.span("write"):
+        metrics.count("rows_out", len(res))
+        res_csv = to_csv_frame(res)  # same CSV layout as before (timestamp_raw / timestamp_iso)
+        res_csv.to_csv(enriched_out, index=False, encoding="utf-8")
+        summary.to_csv(summary_out, index=False, encoding="utf-8")
+        # Typed Parquet copies, partitioned by source/symbol, for column-selective readers
+        safe_write_frame(res_csv, "processed", "stocktwits", fallback_date=today)
+        safe_write_frame(summary, "summary", "stocktwits", fallback_date=today)
+        safe_register(enriched_out, "processed", "stocktwits", ticker_val, res_csv)
+        safe_register(summary_out, "summary", "stocktwits", ticker_val, summary)
+        # Per-day and per-bucket sufficient statistics for the dashboard (only the days this file touches are recomputed)
+        safe_refresh_all("stocktwits", ticker_val, res)
+
+    print(f"Saved per-message results: {enriched_out}")
+    print(f"Saved summary: {summary_out}")
+    print(summary)
+    return {"symbol": ticker_val, "enriched": enriched_out, "summary": summary_out}
+
+
+if __name__ == "__main__":
+    analyze_csv(CSV_PATH)
@@ -0,0 +1,232 @@
+import os
+import hashlib
+import argparse
+import numpy as np
+from pathlib import Path
+
+# Pre-tokenization cache for the FinBERT analyzers.
+#
+# Token ids live next to the raw CSV they were made from:
+#   data/raw/{source}/{SYMBOL}/{Y}/{M}/{D}/_tokens/{csv stem}/{tokenizer version}/
+#       ids.npy      flat token ids (int16 when the vocab fits, else int32), no [CLS]/[SEP], untruncated
+#       offsets.npy  int64, row i is ids[offsets[i]:offsets[i+1]]
+#       keys.npy     post id per row (Stocktwits has no id, so a text hash is used)
+#       hashes.npy   uint64 text hash per row, so edited posts get re-tokenized
+# Everything is plain .npy so it can be opened with mmap_mode="r".
+
+CACHE_DIRNAME = "_tokens"
+MAX_LENGTH = 512  # FinBERT position limit, including [CLS] and [SEP]
+
+
+def tokenizer_version(tok) -> str:
+    """Short id for a tokenizer: model name + hash of its vocab."""
+    name = os.path.basename(str(getattr(tok, "name_or_path", "tokenizer")).rstrip("/\\")) or "tokenizer"
+    vocab = sorted(tok.get_vocab().items())
+    digest = hashlib.sha1(repr(vocab).encode("utf-8")).hexdigest()[:12]
+    return f"{name}-{digest}"
+
+
+def text_hashes(texts) -> np.ndarray:
+    """64-bit blake2b hash per text."""
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(str(t).encode("utf-8"), digest_size=8).digest(), "little") for t in texts],
+        dtype=np.uint64,
+    )
+
+
+def row_keys(df, hashes: np.ndarray) -> np.ndarray:
+    """Post id per row, falling back to the text hash when there is no id."""
+    if "post_id" in df.columns:
+        ids = df["post_id"].fillna("").astype(str).tolist()
+    else:
+        ids = [""] * len(df)
+    keys = [pid if pid else f"h{h:016x}" for pid, h in zip(ids, hashes.tolist())]
+    return np.array(keys, dtype=str)
+
+
+def cache_dir(csv_path, version: str) -> Path:
+    csv_path = Path(csv_path)
+    return csv_path.parent / CACHE_DIRNAME / csv_path.stem / version
+
+
+def id_dtype(vocab_size: int):
+    return np.int16 if vocab_size <= np.iinfo(np.int16).max else np.int32
+
+
+def load_cache(csv_path, version: str, mmap: bool = True) -> dict | None:
+    """Open a cache written by build_cache, or None if it does not exist."""
+    d = cache_dir(csv_path, version)
+    names = ["ids", "offsets", "keys", "hashes"]
+    if not all((d / f"{n}.npy").exists() for n in names):
+        return None
+    mode = "r" if mmap else None
+    cache = {n: np.load(d / f"{n}.npy", mmap_mode=mode) for n in names if n != "keys"}
+    cache["keys"] = np.load(d / "keys.npy")  # unicode arrays are small, load them eagerly
+    cache["version"] = version
+    return cache
+
+
+def _save(d: Path, name: str, arr: np.ndarray):
+    # Write next to the target and swap in, so readers never see a half-written array
+    tmp = d / f"{name}.tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, d / f"{name}.npy")
+
+
+def build_cache(csv_path, df, text_col: str, tok) -> dict:
+    """
+    Tokenize df[text_col] once and store the ids next to csv_path.
+    Rows whose (key, text hash) already exist in a previous cache are reused,
+    so re-running on a file the scraper appended to only tokenizes the new posts.
+    Returned arrays are aligned with the rows of df.
+    """
+    version = tokenizer_version(tok)
+    texts = df[text_col].astype(str).tolist()
+    hashes = text_hashes(texts)
+    keys = row_keys(df, hashes)
+
+    old = load_cache(csv_path, version, mmap=True)
+    old_rows = {}
+    if old is not None:
+        old_rows = {(k, h): i for i, (k, h) in enumerate(zip(old["keys"].tolist(), old["hashes"].tolist()))}
+
+    todo = [i for i, key in enumerate(zip(keys.tolist(), hashes.tolist())) if key not in old_rows]
+    fresh = {}
+    if todo:
+        enc = tok([texts[i] for i in todo], add_special_tokens=False, truncation=False)["input_ids"]
+        fresh = dict(zip(todo, enc))
+
+    dtype = id_dtype(len(tok))
+    pieces = []
+    lengths = np.empty(len(texts), dtype=np.int64)
+    for i, key in enumerate(zip(keys.tolist(), hashes.tolist())):
+        if i in fresh:
+            row = np.asarray(fresh[i], dtype=dtype)
+        else:
+            j = old_rows[key]
+            # np.array copies: a view would keep the old ids file mapped (os.replace fails on Windows)
+            row = np.array(old["ids"][old["offsets"][j]:old["offsets"][j + 1]], dtype=dtype)
+        pieces.append(row)
+        lengths[i] = len(row)
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    ids = np.concatenate(pieces) if pieces else np.empty(0, dtype=dtype)
+    del pieces, old  # drop the memory maps before the files are swapped out
+
+    d = cache_dir(csv_path, version)
+    d.mkdir(parents=True, exist_ok=True)
+    _save(d, "ids", ids)
+    _save(d, "hashes", hashes)
+    _save(d, "keys", keys)
+    _save(d, "offsets", offsets)  # last, it is what makes the other arrays readable
+
+    print(f"Token cache: {len(todo)} tokenized, {len(texts) - len(todo)} reused -> {d}")
+    return {"ids": ids, "offsets": offsets, "keys": keys, "hashes": hashes, "version": version}
+
+
+def token_lengths(cache: dict) -> np.ndarray:
+    return np.diff(np.asarray(cache["offsets"]))
+
+
+def padded_tokens(lengths: np.ndarray, batch_size: int = 64, max_length: int = MAX_LENGTH, sort: bool = True) -> int:
+    """Tokens the model actually processes when every batch is padded to its longest row."""
+    seq = np.minimum(lengths + 2, max_length)
+    if sort:
+        seq = np.sort(seq)
+    total = 0
+    for i in range(0, len(seq), batch_size):
+        chunk = seq[i:i + batch_size]
+        total += int(chunk.max()) * len(chunk)
+    return total
+
+
+def length_stats(cache: dict, batch_size: int = 64, max_length: int = MAX_LENGTH) -> dict:
+    """Exact token-length statistics for batching and capacity planning."""
+    lengths = token_lengths(cache)
+    if len(lengths) == 0:
+        return {"rows": 0}
+    seq = np.minimum(lengths + 2, max_length)
+    return {
+        "rows": int(len(lengths)),
+        "tokens": int(lengths.sum()),
+        "mean": round(float(lengths.mean()), 1),
+        "p50": int(np.percentile(lengths, 50)),
+        "p90": int(np.percentile(lengths, 90)),
+        "p99": int(np.percentile(lengths, 99)),
+        "max": int(lengths.max()),
+        "truncated": int((lengths + 2 > max_length).sum()),
+        "model_tokens": int(seq.sum()),
+        "padded_in_order": padded_tokens(lengths, batch_size, max_length, sort=False),
+        "padded_sorted": padded_tokens(lengths, batch_size, max_length, sort=True),
+    }
+
+
+def infer_from_tokens(model, tok, cache: dict, batch_size: int = 64, max_length: int = MAX_LENGTH, device: int = -1,
+                      on_batch=None):
+    """
+    Run the classifier straight from cached token ids.
+    Rows are batched by length to keep padding low and returned in the original order,
+    in the same [{"label", "score"}, ...] format the text-classification pipeline gives.
+    on_batch() is called after every scored batch (e.g. to time the first one).
+    """
+    import torch
+
+    dev = torch.device(f"cuda:{device}" if device >= 0 else "cpu")
+    model = model.to(dev).eval()
+    id2label = model.config.id2label
+    cls_id, sep_id, pad_id = tok.cls_token_id, tok.sep_token_id, tok.pad_token_id
+
+    ids, offsets = cache["ids"], np.asarray(cache["offsets"])
+    lengths = np.minimum(np.diff(offsets), max_length - 2)
+    order = np.argsort(lengths, kind="stable")
+    out = [None] * len(lengths)
+
+    with torch.inference_mode():
+        for i in range(0, len(order), batch_size):
+            rows = order[i:i + batch_size]
+            width = int(lengths[rows].max()) + 2
+            batch = np.full((len(rows), width), pad_id, dtype=np.int64)
+            mask = np.zeros((len(rows), width), dtype=np.int64)
+            for b, r in enumerate(rows):
+                n = int(lengths[r])
+                batch[b, 0] = cls_id
+                batch[b, 1:n + 1] = ids[offsets[r]:offsets[r] + n]
+                batch[b, n + 1] = sep_id
+                mask[b, :n + 2] = 1
+            logits = model(
+                input_ids=torch.from_numpy(batch).to(dev),
+                attention_mask=torch.from_numpy(mask).to(dev),
+            ).logits
+            probs = torch.softmax(logits.float(), dim=-1).cpu().numpy()
+            for b, r in enumerate(rows):
+                out[r] = [{"label": id2label[j], "score": float(p)} for j, p in enumerate(probs[b])]
+            if on_batch is not None:
+                on_batch()
+    return out
+
+
+if __name__ == "__main__":
+    # Pre-tokenization stage: python Sentiment_Analysis/token_cache.py <raw csv> [<raw csv> ...]
+    import pandas as pd
+    from transformers import AutoTokenizer
+
+    parser = argparse.ArgumentParser(description="Pre-tokenize raw CSVs for FinBERT")
+    parser.add_argument("csv", nargs="+")
+    parser.add_argument("--model", default="ProsusAI/finbert")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    tok = AutoTokenizer.from_pretrained(args.model)
+    for path in args.csv:
+        df = pd.read_csv(path)
+        if "message" in df.columns:
+            text_col = "message"
+            df[text_col] = df[text_col].astype(str).fillna("")
+        else:
+            text_col = "combined_text"
+            df[text_col] = df["title"].fillna("").astype(str) + " " + df["text"].fillna("").astype(str)
+        cache = build_cache(path, df, text_col, tok)
+        print(path)
+        for k, v in length_stats(cache, batch_size=args.batch_size).items():
+            print(f"  {k}: {v}")
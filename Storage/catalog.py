@@ -0,0 +1,346 @@
+import sys
+import sqlite3
+import hashlib
+import argparse
+import pandas as pd
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Embedded catalog of every artifact the pipeline writes (SQLite, data/catalog.sqlite).
+#
+# One row per file: layer, source, symbol, covered date range, run day, row count,
+# schema version (hash of the column list), size and mtime. Loaders ask the catalog
+# "which files hold AAPL/reddit between X and Y" instead of globbing the tree, and
+# `generation` goes up on every change so caches can tell when something was written.
+# Loaders only trust the catalog (is_populated) once a full rescan of the CSV tree has finished;
+# connect() runs that rescan until it has, so files written before the catalog existed are never lost.
+#
+# Files of INDEXED_LAYERS also get one symbol_rows row per run of consecutive rows of a symbol
+# (0-based data row offset + count), so a loader can find every file holding a ticker, even one
+# that is not the file's first symbol, and read just those rows.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CATALOG_PATH = PROJECT_ROOT / "data" / "catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path           TEXT PRIMARY KEY,   -- relative to the project root, forward slashes
+    layer          TEXT NOT NULL,      -- raw | processed | summary | volume
+    source         TEXT NOT NULL,      -- reddit | stocktwits
+    symbol         TEXT,
+    date_min       TEXT,               -- first/last message or summary date in the file (YYYY-MM-DD)
+    date_max       TEXT,
+    run_date       TEXT,               -- day the file was produced (folder date)
+    row_count      INTEGER,
+    schema_version TEXT,
+    columns        TEXT,
+    bytes          INTEGER,
+    mtime          REAL,
+    registered_utc TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_artifacts_lookup ON artifacts (layer, source, symbol, date_max);
+CREATE TABLE IF NOT EXISTS symbol_rows (
+    path           TEXT NOT NULL,      -- artifacts.path
+    symbol         TEXT NOT NULL,
+    row_start      INTEGER NOT NULL,   -- first data row of the run (0 = the line after the header)
+    row_count      INTEGER NOT NULL,
+    PRIMARY KEY (path, symbol, row_start)
+);
+CREATE INDEX IF NOT EXISTS ix_symbol_rows_symbol ON symbol_rows (symbol, path);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0');
+
+CREATE VIEW IF NOT EXISTS v_raw       AS SELECT * FROM artifacts WHERE layer = 'raw';
+CREATE VIEW IF NOT EXISTS v_processed AS SELECT * FROM artifacts WHERE layer = 'processed';
+CREATE VIEW IF NOT EXISTS v_summary   AS SELECT * FROM artifacts WHERE layer = 'summary';
+CREATE VIEW IF NOT EXISTS v_volume    AS SELECT * FROM artifacts WHERE layer = 'volume';
+CREATE VIEW IF NOT EXISTS v_coverage AS
+    SELECT layer, source, symbol,
+           MIN(date_min) AS date_min, MAX(date_max) AS date_max,
+           SUM(row_count) AS rows, COUNT(*) AS files, MAX(run_date) AS last_run
+    FROM artifacts GROUP BY layer, source, symbol;
+CREATE VIEW IF NOT EXISTS v_latest AS
+    SELECT a.* FROM artifacts a
+    WHERE a.mtime = (SELECT MAX(b.mtime) FROM artifacts b
+                     WHERE b.layer = a.layer AND b.source = a.source AND b.symbol IS a.symbol);
+"""
+
+DATE_COLUMNS = ("timestamp_iso", "date", "date_utc")
+INDEXED_LAYERS = ("summary",)
+
+
+def connect(path: Path = CATALOG_PATH) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path, timeout=30)
+    con.row_factory = sqlite3.Row
+    con.executescript(SCHEMA)
+    if path == CATALOG_PATH and not _scanned(con):
+        # Until one full rescan has finished, index what is already on disk, so lookups never see a
+        # catalog holding only the files registered since it was created
+        rescan(con)
+    return con
+
+
+def _scanned(con: sqlite3.Connection) -> bool:
+    return con.execute("SELECT 1 FROM meta WHERE key = 'rescanned_utc'").fetchone() is not None
+
+
+def _rel(path) -> str:
+    p = Path(path).resolve()
+    try:
+        return p.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return p.as_posix()
+
+
+def _abs(rel: str) -> Path:
+    p = Path(rel)
+    return p if p.is_absolute() else PROJECT_ROOT / p
+
+
+def _bump(con: sqlite3.Connection):
+    con.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+
+
+def schema_version(columns) -> str:
+    return hashlib.sha1(",".join(c.lower() for c in columns).encode("utf-8")).hexdigest()[:10]
+
+
+def _date_range(df: pd.DataFrame):
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            d = pd.to_datetime(df[col].replace("", pd.NA), errors="coerce", utc=True, format="mixed").dropna()
+            if not d.empty:
+                return d.min().date().isoformat(), d.max().date().isoformat()
+    return None, None
+
+
+def symbol_runs(df: pd.DataFrame) -> list:
+    """[(symbol, row_start, row_count)] for each run of consecutive rows with the same symbol."""
+    col = next((c for c in df.columns if str(c).lower() == "symbol"), None)
+    if col is None or df.empty:
+        return []
+    sym = df[col].astype(str).str.strip().str.upper().reset_index(drop=True)
+    starts = sym.index[sym.ne(sym.shift())].tolist()
+    ends = starts[1:] + [len(sym)]
+    return [(sym.iloc[a], a, b - a) for a, b in zip(starts, ends)]
+
+
+def folder_date(path) -> str | None:
+    """YYYY-MM-DD from .../{Y}/{M}/{D}/file.csv, if the file sits in a dated folder."""
+    parts = Path(path).parent.parts[-3:]
+    if len(parts) == 3 and all(p.isdigit() for p in parts):
+        return f"{parts[0]}-{parts[1]}-{parts[2]}"
+    return None
+
+
+def register(path, layer: str, source: str, symbol: str | None = None, df: pd.DataFrame | None = None,
+             run_date: str | None = None, con: sqlite3.Connection | None = None):
+    """Add or refresh one artifact. Pass the frame that was just written to avoid re-reading the file."""
+    path = Path(path)
+    if df is None:
+        df = pd.read_csv(path)
+    if symbol is None and "symbol" in df.columns and not df.empty:
+        symbol = str(df["symbol"].iloc[0]).strip().upper()
+    date_min, date_max = _date_range(df)
+    st = path.stat()
+    row = (
+        _rel(path), layer, source, symbol, date_min, date_max,
+        run_date or folder_date(path) or datetime.fromtimestamp(st.st_mtime, tz=timezone.utc).date().isoformat(),
+        int(len(df)), schema_version(df.columns), ",".join(df.columns),
+        int(st.st_size), float(st.st_mtime), datetime.now(timezone.utc).isoformat(),
+    )
+    own = con is None
+    con = con or connect()
+    with con:
+        con.execute("INSERT OR REPLACE INTO artifacts VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", row)
+        con.execute("DELETE FROM symbol_rows WHERE path = ?", (row[0],))
+        if layer in INDEXED_LAYERS:
+            con.executemany("INSERT INTO symbol_rows VALUES (?,?,?,?)", [(row[0], *run) for run in symbol_runs(df)])
+        _bump(con)
+    if own:
+        con.close()
+
+
+def safe_register(path, layer: str, source: str, symbol: str | None = None, df: pd.DataFrame | None = None, run_date=None):
+    """register() for pipeline stages: a catalog problem must not fail the stage that produced the file."""
+    try:
+        register(path, layer, source, symbol, df, run_date)
+    except Exception as e:
+        print(f"⚠ Catalog registration failed for {path}: {e}")
+
+
+def unregister(path, con: sqlite3.Connection | None = None):
+    own = con is None
+    con = con or connect()
+    with con:
+        con.execute("DELETE FROM artifacts WHERE path = ?", (_rel(path),))
+        con.execute("DELETE FROM symbol_rows WHERE path = ?", (_rel(path),))
+        _bump(con)
+    if own:
+        con.close()
+
+
+def generation() -> int:
+    """Monotonic counter bumped on every catalog change (cheap data-version token)."""
+    if not CATALOG_PATH.exists():
+        return 0
+    con = connect()
+    try:
+        return int(con.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+    finally:
+        con.close()
+
+
+def is_populated() -> bool:
+    """True once the catalog covers the whole CSV tree (a full rescan finished), so find() can replace globbing."""
+    if not CATALOG_PATH.exists():
+        return False
+    con = connect()
+    try:
+        return _scanned(con) and con.execute("SELECT 1 FROM artifacts LIMIT 1").fetchone() is not None
+    finally:
+        con.close()
+
+
+def find(layer: str, source: str, symbol: str | None = None, start=None, end=None, run_date: str | None = None) -> list:
+    """Artifact paths for a layer/source (optionally symbol, overlapping [start, end], run day), oldest first."""
+    sql = "SELECT path FROM artifacts WHERE layer = ? AND source = ?"
+    args = [layer, source]
+    if symbol:
+        sql += " AND symbol = ?"
+        args.append(symbol.upper())
+    if start is not None:
+        sql += " AND (date_max IS NULL OR date_max >= ?)"
+        args.append(pd.Timestamp(start).date().isoformat())
+    if end is not None:
+        sql += " AND (date_min IS NULL OR date_min <= ?)"
+        args.append(pd.Timestamp(end).date().isoformat())
+    if run_date:
+        sql += " AND run_date = ?"
+        args.append(run_date)
+    sql += " ORDER BY run_date, mtime"
+    con = connect()
+    try:
+        return [_abs(r["path"]) for r in con.execute(sql, args)]
+    finally:
+        con.close()
+
+
+def find_symbol(layer: str, source: str, symbol: str) -> list:
+    """
+    Files holding rows of `symbol`, oldest first: through symbol_rows for indexed files, by the
+    file's own symbol for files registered before the index existed.
+    """
+    sql = """
+        SELECT a.path FROM artifacts a
+        WHERE a.layer = ? AND a.source = ?
+          AND (EXISTS (SELECT 1 FROM symbol_rows r WHERE r.path = a.path AND r.symbol = ?)
+               OR (a.symbol = ? AND NOT EXISTS (SELECT 1 FROM symbol_rows r WHERE r.path = a.path)))
+        ORDER BY a.run_date, a.mtime
+    """
+    symbol = symbol.upper()
+    con = connect()
+    try:
+        return [_abs(r["path"]) for r in con.execute(sql, (layer, source, symbol, symbol))]
+    finally:
+        con.close()
+
+
+def row_runs(path, symbol: str) -> list | None:
+    """[(row_start, row_count)] of `symbol` in an indexed file; None if the file has no index rows."""
+    con = connect()
+    try:
+        rel = _rel(path)
+        if con.execute("SELECT 1 FROM symbol_rows WHERE path = ? LIMIT 1", (rel,)).fetchone() is None:
+            return None
+        return [(r["row_start"], r["row_count"]) for r in con.execute(
+            "SELECT row_start, row_count FROM symbol_rows WHERE path = ? AND symbol = ? ORDER BY row_start",
+            (rel, symbol.upper()))]
+    finally:
+        con.close()
+
+
+def read_symbol_rows(path, symbol: str, **read_csv_kwargs) -> pd.DataFrame:
+    """The rows of `symbol` from a CSV artifact, reading only its indexed runs when there are any."""
+    runs = row_runs(path, symbol)
+    if runs is None:
+        return pd.read_csv(path, **read_csv_kwargs)
+    parts = [pd.read_csv(path, skiprows=range(1, start + 1), nrows=count, **read_csv_kwargs) for start, count in runs]
+    return pd.concat(parts, ignore_index=True) if parts else pd.read_csv(path, nrows=0, **read_csv_kwargs)
+
+
+def latest(layer: str, source: str, symbol: str, run_date: str | None = None) -> Path | None:
+    """Most recently written artifact for a symbol (optionally restricted to one run day)."""
+    paths = [p for p in find(layer, source, symbol, run_date=run_date) if p.exists()]
+    return paths[-1] if paths else None
+
+
+def query(sql: str, args=()) -> pd.DataFrame:
+    """Run SQL against the catalog (tables: artifacts, meta; views: v_raw, v_processed, v_summary, v_volume, v_coverage, v_latest)."""
+    con = connect()
+    try:
+        return pd.read_sql_query(sql, con, params=args)
+    finally:
+        con.close()
+
+
+def _legacy_files():
+    for source in ("reddit", "stocktwits"):
+        for p in sorted((PROJECT_ROOT / "data" / "raw" / source).rglob("*.csv")):
+            if "_tokens" not in p.parts:
+                yield p, "raw", source
+        for p in sorted((PROJECT_ROOT / "data" / "processed" / "finbert" / source).rglob("*_with_finbert.csv")):
+            yield p, "processed", source
+        for p in sorted((PROJECT_ROOT / "reports" / source).rglob("summary*finbert*.csv")):
+            yield p, "summary", source
+        for p in sorted((PROJECT_ROOT / "data" / "volume_history" / source).glob("*.csv")):
+            yield p, "volume", source
+
+
+def rescan(con: sqlite3.Connection | None = None) -> int:
+    """Register every file of the CSV tree and drop entries whose file is gone. Unchanged files are skipped."""
+    own = con is None
+    con = con or connect()
+    known = {r["path"]: r["mtime"] for r in con.execute("SELECT path, mtime FROM artifacts")}
+    indexed = {r["path"] for r in con.execute("SELECT DISTINCT path FROM symbol_rows")}
+    seen, changed = set(), 0
+    for path, layer, source in _legacy_files():
+        rel = _rel(path)
+        seen.add(rel)
+        # Unchanged files are skipped, unless they predate the symbol_rows index
+        if known.get(rel) == path.stat().st_mtime and (layer not in INDEXED_LAYERS or rel in indexed):
+            continue
+        try:
+            df = pd.read_csv(path)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+            print(f"⚠ Skipping {rel}: {e}")
+            continue
+        symbol = path.stem.upper() if layer == "volume" else None
+        register(path, layer, source, symbol, df, con=con)
+        changed += 1
+    for rel in set(known) - seen:
+        if not _abs(rel).exists():
+            unregister(rel, con=con)
+            changed += 1
+    with con:
+        con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rescanned_utc', ?)",
+                    (datetime.now(timezone.utc).isoformat(),))
+    if own:
+        con.close()
+    return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Artifact catalog")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rescan", help="index the CSV tree")
+    q = sub.add_parser("sql", help="run a query, e.g. \"SELECT * FROM v_coverage\"")
+    q.add_argument("sql")
+    args = parser.parse_args()
+
+    if args.cmd == "rescan":
+        print(f"{rescan()} artifact(s) added/updated/removed, generation {generation()}")
+        sys.exit(0)
+    with pd.option_context("display.max_rows", 200, "display.width", 200):
+        print(query(args.sql))
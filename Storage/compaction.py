@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import argparse
+import pandas as pd
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage import catalog
+from Storage.schema import parse_ts, dedupe_keys
+
+# Compaction: merge the per-run CSVs of one (source, symbol, day) into a single file.
+#
+#   data/raw/{source}/{SYM}/Y/M/D/stocktwits_messages_{SYM}_{HHMMSS runs}.csv  ->  ..._{SYM}_{YYYYMMDD}.csv
+#   data/processed/finbert/{source}/{SYM}/Y/M/D/..._with_finbert.csv           ->  ..._{SYM}_{YYYYMMDD}_with_finbert.csv
+#
+# Rows are deduplicated with the same keys as the lake (post_id, else message + timestamp_raw; the newest run wins),
+# sorted newest first and renumbered. The merged file is written to a temp name and os.replace'd in before any
+# input is removed, so an interrupted run leaves a superset behind and a re-run finishes the job.
+# Every merge is appended to MANIFEST_PATH and the catalog is updated.
+
+MANIFEST_PATH = PROJECT_ROOT / "data" / "_compaction.jsonl"
+
+LAYER_ROOTS = {
+    "raw": PROJECT_ROOT / "data" / "raw",
+    "processed": PROJECT_ROOT / "data" / "processed" / "finbert",
+}
+FILE_PREFIX = {"reddit": "reddit_posts", "stocktwits": "stocktwits_messages"}
+SUFFIX = {"raw": ".csv", "processed": "_with_finbert.csv"}
+
+
+def day_groups(layer: str, source: str) -> dict:
+    """{(symbol, 'YYYY-MM-DD'): [csv paths, oldest run first]} for every day folder with more than one file."""
+    root = LAYER_ROOTS[layer] / source
+    groups = {}
+    if not root.exists():
+        return groups
+    for path in root.rglob(f"*{SUFFIX[layer]}"):
+        if "_tokens" in path.parts or (layer == "raw" and path.name.endswith("_with_finbert.csv")):
+            continue
+        day = catalog.folder_date(path)
+        rel = path.relative_to(root).parts
+        if day is None or len(rel) != 5:  # {SYM}/Y/M/D/file
+            continue
+        groups.setdefault((rel[0].upper(), day), []).append(path)
+    # The scrapers never rewrite old run files (Reddit appends into the dated one), so mtime is the run order
+    return {k: sorted(v, key=lambda p: (p.stat().st_mtime, p.name)) for k, v in groups.items() if len(v) > 1}
+
+
+def target_path(layer: str, source: str, symbol: str, day: str, folder: Path) -> Path:
+    return folder / f"{FILE_PREFIX[source]}_{symbol}_{day.replace('-', '')}{SUFFIX[layer]}"
+
+
+def merge_files(paths: list) -> tuple:
+    """Concatenate oldest -> newest, dedupe (newest wins), sort newest first. Returns (frame, rows per input)."""
+    frames, rows = [], []
+    for p in paths:
+        df = pd.read_csv(p)
+        frames.append(df)
+        rows.append(len(df))
+    merged = pd.concat(frames, ignore_index=True)
+    keys = dedupe_keys(merged)
+    if keys:
+        merged = merged.drop_duplicates(subset=keys, keep="last")
+    ts, _ = parse_ts(merged)
+    merged = merged.assign(_ts=ts).sort_values("_ts", ascending=False, na_position="last", kind="stable").drop(columns="_ts")
+    if "index" in merged.columns:
+        merged["index"] = range(1, len(merged) + 1)
+    return merged.reset_index(drop=True), rows
+
+
+def _write_atomic(df: pd.DataFrame, target: Path):
+    tmp = target.with_name(target.name + ".tmp")
+    df.to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def _log(entry: dict):
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(MANIFEST_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def compact_group(layer: str, source: str, symbol: str, day: str, paths: list, dry_run: bool = False) -> dict:
+    target = target_path(layer, source, symbol, day, paths[0].parent)
+    merged, rows = merge_files(paths)
+    entry = {
+        "compacted_utc": datetime.now(timezone.utc).isoformat(),
+        "layer": layer,
+        "source": source,
+        "symbol": symbol,
+        "day": day,
+        "output": target.relative_to(PROJECT_ROOT).as_posix(),
+        "inputs": [{"path": p.relative_to(PROJECT_ROOT).as_posix(), "rows": n} for p, n in zip(paths, rows)],
+        "rows_in": int(sum(rows)),
+        "rows_out": int(len(merged)),
+    }
+    if dry_run:
+        return entry
+
+    _write_atomic(merged, target)
+    for p in paths:
+        if p != target:
+            p.unlink()
+            catalog.unregister(p)
+    catalog.safe_register(target, layer, source, symbol, merged)
+    _log(entry)
+    return entry
+
+
+def compact(layers=("raw", "processed"), sources=("reddit", "stocktwits"), dry_run: bool = False) -> list:
+    done = []
+    for layer in layers:
+        for source in sources:
+            for (symbol, day), paths in sorted(day_groups(layer, source).items()):
+                entry = compact_group(layer, source, symbol, day, paths, dry_run)
+                tag = "[dry-run] " if dry_run else "✓ "
+                print(f"{tag}{layer}/{source} {symbol} {day}: {len(paths)} files, "
+                      f"{entry['rows_in']} -> {entry['rows_out']} rows -> {Path(entry['output']).name}")
+                done.append(entry)
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge per-run CSVs into one file per (source, symbol, day)")
+    parser.add_argument("--layer", choices=sorted(LAYER_ROOTS), action="append", help="default: raw and processed")
+    parser.add_argument("--source", choices=sorted(FILE_PREFIX), action="append", help="default: all sources")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be merged")
+    args = parser.parse_args()
+
+    entries = compact(tuple(args.layer or LAYER_ROOTS), tuple(args.source or FILE_PREFIX), args.dry_run)
+    print(f"{len(entries)} group(s) {'would be ' if args.dry_run else ''}compacted")
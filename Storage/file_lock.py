@@ -0,0 +1,39 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Cross-process lock for JSON state files that several worker processes read, merge and rewrite
+# (stage manifest, burst detector state). The lock is a sidecar file `<path>.lock` held with an exclusive
+# OS lock: fcntl.flock on POSIX, msvcrt.locking on Windows. It is released when the holder exits or dies.
+
+POLL_SEC = 0.05
+
+
+@contextmanager
+def file_lock(path):
+    """Hold the exclusive lock of `path` (blocks until other processes and threads release it)."""
+    lock_path = Path(str(path) + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(POLL_SEC)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
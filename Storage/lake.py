@@ -0,0 +1,338 @@
+import os
+import re
+import sys
+import json
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage.file_lock import file_lock
+
+# Hive-partitioned Parquet store for everything the pipeline produces:
+#
+#   data/lake/raw|processed/source={source}/symbol={SYMBOL}/month={YYYY-MM}/part-0.parquet
+#   data/lake/summary|volume/source={source}/symbol={SYMBOL}/part-0.parquet
+#
+# layer      rows                         'date' column         dedupe
+# raw        scraped messages             message UTC date      post_id / (message, timestamp_raw)
+# processed  messages + FinBERT columns   message UTC date      same as raw
+# summary    one row per symbol and day   summary date          date, newest write wins
+# volume     one row per symbol and day   date_utc              date, newest write wins
+#
+# Message layers are split by month rather than by day: Reddit search returns posts back to
+# 2010 at one or two per day, and day folders turned 11 MB of CSV into 16k tiny files.
+# 'date' is a real typed column, so date filters still prune months by path and row groups
+# by Parquet statistics. Every file of a layer has the same schema (LAYER_SCHEMAS).
+#
+# The pipeline writes every new output to both the CSV tree and the lake, but older CSVs only reach the lake
+# through `lake.py migrate`. Readers therefore only switch to the lake (has_layer) once a finished migration
+# has left MIGRATED_MARKER behind; before that the CSV tree is the complete copy.
+# Partitions are read, merged and rewritten under a per-partition file lock (_write.lock: the leading
+# underscore keeps pyarrow's dataset discovery from treating it as data), since the overlapped pipeline,
+# the scheduler and backfill workers can write the same symbol at once.
+
+LAKE_ROOT = PROJECT_ROOT / "data" / "lake"
+MIGRATED_MARKER = LAKE_ROOT / "_migrated.json"
+COMPRESSION = "zstd"
+
+TS = pa.timestamp("us", tz="UTC")
+F32 = pa.float32()
+
+_RAW = [
+    ("date", pa.date32()),
+    ("post_id", pa.string()),
+    ("subreddit", pa.string()),
+    ("title", pa.string()),
+    ("text", pa.string()),
+    ("message", pa.string()),
+    ("score", pa.int32()),
+    ("comments", pa.int32()),
+    ("timestamp_raw", pa.string()),
+    ("ts", TS),
+]
+_FINBERT = [
+    ("prob_positive", F32),
+    ("prob_negative", F32),
+    ("prob_neutral", F32),
+    ("pred_label", pa.string()),
+    ("confidence", F32),
+    ("sentiment_signed", F32),
+]
+LAYER_SCHEMAS = {
+    "raw": pa.schema(_RAW),
+    "processed": pa.schema(_RAW + _FINBERT),
+    "summary": pa.schema([
+        ("date", pa.date32()),
+        ("messages", pa.int32()),
+        ("sentiment_weighted", F32),
+        ("sentiment_mean", F32),
+        ("pos_share", F32),
+        ("neg_share", F32),
+        ("neu_share", F32),
+        ("prob_pos_mean", F32),
+        ("prob_neg_mean", F32),
+        ("prob_neu_mean", F32),
+        ("sentiment_total", F32),
+        ("confidence_mean", F32),
+    ]),
+    "volume": pa.schema([
+        ("date", pa.date32()),
+        ("messages", pa.int32()),
+        ("tmin_utc", TS),
+        ("tmax_utc", TS),
+        ("window_minutes", pa.float64()),
+        ("msgs_per_hour", pa.float64()),
+        ("avg_seconds_between", pa.float64()),
+    ]),
+}
+MESSAGE_LAYERS = ("raw", "processed")
+
+
+def partitioning(layer: str):
+    fields = [("source", pa.string()), ("symbol", pa.string())]
+    if layer in MESSAGE_LAYERS:
+        fields.append(("month", pa.string()))
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+
+def _message_keys(df: pd.DataFrame) -> list:
+    if "post_id" in df.columns and df["post_id"].notna().any():
+        return ["post_id"]
+    return ["message", "timestamp_raw"]
+
+
+def partition_dir(layer: str, source: str, symbol: str, month: str | None = None) -> Path:
+    path = LAKE_ROOT / layer / f"source={source}" / f"symbol={symbol}"
+    return path / f"month={month}" if month else path
+
+
+def to_lake_frame(df: pd.DataFrame, layer: str, fallback_date=None) -> pd.DataFrame:
+    """
+    Normalize a CSV-shaped frame to the layer schema plus the 'symbol' partition column.
+    fallback_date is used for rows without a usable timestamp/date (e.g. Stocktwits posts with no time tag).
+    """
+    df = df.copy()
+    df.columns = [c.lower() for c in df.columns]
+    df["symbol"] = df["symbol"].astype(str).str.strip().str.upper()
+
+    if layer in MESSAGE_LAYERS:
+        if "ts" not in df.columns:
+            iso = df["timestamp_iso"] if "timestamp_iso" in df.columns else pd.Series(pd.NA, index=df.index)
+            df["ts"] = pd.to_datetime(iso.replace("", pd.NA), errors="coerce", utc=True, format="ISO8601")
+        date = df["ts"].dt.tz_convert("UTC").dt.date
+    elif layer == "volume":
+        date = pd.to_datetime(df["date_utc"]).dt.date
+        for c in ("tmin_utc", "tmax_utc"):
+            df[c] = pd.to_datetime(df[c], utc=True)
+    else:
+        date = pd.to_datetime(df["date"]).dt.date if "date" in df.columns else pd.Series(pd.NaT, index=df.index)
+
+    if fallback_date is not None:
+        date = date.where(date.notna(), pd.Timestamp(fallback_date).date())
+    df["date"] = date
+    df = df[df["date"].notna()]
+
+    schema = LAYER_SCHEMAS[layer]
+    for field in schema:
+        if field.name not in df.columns:
+            df[field.name] = None
+    for field in schema:
+        if pa.types.is_string(field.type):
+            df[field.name] = df[field.name].astype("string")
+    return df[["symbol"] + schema.names]
+
+
+def _write_partition(path: Path, table: pa.Table):
+    path.mkdir(parents=True, exist_ok=True)
+    target = path / "part-0.parquet"
+    tmp = path / "part-0.parquet.tmp"
+    pq.write_table(table, tmp, compression=COMPRESSION)
+    os.replace(tmp, target)  # readers see either the old or the new file, never half of one
+
+
+def write_frame(df: pd.DataFrame, layer: str, source: str, fallback_date=None) -> list:
+    """
+    Write a frame into the lake, merging with the partitions it touches.
+    Messages dedupe on post id (or text + raw timestamp); daily layers keep the newest row per date,
+    matching the keep='last' rules of the CSV files.
+    """
+    frame = to_lake_frame(df, layer, fallback_date)
+    if frame.empty:
+        return []
+    schema = LAYER_SCHEMAS[layer]
+    if layer in MESSAGE_LAYERS:
+        keys, sort_col = _message_keys(frame), "ts"
+        frame["month"] = pd.to_datetime(frame["date"]).dt.strftime("%Y-%m")
+        groups = frame.groupby(["symbol", "month"], sort=True)
+    else:
+        keys, sort_col = ["date"], "date"
+        groups = frame.groupby(["symbol"], sort=True)
+
+    written = []
+    for group_key, part in groups:
+        path = partition_dir(layer, source, *group_key)
+        part = part[schema.names]
+        with file_lock(path / "_write"):
+            if (path / "part-0.parquet").exists():
+                old = pq.read_table(path / "part-0.parquet", schema=schema).to_pandas()
+                part = pd.concat([old, part], ignore_index=True)
+            part = part.drop_duplicates(subset=keys, keep="last").sort_values(sort_col, kind="stable")
+            table = pa.Table.from_pandas(part.reset_index(drop=True), schema=schema, preserve_index=False, safe=False)
+            _write_partition(path, table)
+        written.append(path)
+    return written
+
+
+def read_lake(layer: str, sources=None, symbols=None, start=None, end=None, columns=None) -> pd.DataFrame:
+    """
+    Read a layer with partition pruning (source / symbol / date range) and column projection.
+    Partition columns 'source' and 'symbol' can be requested like any other column.
+    """
+    root = LAKE_ROOT / layer
+    if not root.exists():
+        return pd.DataFrame()
+    part = partitioning(layer)
+    schema = pa.unify_schemas([LAYER_SCHEMAS[layer], part.schema])
+    dataset = ds.dataset(root, format="parquet", partitioning=part, schema=schema)
+
+    flt = None
+
+    def _and(expr):
+        nonlocal flt
+        flt = expr if flt is None else flt & expr
+
+    if sources:
+        _and(ds.field("source").isin(list(sources)))
+    if symbols:
+        _and(ds.field("symbol").isin([s.upper() for s in symbols]))
+    if start is not None:
+        start = pd.Timestamp(start)
+        _and(ds.field("date") >= start.date())
+        if layer in MESSAGE_LAYERS:
+            _and(ds.field("month") >= start.strftime("%Y-%m"))
+    if end is not None:
+        end = pd.Timestamp(end)
+        _and(ds.field("date") <= end.date())
+        if layer in MESSAGE_LAYERS:
+            _and(ds.field("month") <= end.strftime("%Y-%m"))
+
+    table = dataset.to_table(columns=columns, filter=flt)
+    return table.to_pandas()
+
+
+def partition_files(layer: str, source: str, symbol: str | None = None) -> list:
+    """part-0.parquet files of a layer/source (optionally one symbol), in path order."""
+    root = LAKE_ROOT / layer / f"source={source}"
+    if symbol:
+        root = root / f"symbol={symbol.upper()}"
+    return sorted(root.rglob("part-0.parquet")) if root.exists() else []
+
+
+def read_partition(path: Path, layer: str, columns=None) -> pd.DataFrame:
+    """One partition file, with the partition columns (source, symbol, month) filled in from its path."""
+    schema = LAYER_SCHEMAS[layer]
+    file_columns = [c for c in columns if c in schema.names] if columns is not None else None
+    df = pq.read_table(path, schema=schema, columns=file_columns).to_pandas()
+    for part in Path(path).parent.parts[-3:]:
+        key, sep, value = part.partition("=")
+        if sep and (columns is None or key in columns):
+            df[key] = value
+    return df[list(columns)] if columns is not None else df
+
+
+def is_migrated() -> bool:
+    """True once migrate_csv_tree() has loaded the whole legacy CSV tree."""
+    return MIGRATED_MARKER.exists()
+
+
+def has_layer(layer: str, source: str | None = None) -> bool:
+    """True if readers can use the lake instead of the CSV tree for a layer (and source)."""
+    if not is_migrated():
+        return False
+    root = LAKE_ROOT / layer
+    if source:
+        root = root / f"source={source}"
+    return root.exists() and any(root.iterdir())
+
+
+def safe_write_frame(df: pd.DataFrame, layer: str, source: str, fallback_date=None) -> list:
+    """write_frame for pipeline stages: the CSV outputs stay authoritative, so lake errors only warn."""
+    try:
+        paths = write_frame(df, layer, source, fallback_date)
+        print(f"✓ Lake: {len(paths)} {layer} partition(s) written for {source}")
+        return paths
+    except Exception as e:
+        print(f"⚠ Lake write failed ({layer}/{source}): {e}")
+        return []
+
+
+# ------------------------------------------------------------------------------
+# One-shot migration of the existing CSV tree
+# ------------------------------------------------------------------------------
+def _folder_date(path: Path):
+    """YYYY/MM/DD from the three parent folders of a dated CSV, if present."""
+    parts = path.parent.parts[-3:]
+    if len(parts) == 3 and all(p.isdigit() for p in parts):
+        return datetime(int(parts[0]), int(parts[1]), int(parts[2])).date()
+    m = re.search(r"(\d{8})", path.name)
+    return datetime.strptime(m.group(1), "%Y%m%d").date() if m else None
+
+
+def _csv_jobs():
+    """(layer, source, path) for every CSV of the legacy tree, oldest first so later runs win."""
+    jobs = []
+    for source in ("reddit", "stocktwits"):
+        raw = PROJECT_ROOT / "data" / "raw" / source
+        jobs += [("raw", source, p) for p in sorted(raw.rglob("*.csv")) if "_tokens" not in p.parts]
+        processed = PROJECT_ROOT / "data" / "processed" / "finbert" / source
+        jobs += [("processed", source, p) for p in sorted(processed.rglob("*_with_finbert.csv"))]
+        reports = PROJECT_ROOT / "reports" / source
+        jobs += [("summary", source, p) for p in sorted(reports.rglob("summary*finbert*.csv"))]
+        volume = PROJECT_ROOT / "data" / "volume_history" / source
+        jobs += [("volume", source, p) for p in sorted(volume.glob("*.csv"))]
+    return jobs
+
+
+def migrate_csv_tree(dry_run: bool = False) -> dict:
+    """Load every legacy CSV into the lake. Safe to re-run: partitions are merged/replaced, not appended."""
+    counts = {}
+    for layer, source, path in _csv_jobs():
+        try:
+            df = pd.read_csv(path)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+            print(f"⚠ Skipping {path}: {e}")
+            continue
+        if df.empty or "symbol" not in df.columns:
+            continue
+        key = f"{layer}/{source}"
+        counts[key] = counts.get(key, 0) + len(df)
+        if dry_run:
+            print(f"[dry-run] {key}: {path.relative_to(PROJECT_ROOT)} ({len(df)} rows)")
+            continue
+        write_frame(df, layer, source, fallback_date=_folder_date(path))
+    if not dry_run:
+        MIGRATED_MARKER.parent.mkdir(parents=True, exist_ok=True)
+        MIGRATED_MARKER.write_text(json.dumps({"migrated_utc": datetime.now(timezone.utc).isoformat(), "rows": counts}),
+                                   encoding="utf-8")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parquet data lake tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    mig = sub.add_parser("migrate", help="load the legacy CSV tree into data/lake")
+    mig.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.cmd == "migrate":
+        for key, rows in migrate_csv_tree(dry_run=args.dry_run).items():
+            print(f"{key}: {rows} rows")
+        sys.exit(0)
@@ -0,0 +1,208 @@
+import os
+import json
+import argparse
+import threading
+import pandas as pd
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+# Local daily OHLCV store, one Parquet file per ticker, filled incrementally from yfinance:
+#
+#   data/prices/{SYMBOL}.parquet   Date, Open, High, Low, Close, Volume (one row per session, naive dates)
+#   data/prices/_meta.json         {SYMBOL: {"name", "first", "last", "refreshed_utc"}}
+#
+# refresh() only downloads what is missing: sessions after the last stored one (re-fetching OVERLAP_DAYS
+# so a partial intraday bar gets its final values) and, if asked for an earlier start, the gap before the
+# first one. Readers get the stored rows; when yfinance is unreachable they still get whatever is on disk.
+# Closes are split-adjusted by Yahoo, so a split rescales the stored history: when the re-fetched overlap
+# no longer matches, the ticker is downloaded again in full.
+# company_name() caches the Yahoo short name used to build the Reddit search queries.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PRICE_DIR = PROJECT_ROOT / "data" / "prices"
+META_PATH = PRICE_DIR / "_meta.json"
+COMPRESSION = "zstd"
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+DEFAULT_START = date(2024, 1, 1)
+OVERLAP_DAYS = 3
+STALE_AFTER_SEC = 3600  # readers may top up a ticker at most this often
+
+_lock = threading.Lock()
+
+
+def _load_meta() -> dict:
+    if META_PATH.exists():
+        try:
+            return json.loads(META_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def _update_meta(symbol: str, **fields):
+    with _lock:
+        meta = _load_meta()
+        meta.setdefault(symbol, {}).update(fields)
+        PRICE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = META_PATH.with_name(META_PATH.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta, indent=1, default=str), encoding="utf-8")
+        os.replace(tmp, META_PATH)
+
+
+def price_path(symbol: str) -> Path:
+    return PRICE_DIR / f"{symbol.upper()}.parquet"
+
+
+def read_store(symbol: str) -> pd.DataFrame:
+    """All stored sessions for a ticker, indexed by Date (empty frame if none)."""
+    path = price_path(symbol)
+    if not path.exists():
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    return pd.read_parquet(path).set_index("Date").sort_index()
+
+
+def _write_store(symbol: str, df: pd.DataFrame):
+    PRICE_DIR.mkdir(parents=True, exist_ok=True)
+    path = price_path(symbol)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    df.reset_index().to_parquet(tmp, index=False, compression=COMPRESSION)
+    os.replace(tmp, path)
+
+
+def _download(symbol: str, start: date, end: date) -> pd.DataFrame:
+    """yfinance daily bars for [start, end] with the index reduced to naive session dates."""
+    import yfinance as yf
+    hist = yf.Ticker(symbol).history(start=start, end=end + timedelta(days=1), auto_adjust=False)
+    if hist.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    idx = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+    hist.index = pd.DatetimeIndex(idx.normalize(), name="Date")
+    return hist[COLUMNS].astype({"Volume": "int64"})
+
+
+def _readjusted(stored: pd.DataFrame, fetched: pd.DataFrame, tolerance: float = 0.005) -> bool:
+    """True if re-fetched sessions disagree with the stored closes (history rescaled upstream)."""
+    # The last stored session may be a partial intraday bar whose close has moved since: only settled
+    # sessions before it say anything about a rescale
+    common = stored.index.intersection(fetched.index)
+    common = common[common < stored.index.max()]
+    if common.empty:
+        return False
+    ratio = stored.loc[common, "Close"].astype(float) / fetched.loc[common, "Close"].astype(float)
+    return bool(((ratio - 1).abs() > tolerance).any())
+
+
+def refresh(symbol: str, start: date | None = None, end: date | None = None) -> int:
+    """
+    Download the sessions missing from the store for [start, end]. Returns the stored row count.
+    History is only extended backwards when start is given (a new ticker starts at DEFAULT_START).
+    """
+    symbol = symbol.upper()
+    end = pd.Timestamp(end or datetime.now(timezone.utc).date()).date()
+    stored = read_store(symbol)
+
+    ranges = []
+    if stored.empty:
+        ranges.append((pd.Timestamp(start or DEFAULT_START).date(), end))
+    else:
+        first, last = stored.index.min().date(), stored.index.max().date()
+        if start is not None and pd.Timestamp(start).date() < first:
+            start = pd.Timestamp(start).date()
+            ranges.append((start, first - timedelta(days=1)))
+        if end > last - timedelta(days=OVERLAP_DAYS):
+            ranges.append((last - timedelta(days=OVERLAP_DAYS), end))
+
+    fetched = []
+    for a, b in ranges:
+        try:
+            fetched.append(_download(symbol, a, b))
+        except Exception as e:
+            print(f"⚠ Price download failed for {symbol} {a}..{b}: {e} (serving stored data)")
+            return len(stored)
+
+    new = [f for f in fetched if not f.empty]
+    if new and not stored.empty and _readjusted(stored, new[-1]):
+        # Yahoo rescales the whole history after a split: splicing would mix two price scales
+        print(f"⚠ {symbol} history was re-adjusted upstream (split?), downloading it again")
+        try:
+            stored = stored.iloc[0:0]
+            new = [_download(symbol, min([first] + [a for a, _ in ranges]), end)]
+        except Exception as e:
+            print(f"⚠ Price download failed for {symbol}: {e} (serving stored data)")
+            return len(read_store(symbol))
+    if new:
+        merged = pd.concat([stored] + new)
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()  # re-fetched sessions win
+        _write_store(symbol, merged)
+        stored = merged
+    _update_meta(symbol, refreshed_utc=datetime.now(timezone.utc).isoformat(),
+                 first=str(stored.index.min().date()) if not stored.empty else None,
+                 last=str(stored.index.max().date()) if not stored.empty else None)
+    return len(stored)
+
+
+def safe_refresh(symbol: str) -> int:
+    """refresh() for pipeline stages: price problems only warn."""
+    try:
+        n = refresh(symbol)
+        print(f"✓ Prices: {n} session(s) stored for {symbol}")
+        return n
+    except Exception as e:
+        print(f"⚠ Price refresh failed for {symbol}: {e}")
+        return 0
+
+
+def _recently_refreshed(symbol: str) -> bool:
+    ts = _load_meta().get(symbol, {}).get("refreshed_utc")
+    return bool(ts) and (datetime.now(timezone.utc) - datetime.fromisoformat(ts)).total_seconds() < STALE_AFTER_SEC
+
+
+def get_prices(symbol: str, start=None, end=None, fetch_missing: bool = True) -> pd.DataFrame:
+    """
+    Stored sessions in [start, end]. With fetch_missing, a range the store does not cover is downloaded
+    once (at most every STALE_AFTER_SEC per ticker); otherwise, and when offline, only local data is used.
+    """
+    symbol = symbol.upper()
+    stored = read_store(symbol)
+    lo = pd.Timestamp(start).normalize() if start is not None else None
+    hi = pd.Timestamp(end).normalize() if end is not None else None
+    covered = not stored.empty and (lo is None or lo >= stored.index.min()) and (hi is None or hi <= stored.index.max())
+    if fetch_missing and not covered and not _recently_refreshed(symbol):
+        refresh(symbol, start=lo.date() if lo is not None else None, end=hi.date() if hi is not None else None)
+        stored = read_store(symbol)
+    return stored.loc[lo:hi]
+
+
+def company_name(symbol: str) -> str | None:
+    """Yahoo short/long name, cached in the store metadata (None if unknown and offline)."""
+    symbol = symbol.upper()
+    meta = _load_meta().get(symbol, {})
+    if meta.get("name"):
+        return meta["name"]
+    try:
+        import yfinance as yf
+        info = yf.Ticker(symbol).info
+        name = info.get("shortName") or info.get("longName")
+    except Exception:
+        return None
+    if name:
+        _update_meta(symbol, name=name)
+    return name
+
+
+def known_symbols() -> list:
+    """Tickers we hold prices for or have volume history for."""
+    syms = {p.stem for p in PRICE_DIR.glob("*.parquet")}
+    for source_dir in (PROJECT_ROOT / "data" / "volume_history").glob("*"):
+        syms.update(p.stem.upper() for p in source_dir.glob("*.csv"))
+    return sorted(syms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally refresh the local OHLCV store")
+    parser.add_argument("--symbols", nargs="+", help="default: every ticker with prices or volume history")
+    parser.add_argument("--start", help="YYYY-MM-DD, extend history back to this date")
+    args = parser.parse_args()
+    for sym in args.symbols or known_symbols():
+        n = refresh(sym, start=args.start)
+        print(f"{sym}: {n} session(s)")
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# Canonical in-memory schema for message frames (raw scrapes and FinBERT-enriched rows).
+#
+# column                                dtype                  why
+# symbol, subreddit, pred_label, source category               a handful of distinct values per file
+# title, text, message, post_id, ...    string[pyarrow]        one contiguous buffer instead of a PyObject per cell
+# ts                                    datetime64[ns, UTC]    int64 epoch under the hood; replaces timestamp_iso
+#                                                              (and timestamp_raw when that is a unix number)
+# prob_*, confidence, sentiment_signed  float32                FinBERT softmax output has ~7 significant digits anyway
+# index, score, comments                int32
+#
+# CSV files keep their existing layout: read_messages() / compact_messages() convert on the way in,
+# to_csv_frame() restores timestamp_raw / timestamp_iso in place of 'ts' on the way out.
+
+CATEGORY_COLUMNS = ("symbol", "subreddit", "pred_label", "source")
+STRING_COLUMNS = ("title", "text", "message", "combined_text", "post_id", "timestamp_raw")
+FLOAT32_COLUMNS = ("prob_positive", "prob_negative", "prob_neutral", "confidence", "sentiment_signed", "sentiment_score")
+INT32_COLUMNS = ("index", "score", "comments")
+
+STRING_DTYPE = "string[pyarrow]"
+
+# Parse-time dtypes for pd.read_csv: strings and floats never go through object/float64 first
+CSV_DTYPES = {
+    **{c: "category" for c in CATEGORY_COLUMNS},
+    **{c: STRING_DTYPE for c in STRING_COLUMNS if c != "timestamp_raw"},
+    **{c: np.float32 for c in FLOAT32_COLUMNS},
+}
+
+
+def _ts_from_strings(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values.astype("string").replace("", pd.NA), errors="coerce", utc=True, format="ISO8601")
+
+
+def parse_ts(df: pd.DataFrame):
+    """
+    ('ts' series, raw_is_epoch) from the CSV timestamp columns.
+    Reddit: timestamp_raw is created_utc; Stocktwits: whatever the page showed (ISO, '9m', ...), so use timestamp_iso.
+    """
+    raw = pd.to_numeric(df["timestamp_raw"], errors="coerce") if "timestamp_raw" in df.columns else None
+    present = df["timestamp_raw"].replace("", pd.NA).notna().sum() if raw is not None else 0
+    raw_is_epoch = bool(present > 0 and raw.notna().sum() == present)
+    if raw_is_epoch:
+        ts = pd.to_datetime(raw, unit="s", utc=True)
+    elif "timestamp_iso" in df.columns:
+        ts = _ts_from_strings(df["timestamp_iso"])
+    else:
+        ts = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns, UTC]")
+    return ts.astype("datetime64[ns, UTC]"), raw_is_epoch
+
+
+def dedupe_keys(df: pd.DataFrame) -> list:
+    """Columns identifying one message across runs: post_id (Reddit), else message text + raw timestamp."""
+    if "post_id" in df.columns and df["post_id"].notna().any():
+        return ["post_id"]
+    ts_col = "timestamp_raw" if "timestamp_raw" in df.columns else "ts"  # folded into 'ts' when it was epoch
+    return [c for c in ("message", ts_col) if c in df.columns]
+
+
+def compact_messages(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a CSV-shaped message frame to the canonical dtypes.
+    timestamp_iso / numeric timestamp_raw are folded into 'ts' at the position of the first of them.
+    """
+    df = df.copy()
+    ts_cols = [c for c in ("timestamp_raw", "timestamp_iso") if c in df.columns]
+    if ts_cols and "ts" not in df.columns:
+        pos = df.columns.get_loc(ts_cols[0])
+        ts, raw_is_epoch = parse_ts(df)
+        df = df.drop(columns=["timestamp_iso"] + (["timestamp_raw"] if raw_is_epoch else []), errors="ignore")
+        if "timestamp_raw" in df.columns:
+            pos = df.columns.get_loc("timestamp_raw") + 1  # keep raw text, ts takes the place of timestamp_iso
+        df.insert(min(pos, len(df.columns)), "ts", ts)
+
+    for c in df.columns.intersection(CATEGORY_COLUMNS):
+        if not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    for c in df.columns.intersection(STRING_COLUMNS):
+        df[c] = df[c].astype(STRING_DTYPE)
+    for c in df.columns.intersection(FLOAT32_COLUMNS):
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype(np.float32)
+    for c in df.columns.intersection(INT32_COLUMNS):
+        num = pd.to_numeric(df[c], errors="coerce")
+        df[c] = num.astype(np.int32) if num.notna().all() else num.astype("Int32")
+    return df
+
+
+def read_messages(path, usecols=None) -> pd.DataFrame:
+    """read_csv straight into the canonical dtypes."""
+    df = pd.read_csv(path, dtype=CSV_DTYPES, usecols=usecols, keep_default_na=True)
+    return compact_messages(df)
+
+
+def _iso_strings(ts: pd.Series) -> pd.Series:
+    """Same text as datetime.isoformat() on a UTC datetime ('' for missing), vectorized."""
+    us = ts.dt.microsecond
+    frac = ("." + us.astype("Int64").astype("string").str.zfill(6)).where(us > 0, "")
+    out = ts.dt.strftime("%Y-%m-%dT%H:%M:%S") + frac + "+00:00"
+    return out.fillna("")
+
+
+def to_csv_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Inverse of compact_messages for writing: 'ts' becomes timestamp_raw (if it was folded in) + timestamp_iso."""
+    if "ts" not in df.columns:
+        return df
+    df = df.copy()
+    pos = df.columns.get_loc("ts")
+    ts = df.pop("ts")
+    df.insert(pos, "timestamp_iso", _iso_strings(ts))
+    if "timestamp_raw" not in df.columns:
+        df.insert(pos, "timestamp_raw", ts.astype("int64").where(ts.notna()) / 1e9)
+    return df
+
+
+def epoch_seconds(ts: pd.Series) -> np.ndarray:
+    """int64 unix seconds of a 'ts' column (missing -> -1)."""
+    return np.where(ts.notna(), ts.astype("int64") // 10**9, -1)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
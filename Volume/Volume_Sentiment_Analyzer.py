@@ -1,84 +1,44 @@
 import os
+import sys
 import pandas as pd
 from datetime import datetime
+from pathlib import Path
 
-#Change CSV_PATH ofc
-CSV_PATH = r"C:\Users\nmrva\OneDrive\Desktop\Screening and Scraping\data\raw\reddit\META\2025\12\06\reddit_posts_META_20251206.csv"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Automation import metrics
+from Volume.volume_engine import daily_volume_all, split_by_symbol
+from Volume.intraday_volume import write_intraday, BUCKET_MINUTES, INTRADAY_DIR
+from Storage.lake import safe_write_frame
+from Storage.catalog import safe_register
+from Storage.file_lock import file_lock
+from Storage.schema import read_messages
 
-df = pd.read_csv(CSV_PATH)
+#Change CSV_PATH ofc (default when run directly; the pipeline calls run_volume with its own path)
+CSV_PATH = r"C:\Users\nmrva\OneDrive\Desktop\Screening and Scraping\data\raw\reddit\META\2025\12\06\reddit_posts_META_20251206.csv"
 
-df['timestamp_iso'] = df['timestamp_iso'].replace('', pd.NA)
-df['ts'] = pd.to_datetime(df['timestamp_iso'], errors='coerce', utc=True)
-df = df.dropna(subset=['ts'])
+VOLUME_HISTORY_DIR = PROJECT_ROOT / 'data' / 'volume_history'
 
-# Daily table per symbol
+# Daily table per symbol (kept for callers that want one ticker; the engine does all symbols in one groupby)
 def daily_volume_table(df, symbol):
-    sdf = df[df['symbol'] == symbol].copy()
-    # Ensure ts is datetime just in case
-    sdf['ts'] = pd.to_datetime(sdf['ts'])
-    sdf['date_utc'] = sdf['ts'].dt.date
-    
-    def _summ(g):
-        n = len(g)
-        tmin = g['ts'].min()
-        tmax = g['ts'].max()
-        
-        # 1. Real Duration (For display)
-        real_duration_min = (tmax - tmin).total_seconds() / 60.0
-        
-        # 2. Math Duration (Enforce 1.0 min floor)
-        math_duration_min = max(real_duration_min, 1.0)
-        
-        # We run into small sample variance problem quite easily, due to low volume
-        # If we have fewer than 5 messages, the "window" is likely coincidence.
-        # So we force the rate to be the Daily Average (Background Noise).
-        if n < 5:
-            # Example: 4 messages / 24 hours = 0.16 (Low/Quiet)
-            rate = n / 24.0  
-        else:
-            # We have enough data to trust the window
-            # Calculate true Burst Velocity
-            rate = (n / math_duration_min) * 60.0
-        
-        return pd.Series({
-            'messages': n,
-            'tmin_utc': tmin,
-            'tmax_utc': tmax,
-            'window_minutes': round(real_duration_min, 2),
-            'msgs_per_hour': round(rate, 3), 
-            'avg_seconds_between': round((tmax - tmin).total_seconds()/max(n-1,1), 2),
-        })
-
-    return (sdf.groupby('date_utc').apply(_summ, include_groups=False).reset_index()
-            .assign(symbol=symbol)
-            .loc[:, ['symbol','date_utc','messages','tmin_utc','tmax_utc',
-                     'window_minutes','msgs_per_hour','avg_seconds_between']]
-            .sort_values(['symbol','date_utc'])
-            .reset_index(drop=True))
+    return daily_volume_all(df[df['symbol'] == symbol])
 
 # Detect source from CSV path (reddit or stocktwits)
-if 'reddit' in CSV_PATH.lower():
-    source = 'reddit'
-elif 'stocktwits' in CSV_PATH.lower():
-    source = 'stocktwits'
-else:
+def detect_source(csv_path) -> str:
+    if 'reddit' in str(csv_path).lower():
+        return 'reddit'
+    if 'stocktwits' in str(csv_path).lower():
+        return 'stocktwits'
     # Default to stocktwits if can't detect
-    source = 'stocktwits'
     print(f"Warning: Could not detect source from path, defaulting to 'stocktwits'")
-
-OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'volume_history', source))
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-print("OUTPUT_DIR:", OUTPUT_DIR)
-print("Reading:", CSV_PATH)
-print("Total rows:", len(df))
-print("Rows with valid ts:", df['ts'].notna().sum())
-print("Symbols found:", sorted(df['symbol'].dropna().unique().tolist()))
+    return 'stocktwits'
 
 def _to_iso_utc(s):
     return pd.to_datetime(s, utc=True).dt.strftime('%Y-%m-%dT%H:%M:%SZ')
 
-def save_or_append_daily(daily_df: pd.DataFrame, output_dir: str = OUTPUT_DIR) -> str | None:
+def save_or_append_daily(daily_df: pd.DataFrame, output_dir: str) -> str | None:
     if daily_df.empty:
         return None
     daily_df = daily_df.copy()
@@ -89,26 +49,60 @@ def save_or_append_daily(daily_df: pd.DataFrame, output_dir: str = OUTPUT_DIR) -
     symbol = daily_df['symbol'].iloc[0]
     out_path = os.path.join(output_dir, f"{symbol}.csv")
 
-    if os.path.exists(out_path):
-        try:
-            existing = pd.read_csv(out_path)
-        except Exception:
-            existing = pd.DataFrame(columns=daily_df.columns)
-        merged = pd.concat([existing, daily_df], ignore_index=True)
-        merged = merged.drop_duplicates(subset=['date_utc'], keep='last').sort_values('date_utc')
-        merged.to_csv(out_path, index=False)
-    else:
-        daily_df.to_csv(out_path, index=False)
+    # Several pipelines may append to the same symbol's history at once: merge and replace under a lock
+    with file_lock(out_path):
+        if os.path.exists(out_path):
+            try:
+                existing = pd.read_csv(out_path)
+            except Exception:
+                existing = pd.DataFrame(columns=daily_df.columns)
+            merged = pd.concat([existing, daily_df], ignore_index=True)
+            daily_df = merged.drop_duplicates(subset=['date_utc'], keep='last').sort_values('date_utc')
+        tmp = f"{out_path}.{os.getpid()}.tmp"
+        daily_df.to_csv(tmp, index=False)
+        os.replace(tmp, out_path)
     return out_path
 
-# Write out per-ticker daily stats
-symbols = sorted(df['symbol'].dropna().unique().tolist())
-print("Final OUTPUT_DIR:", OUTPUT_DIR)
-print("Symbols to write:", symbols)
-for sym in symbols:
-    daily = daily_volume_table(df, sym)
-    if daily.empty:
-        print(f"{sym}: no daily rows, skipping")
-        continue
-    out_path = save_or_append_daily(daily, OUTPUT_DIR)
-    print(f"Saved {sym} daily volume stats -> {out_path}")
\ No newline at end of file
+def run_volume(csv_path = CSV_PATH, source: str | None = None) -> list:
+    """Daily + intraday volume for every symbol in a raw CSV. Returns the daily history files written."""
+    source = source or detect_source(csv_path)
+
+    # Typed read: categorical symbol, 'ts' parsed once (int64 epoch under the hood)
+    with metrics.span("load"):
+        df = read_messages(csv_path)
+        df = df.dropna(subset=['ts'])
+        metrics.count("rows_in", len(df))
+
+    output_dir = str(VOLUME_HISTORY_DIR / source)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("OUTPUT_DIR:", output_dir)
+    print("Reading:", csv_path)
+    print("Rows with valid ts:", len(df))
+    print("Symbols found:", sorted(df['symbol'].dropna().unique().tolist()))
+
+    # Write out per-ticker daily stats
+    # One vectorized groupby over every (symbol, date), then split per ticker for the history files
+    with metrics.span("daily"):
+        daily_all = daily_volume_all(df)
+        written = []
+        for sym, daily in split_by_symbol(daily_all):
+            if daily.empty:
+                print(f"{sym}: no daily rows, skipping")
+                continue
+            out_path = save_or_append_daily(daily, output_dir)
+            safe_register(out_path, "volume", source, sym)
+            print(f"Saved {sym} daily volume stats -> {out_path}")
+            written.append(out_path)
+        safe_write_frame(daily_all, "volume", source)
+        metrics.count("rows_out", len(daily_all))
+
+    # Intraday bucket arrays (1/5/15/60 min) so bursts can be localized within the day
+    with metrics.span("intraday"):
+        intraday_paths = write_intraday(df, source, BUCKET_MINUTES)
+    print(f"Saved {len(intraday_paths)} intraday bucket files -> {INTRADAY_DIR / source}")
+    return written
+
+
+if __name__ == "__main__":
+    run_volume(CSV_PATH)
@@ -0,0 +1,178 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Intraday volume: per (source, symbol) message counts in fixed buckets per UTC day,
+# plus rolling-baseline z-score burst detection over the continuous bucket series.
+#
+# Storage: data/volume_intraday/{source}/{SYMBOL}_{m}min.npz
+#   dates   datetime64[D], one entry per stored day (sorted)
+#   counts  int32 [days, 1440 // m]
+# Re-running a day replaces that day's row, same as the daily volume history (keep='last'); the merge runs
+# under a file lock because concurrent pipelines may write the same symbol.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage.file_lock import file_lock
+
+INTRADAY_DIR = PROJECT_ROOT / "data" / "volume_intraday"
+BUCKET_MINUTES = (1, 5, 15, 60)
+
+# Burst rule defaults: a bucket is a burst when it is Z_THRESHOLD std above the trailing
+# BASELINE_HOURS mean and has at least MIN_BURST_COUNT messages (kills 0 -> 1 "bursts").
+BASELINE_HOURS = 24
+Z_THRESHOLD = 3.0
+MIN_BURST_COUNT = 3
+
+
+def buckets_per_day(bucket_minutes: int) -> int:
+    if 1440 % bucket_minutes:
+        raise ValueError(f"bucket_minutes must divide a day, got {bucket_minutes}")
+    return 1440 // bucket_minutes
+
+
+def bucket_counts(df: pd.DataFrame, bucket_minutes: int = 5, ts_col: str = 'ts', symbol_col: str = 'symbol') -> dict:
+    """
+    Histogram every (symbol, UTC day) into fixed buckets in one bincount.
+    Returns {symbol: (dates datetime64[D], counts int32 [days, buckets])}.
+    """
+    nb = buckets_per_day(bucket_minutes)
+    # factorize gives NaN keys code -1, which bincount rejects
+    df = df.dropna(subset=[ts_col, symbol_col])
+    if df.empty:
+        return {}
+    ts = df[ts_col]
+    day = ts.dt.floor('D')
+    bucket = ((ts - day).dt.total_seconds().to_numpy() // (bucket_minutes * 60)).astype(np.int64)
+
+    codes, uniques = pd.MultiIndex.from_arrays([df[symbol_col].to_numpy(), day.dt.tz_localize(None).to_numpy()]).factorize()
+    flat = np.bincount(codes * nb + bucket, minlength=len(uniques) * nb).reshape(len(uniques), nb).astype(np.int32)
+
+    syms = uniques.get_level_values(0).to_numpy()
+    dates = uniques.get_level_values(1).to_numpy().astype('datetime64[D]')
+    out = {}
+    for sym in pd.unique(syms):
+        rows = np.flatnonzero(syms == sym)
+        rows = rows[np.argsort(dates[rows])]
+        out[sym] = (dates[rows], flat[rows])
+    return out
+
+
+def intraday_path(source: str, symbol: str, bucket_minutes: int) -> Path:
+    return INTRADAY_DIR / source / f"{symbol}_{bucket_minutes}min.npz"
+
+
+def load_buckets(source: str, symbol: str, bucket_minutes: int = 5):
+    """(dates, counts) for a symbol, or empty arrays if nothing is stored."""
+    path = intraday_path(source, symbol, bucket_minutes)
+    if not path.exists():
+        return np.array([], dtype='datetime64[D]'), np.zeros((0, buckets_per_day(bucket_minutes)), dtype=np.int32)
+    with np.load(path) as z:
+        return z['dates'], z['counts']
+
+
+def save_buckets(source: str, symbol: str, bucket_minutes: int, dates: np.ndarray, counts: np.ndarray) -> Path:
+    """Merge new day rows into the stored arrays; days present in the new data replace old ones."""
+    path = intraday_path(source, symbol, bucket_minutes)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(path):
+        old_dates, old_counts = load_buckets(source, symbol, bucket_minutes)
+        keep = ~np.isin(old_dates, dates)
+        all_dates = np.concatenate([old_dates[keep], dates])
+        all_counts = np.concatenate([old_counts[keep], counts])
+        order = np.argsort(all_dates)
+
+        tmp = path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp, dates=all_dates[order], counts=all_counts[order])
+        os.replace(tmp, path)
+    return path
+
+
+def continuous_series(dates: np.ndarray, counts: np.ndarray, bucket_minutes: int, first_day=None, last_day=None):
+    """Lay the stored days out on a gap-free bucket grid (missing days are zero), optionally clipped to a day range."""
+    nb = buckets_per_day(bucket_minutes)
+    if first_day is not None:
+        sel = dates >= np.datetime64(first_day, 'D')
+        dates, counts = dates[sel], counts[sel]
+    if last_day is not None:
+        sel = dates <= np.datetime64(last_day, 'D')
+        dates, counts = dates[sel], counts[sel]
+    if len(dates) == 0:
+        return np.array([], dtype='datetime64[m]'), np.array([], dtype=np.float64)
+    all_days = np.arange(dates.min(), dates.max() + 1, dtype='datetime64[D]')
+    grid = np.zeros((len(all_days), nb), dtype=np.float64)
+    grid[(dates - all_days[0]).astype(np.int64)] = counts
+    starts = (all_days.astype('datetime64[m]')[:, None] + np.arange(nb) * bucket_minutes).ravel()
+    return starts, grid.ravel()
+
+
+def rolling_baseline(x: np.ndarray, window: int):
+    """Trailing mean/std over the previous `window` buckets (current bucket excluded), via cumsums."""
+    cs = np.concatenate([[0.0], np.cumsum(x)])
+    cs2 = np.concatenate([[0.0], np.cumsum(x * x)])
+    idx = np.arange(len(x))
+    lo = np.maximum(idx - window, 0)
+    n = np.maximum(idx - lo, 1)
+    mean = (cs[idx] - cs[lo]) / n
+    var = np.maximum((cs2[idx] - cs2[lo]) / n - mean ** 2, 0.0)
+    return mean, np.sqrt(var)
+
+
+def burst_scores(x: np.ndarray, bucket_minutes: int, baseline_hours: float = BASELINE_HOURS):
+    """z-score of each bucket against its trailing baseline. Std is floored at the Poisson sqrt(mean) and 0.5."""
+    window = max(int(baseline_hours * 60 // bucket_minutes), 1)
+    mean, std = rolling_baseline(x, window)
+    std = np.maximum.reduce([std, np.sqrt(mean), np.full_like(std, 0.5)])
+    return mean, (x - mean) / std
+
+
+def detect_bursts(source: str, symbol: str, bucket_minutes: int = 5, z_threshold: float = Z_THRESHOLD,
+                  min_count: int = MIN_BURST_COUNT, baseline_hours: float = BASELINE_HOURS) -> pd.DataFrame:
+    """All burst buckets for a stored symbol."""
+    starts, x = continuous_series(*load_buckets(source, symbol, bucket_minutes), bucket_minutes)
+    cols = ['source', 'symbol', 'bucket_start_utc', 'bucket_minutes', 'messages', 'baseline', 'z']
+    if len(x) == 0:
+        return pd.DataFrame(columns=cols)
+    baseline, z = burst_scores(x, bucket_minutes, baseline_hours)
+    hit = (z >= z_threshold) & (x >= min_count)
+    return pd.DataFrame({
+        'source': source,
+        'symbol': symbol,
+        'bucket_start_utc': pd.to_datetime(starts[hit]).tz_localize('UTC'),
+        'bucket_minutes': bucket_minutes,
+        'messages': x[hit].astype(np.int64),
+        'baseline': np.round(baseline[hit], 3),
+        'z': np.round(z[hit], 2),
+    }, columns=cols)
+
+
+def day_profile(source: str, symbol: str, day, bucket_minutes: int = 5, baseline_hours: float = BASELINE_HOURS) -> pd.DataFrame:
+    """Buckets of one UTC day with baseline and z-score, for charting."""
+    day = np.datetime64(pd.Timestamp(day).date(), 'D')
+    # Only the day itself plus enough history to fill the trailing baseline window
+    first = day - np.timedelta64(int(np.ceil(baseline_hours / 24)), 'D')
+    starts, x = continuous_series(*load_buckets(source, symbol, bucket_minutes), bucket_minutes, first, day)
+    if len(x) == 0:
+        return pd.DataFrame()
+    baseline, z = burst_scores(x, bucket_minutes, baseline_hours)
+    sel = starts.astype('datetime64[D]') == day
+    return pd.DataFrame({
+        'bucket_start_utc': pd.to_datetime(starts[sel]).tz_localize('UTC'),
+        'messages': x[sel].astype(np.int64),
+        'msgs_per_hour': x[sel] * (60.0 / bucket_minutes),
+        'baseline': baseline[sel],
+        'z': z[sel],
+    })
+
+
+def write_intraday(df: pd.DataFrame, source: str, bucket_minutes=BUCKET_MINUTES) -> list:
+    """Bucket a message frame at every resolution and persist per symbol."""
+    written = []
+    for m in bucket_minutes:
+        for sym, (dates, counts) in bucket_counts(df, m).items():
+            written.append(save_buckets(source, sym, m, dates, counts))
+    return written
@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import math
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Online burst detector fed directly by the scrapers.
+#
+# Per symbol and feed (subreddit / stocktwits) we keep a handful of numbers (O(1) memory, independent of
+# message count):
+#   rate      exponentially-decayed message rate (msgs/sec), fast time constant FAST_TAU_SEC
+#   mean/var  slow exponentially-weighted baseline of that rate, time constant SLOW_TAU_SEC
+#   t         time the state refers to (first: first message seen, for warm-up)
+# plus per symbol the burst flag and marks: the newest timestamp already consumed per feed, so a
+# re-scrape of the same posts is not counted twice. Feeds are scraped one after another, each one
+# newest-first back over the same hours, so a single symbol-wide clock would see every feed after the
+# first as out of order and its baseline would only ever learn from the first feed. Each feed therefore
+# runs its own EW state in time order; the symbol's rate, mean and variance are the sums over its feeds
+# (rates decayed to the newest feed time).
+# A burst starts when rate > mean + K_SIGMA * std (and above the absolute floors) and ends
+# once it drops back under mean + 1 std. The baseline is frozen during a burst so the burst
+# does not raise its own bar. Start/end events are appended to EVENT_LOG.
+# Scrapers in several processes share the state file: save() merges under a file lock and only replaces the
+# symbols this detector observed, so parallel workers do not erase each other's state.
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from Storage.file_lock import file_lock
+
+EVENTS_DIR = PROJECT_ROOT / "data" / "events"
+STATE_PATH = EVENTS_DIR / "burst_state.json"
+EVENT_LOG = EVENTS_DIR / "bursts.jsonl"
+
+FAST_TAU_SEC = 15 * 60
+SLOW_TAU_SEC = 6 * 3600
+K_SIGMA = 4.0  # rate counts are Poisson-skewed, 3 sigma fires too often on busy tickers
+MIN_RATE_PER_HOUR = 6.0
+MIN_BURST_MESSAGES = 5         # rate * FAST_TAU_SEC, i.e. ~messages inside the fast window
+WARMUP_MESSAGES = 20           # no alerts until the baseline has seen this many messages ...
+WARMUP_SEC = SLOW_TAU_SEC      # ... spread over at least one baseline time constant
+MAX_MESSAGE_AGE_SEC = 24 * 3600  # older posts are history, not a live feed
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def to_epoch(value) -> float | None:
+    """Epoch seconds from a unix number or an ISO string; None if unparseable."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+class BurstDetector:
+    """Streaming per-symbol burst detector. Call observe() per message, save() at the end of a run."""
+
+    def __init__(self, state_path: Path = STATE_PATH, event_log: Path = EVENT_LOG):
+        self.state_path = Path(state_path)
+        self.event_log = Path(event_log)
+        self.state = self._read()
+        self._pending_marks = {}  # (symbol, feed) -> newest ts seen this run
+
+    def _read(self) -> dict:
+        if self.state_path.exists():
+            try:
+                return json.loads(self.state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _symbol_state(self, symbol: str) -> dict:
+        s = self.state.setdefault(symbol, {"burst": False, "start": None, "peak": 0.0, "marks": {}})
+        if "feeds" not in s:
+            # State written before the per-feed baselines: its symbol-wide numbers cannot be split up
+            for key in ("t", "first", "rate", "mean", "var", "n"):
+                s.pop(key, None)
+            s["feeds"] = {}
+        return s
+
+    @staticmethod
+    def _feed_state(s: dict, feed: str) -> dict:
+        return s["feeds"].setdefault(feed, {"t": 0.0, "first": None, "rate": 0.0, "mean": 0.0, "var": 0.0, "n": 0})
+
+    @staticmethod
+    def _combined(s: dict) -> dict:
+        """Symbol-wide t, first, n, rate, mean and var from the per-feed states."""
+        feeds = list(s["feeds"].values())
+        t = max(f["t"] for f in feeds)
+        return {
+            "t": t,
+            "first": min(f["first"] for f in feeds if f["first"] is not None),
+            "n": sum(f["n"] for f in feeds),
+            "rate": sum(f["rate"] * math.exp(-(t - f["t"]) / FAST_TAU_SEC) for f in feeds),
+            "mean": sum(f["mean"] for f in feeds),
+            "var": sum(f["var"] for f in feeds),
+        }
+
+    def observe(self, symbol: str, ts, feed: str = "default", now: float | None = None) -> dict | None:
+        """Feed one message. Returns the emitted event, if any."""
+        ts = to_epoch(ts)
+        if ts is None:
+            return None
+        now = time.time() if now is None else now
+        s = self._symbol_state(symbol)
+
+        # Already consumed in an earlier run, or too old to be "live"
+        if ts <= s["marks"].get(feed, 0.0) or now - ts > MAX_MESSAGE_AGE_SEC:
+            return None
+        key = (symbol, feed)
+        self._pending_marks[key] = max(self._pending_marks.get(key, 0.0), ts)
+
+        f = self._feed_state(s, feed)
+        if f["first"] is None:
+            f["first"] = ts
+        if ts >= f["t"]:
+            dt = ts - f["t"] if f["t"] else 0.0
+            decayed = f["rate"] * math.exp(-dt / FAST_TAU_SEC)
+            if not s["burst"] and dt > 0:
+                # Time-weighted EW update of the baseline with the average rate over the gap
+                # (exact integral of the decaying kernel). Until one time constant has passed,
+                # use the plain running average so the baseline does not start biased at 0.
+                gap_avg = f["rate"] * FAST_TAU_SEC * (1.0 - math.exp(-dt / FAST_TAU_SEC)) / dt
+                alpha = max(1.0 - math.exp(-dt / SLOW_TAU_SEC), dt / (ts - f["first"]))
+                diff = gap_avg - f["mean"]
+                f["mean"] += alpha * diff
+                f["var"] = (1.0 - alpha) * (f["var"] + alpha * diff * diff)
+            f["rate"] = decayed + 1.0 / FAST_TAU_SEC
+            f["t"] = ts
+        else:
+            # Out of order within the feed: add its decayed contribution at the reference time
+            f["rate"] += math.exp(-(f["t"] - ts) / FAST_TAU_SEC) / FAST_TAU_SEC
+        f["n"] += 1
+        return self._check(symbol, s, feed)
+
+    def observe_many(self, symbol: str, timestamps, feed: str = "default", now: float | None = None) -> list:
+        """Feed a batch (sorted oldest-first so the baseline sees them in order)."""
+        epochs = sorted(t for t in (to_epoch(x) for x in timestamps) if t is not None)
+        events = [self.observe(symbol, t, feed, now) for t in epochs]
+        return [e for e in events if e]
+
+    def _check(self, symbol: str, s: dict, feed: str) -> dict | None:
+        c = self._combined(s)
+        # Poisson floor for the std of an exponentially-smoothed rate: sqrt(mean / (2 * tau))
+        std = max(math.sqrt(c["var"]), math.sqrt(max(c["mean"], 0.0) / (2 * FAST_TAU_SEC)))
+        threshold = max(c["mean"] + K_SIGMA * std, MIN_RATE_PER_HOUR / 3600.0, MIN_BURST_MESSAGES / FAST_TAU_SEC)
+
+        if not s["burst"]:
+            warm = c["n"] >= WARMUP_MESSAGES and c["t"] - c["first"] >= WARMUP_SEC
+            if warm and c["rate"] > threshold:
+                s["burst"], s["start"], s["peak"] = True, c["t"], c["rate"]
+                return self._emit("burst_start", symbol, s, c, threshold, feed)
+            return None
+
+        s["peak"] = max(s["peak"], c["rate"])
+        if c["rate"] < c["mean"] + std:
+            event = self._emit("burst_end", symbol, s, c, threshold, feed)
+            s["burst"], s["start"], s["peak"] = False, None, 0.0
+            return event
+        return None
+
+    def _emit(self, kind: str, symbol: str, s: dict, c: dict, threshold: float, feed: str) -> dict:
+        event = {
+            "event": kind,
+            "symbol": symbol,
+            "start": _iso(s["start"]),
+            "at": _iso(c["t"]),
+            "rate_per_hour": round(c["rate"] * 3600, 2),
+            "peak_per_hour": round(s["peak"] * 3600, 2),
+            "baseline_per_hour": round(c["mean"] * 3600, 2),
+            "threshold_per_hour": round(threshold * 3600, 2),
+            "feed": feed,
+            "detected_utc": _iso(time.time()),
+        }
+        self.event_log.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.event_log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+        print(f"⚡ {kind} {symbol}: {event['rate_per_hour']}/hr vs baseline {event['baseline_per_hour']}/hr")
+        return event
+
+    def save(self):
+        """Commit this run's feed watermarks and persist the state of the symbols observed."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.state_path):
+            disk = self._read()
+            for (symbol, feed), ts in self._pending_marks.items():
+                marks = self._symbol_state(symbol)["marks"]
+                # Watermarks only move forward, whichever process got further
+                stored = disk.get(symbol, {}).get("marks", {})
+                marks.update({f: max(marks.get(f, 0.0), t) for f, t in stored.items()})
+                marks[feed] = max(marks.get(feed, 0.0), ts)
+                disk[symbol] = self.state[symbol]
+            self.state, self._pending_marks = disk, {}
+            tmp = self.state_path.with_name(self.state_path.name + f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.state), encoding="utf-8")
+            os.replace(tmp, self.state_path)
+
+
+def read_events(symbol: str | None = None, event_log: Path = EVENT_LOG) -> list:
+    """All logged burst events, optionally for one symbol."""
+    if not Path(event_log).exists():
+        return []
+    with open(event_log, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return [e for e in events if symbol is None or e["symbol"] == symbol]
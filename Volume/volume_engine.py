@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+# Vectorized daily volume stats for every (symbol, date) in one pass.
+# Same columns and rules as the original per-symbol _summ:
+#   - window_minutes is the real tmin..tmax span
+#   - n < 5 messages: velocity falls back to the daily average n / 24 (noise floor)
+#   - otherwise: n / max(window, 1 min) * 60
+
+NOISE_FLOOR_N = 5
+MIN_WINDOW_MINUTES = 1.0
+
+DAILY_COLUMNS = ['symbol', 'date_utc', 'messages', 'tmin_utc', 'tmax_utc',
+                 'window_minutes', 'msgs_per_hour', 'avg_seconds_between']
+
+
+def daily_volume_all(df: pd.DataFrame, ts_col: str = 'ts', symbol_col: str = 'symbol') -> pd.DataFrame:
+    """Daily volume table for all symbols at once. df[ts_col] must be tz-aware UTC datetimes."""
+    if df.empty:
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+
+    ts = df[ts_col]
+    # Group on the day as datetime64 (fast) and only turn it into date objects per group at the end
+    g = (ts.groupby([df[symbol_col].rename('symbol'), ts.dt.floor('D').rename('date_utc')], sort=True, observed=True)
+         .agg(messages='size', tmin_utc='min', tmax_utc='max')
+         .reset_index())
+    g['date_utc'] = g['date_utc'].dt.date
+
+    n = g['messages'].to_numpy()
+    span_sec = (g['tmax_utc'] - g['tmin_utc']).dt.total_seconds().to_numpy()
+    window_min = span_sec / 60.0
+    burst_rate = n / np.maximum(window_min, MIN_WINDOW_MINUTES) * 60.0
+    rate = np.where(n < NOISE_FLOOR_N, n / 24.0, burst_rate)
+
+    g['window_minutes'] = np.round(window_min, 2)
+    g['msgs_per_hour'] = np.round(rate, 3)
+    g['avg_seconds_between'] = np.round(span_sec / np.maximum(n - 1, 1), 2)
+    return g.loc[:, DAILY_COLUMNS].reset_index(drop=True)
+
+
+def split_by_symbol(daily: pd.DataFrame):
+    """Yield (symbol, frame) pairs without copying the whole table per symbol."""
+    for sym, idx in daily.groupby('symbol', sort=True, observed=True).indices.items():
+        yield sym, daily.iloc[idx].reset_index(drop=True)